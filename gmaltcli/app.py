@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
+import io
 import logging
 import sys
+import time
 import argparse
+import numpy
 import sqlalchemy.exc
 
-import gmalthgtparser as hgt
-
 import gmaltcli.tools as tools
+import gmaltcli.reader as reader
+import gmaltcli.lookup as lookup
+import gmaltcli.export as export
+import gmaltcli.server as server
 import gmaltcli.worker as worker
+import gmaltcli.metrics as metrics
 import gmaltcli.database as database
 
 logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,9 +28,26 @@ def create_read_from_hgt_parser():
     parser = argparse.ArgumentParser(description='Pass along the latitude/longitude of the point you want to '
                                                  'know the latitude of and a HGT file. It will look for the '
                                                  'elevation of your point into the file and return it.')
-    parser.add_argument('lat', type=float, help='The latitude of your point (example: 48.861295)')
-    parser.add_argument('lng', type=float, help='The longitude of your point (example: 2.339703)')
-    parser.add_argument('hgt_file', type=str, help='The file to load (example: N00E010.hgt)')
+    parser.add_argument('lat', type=float, nargs='?', help='The latitude of your point (example: 48.861295)')
+    parser.add_argument('lng', type=float, nargs='?', help='The longitude of your point (example: 2.339703)')
+    parser.add_argument('hgt_file', type=str,
+                        help='The file to load (example: N00E010.hgt) or the folder of the HGT files, the file of '
+                             'each point is found from its name')
+    parser.add_argument('--batch', type=str, dest='batch', metavar='INPUT',
+                        help='Read the points from the INPUT file (- for the standard input), one per line, and write '
+                             'each of them with its elevation on the standard output')
+    parser.add_argument('--format', type=str, dest='format', default='csv', choices=lookup.INPUT_FORMATS,
+                        help='The format of the points with --batch : "lat,lng" csv lines or {"lat": ..., "lng": ...} '
+                             'JSON lines (default : csv)')
+    parser.add_argument('--interpolate', type=str, dest='interpolate', default='nearest', choices=lookup.INTERPOLATIONS,
+                        help='The interpolation of the elevation between the values of the HGT files around the point '
+                             '(default : nearest, the value of the square of the point)')
+    parser.add_argument('--max-tiles', type=int, dest='max_tiles', default=lookup.CACHE_MAX_TILES, metavar='N',
+                        help='The maximum number of HGT files kept memory-mapped with --batch, the least recently used '
+                             'file is closed first (default : {})'.format(lookup.CACHE_MAX_TILES))
+    parser.add_argument('--max-mapped', type=int, dest='max_mapped', metavar='MB',
+                        help='The maximum size in MB of the HGT files kept memory-mapped with --batch (default : no '
+                             'limit)')
     return parser
 
 
@@ -33,7 +56,9 @@ def read_from_hgt():
 
     Usage:
 
-        gmalt-hgtread <lat> <lng> <path to hgt file>
+        gmalt-hgtread [--interpolate {nearest,bilinear,bicubic}] <lat> <lng> <path to hgt file or folder>
+        gmalt-hgtread --batch <points file or -> [--format {csv,jsonl}] [--interpolate {nearest,bilinear,bicubic}]
+            <path to hgt file or folder>
 
     Print on stdout :
 
@@ -41,13 +66,37 @@ def read_from_hgt():
             Location: (408P,166L)
             Band 1:
                 Value: 644
+
+    or, with `--batch`, each point with its elevation (see :func:`gmaltcli.lookup.lookup_stream`)
     """
     parser = create_read_from_hgt_parser()
     args = parser.parse_args()
+    if args.batch and (args.lat is not None or args.lng is not None):
+        parser.error('lat and lng are not allowed with --batch')
+    if not args.batch and (args.lat is None or args.lng is None):
+        parser.error('the following arguments are required: lat, lng, hgt_file')
+    if args.max_tiles < 1 or (args.max_mapped is not None and args.max_mapped < 1):
+        parser.error('--max-tiles and --max-mapped must be positive')
+
+    if args.batch:
+        max_bytes = args.max_mapped * 1024 * 1024 if args.max_mapped else None
+        return read_batch_from_hgt(args.batch, args.hgt_file, args.format, args.max_tiles, max_bytes,
+                                   args.interpolate)
 
     try:
-        with hgt.HgtParser(args.hgt_file) as hgt_parser:
-            elev_data = hgt_parser.get_elevation((args.lat, args.lng))
+        # a single lookup indexes the folder and maps the file of the point once
+        with lookup.TileLookup(args.hgt_file) as tile_lookup:
+            tile = tile_lookup.index.find(args.lat, args.lng)
+            if tile is None:
+                raise Exception('point {} is not inside the HGT files of {}'.format(
+                    (args.lat, args.lng), args.hgt_file))
+            lats, lngs = numpy.array([args.lat]), numpy.array([args.lng])
+            lines, cols, values = tile_lookup.cache.get(tile).get_elevations(lats, lngs)
+            elevation = None if values[0] == reader.HgtBlockReader.VOID_VALUE else int(values[0])
+            if args.interpolate != 'nearest':
+                values = tile_lookup.interpolate(lats, lngs, args.interpolate)[0]
+                elevation = None if numpy.isnan(values[0]) else round(float(values[0]), 2)
+        elev_data = (int(lines[0]), int(cols[0]), elevation)
     except Exception as e:
         logging.error(str(e))
         return sys.exit(1)
@@ -59,6 +108,40 @@ def read_from_hgt():
     return sys.exit(0)
 
 
+def read_batch_from_hgt(batch, hgt_file, input_format, max_tiles=lookup.CACHE_MAX_TILES, max_bytes=None,
+                        interpolation='nearest'):
+    """ Look up the elevation of the points of a file or of the standard input in a HGT file or in the HGT files
+    of a folder
+
+    :param str batch: the path of the file of the points, - for the standard input
+    :param str hgt_file: the HGT file or the folder of the HGT files
+    :param str input_format: the format of the points (one of :data:`gmaltcli.lookup.INPUT_FORMATS`)
+    :param int max_tiles: the maximum number of HGT files kept memory-mapped
+    :param int max_bytes: the maximum number of bytes of the HGT files kept memory-mapped, None for no limit
+    :param str interpolation: the interpolation of the elevations (one of :data:`gmaltcli.lookup.INTERPOLATIONS`)
+    """
+    try:
+        input_stream = sys.stdin if batch == '-' else io.open(batch)
+        try:
+            with lookup.TileLookup(hgt_file, max_tiles, max_bytes) as tile_lookup:
+                counts = lookup.lookup_stream(input_stream, sys.stdout, tile_lookup, input_format=input_format,
+                                              interpolation=interpolation)
+        finally:
+            if input_stream is not sys.stdin:
+                input_stream.close()
+    except Exception as e:
+        logging.error(str(e))
+        return sys.exit(1)
+
+    if counts['not_found'] or counts['invalid']:
+        logging.warning('{not_found} points not found in the HGT files, {invalid} lines not parsed'.format(**counts))
+    if tile_lookup.missing:
+        missing = sorted(tile_lookup.missing)
+        logging.warning('missing tiles : {}{}'.format(', '.join(missing[:10]), ', ...' if len(missing) > 10 else ''))
+    logging.info('tile cache : {hits} hits, {misses} misses, {evictions} evictions'.format(**tile_lookup.cache.stats))
+    return sys.exit(0)
+
+
 def create_get_hgt_parser():
     """ CLI parser for gmalt-hgtget
 
@@ -78,6 +161,8 @@ def create_get_hgt_parser():
                         help='Set this flag if you don\'t want to unzip the HGT zip files')
     parser.add_argument('-c', type=int, dest='concurrency', default=1,
                         help='How many worker will attempt to download or unzip files in parallel')
+    parser.add_argument('--stats-file', type=str, dest='stats_file',
+                        help='Write the metrics of the workers (counters, timers, rates) in this JSON file at exit')
     parser.add_argument('-v', dest='verbose', action='store_true', help='increase verbosity level')
     return parser
 
@@ -99,12 +184,13 @@ def get_hgt():
     logging.info('config - parallelism : %i' % args.concurrency)
     logging.info('config - folder : %s' % args.folder)
 
+    collectors = [metrics.MetricsCollector('download'), metrics.MetricsCollector('extract')]
     try:
         # Download HGT zip file in a pool of thread
         tools.download_hgt_zip_files(args.folder, args.dataset_files, args.concurrency,
-                                     skip=args.skip_download)
+                                     skip=args.skip_download, collector=collectors[0])
         # Unzip in folder all HGT zip files found in folder
-        tools.extract_hgt_zip_files(args.folder, args.concurrency, skip=args.skip_unzip)
+        tools.extract_hgt_zip_files(args.folder, args.concurrency, skip=args.skip_unzip, collector=collectors[1])
     except KeyboardInterrupt:
         pass
     except worker.WorkerPoolException:
@@ -114,6 +200,9 @@ def get_hgt():
     except Exception as exception:
         logging.exception(exception)
         return sys.exit(1)
+    finally:
+        if args.stats_file:
+            metrics.write_stats_file(args.stats_file, collectors)
     return sys.exit(0)
 
 
@@ -128,6 +217,36 @@ def create_load_hgt_parser():
                         help='Path to the folder where the HGT files are stored.')
     parser.add_argument('-c', type=int, dest='concurrency', default=1,
                         help='How many worker will attempt to load files in parallel')
+    parser.add_argument('--executor', type=str, dest='executor', default='thread', choices=['thread', 'process'],
+                        help='Load files in a pool of threads or in a pool of processes (default : thread)')
+    parser.add_argument('--stats-file', type=str, dest='stats_file',
+                        help='Write the metrics of the workers (counters, timers, rates) in this JSON file at exit')
+    parser.add_argument('--writers', type=int, dest='writers',
+                        help='Import in a pipeline : the -c workers parse the files and encode the batches of rows, '
+                             'WRITERS threads with their own database connection insert them')
+    parser.add_argument('-b', '--batch-size', type=int, dest='batch_size',
+                        help='How many rows are inserted by a single query (default : 1000 values or 10 rasters)')
+    parser.add_argument('--reimport', dest='resume', action='store_false',
+                        help='Import all the files, even the ones already imported according to the ledger table')
+    parser.add_argument('--bulk', dest='bulk', action='store_true',
+                        help='Create the table without index, load all the files then build the indexes and '
+                             'analyze the table')
+    parser.add_argument('--unlogged', dest='unlogged', action='store_true',
+                        help='With --bulk, create an UNLOGGED table which is set LOGGED at the end of the load')
+    parser.add_argument('--cluster', dest='cluster', action='store_true',
+                        help='With --bulk, reorder the table according to its index at the end of the load')
+    parser.add_argument('--merge-runs', dest='merge_runs', action='store_true',
+                        help='Import the consecutive equal values of a line as a single rectangle (standard schema '
+                             'without raster only)')
+    parser.add_argument('--incremental', dest='incremental', action='store_true',
+                        help='Import only the new and changed files (md5 checksum) and, in a changed file, replace '
+                             'only the changed blocks of lines (standard format and schema only)')
+    parser.add_argument('--resample', type=int, dest='resample', metavar='N',
+                        help='Import the files at a coarser resolution : each square of NxN values is aggregated in '
+                             'a single value (or raster pixel) by --resample-method')
+    parser.add_argument('--resample-method', dest='resample_method', default='mean', choices=reader.DOWNSAMPLE_METHODS,
+                        help='The aggregation of the values with --resample, the void values are left out '
+                             '(default: mean)')
     parser.add_argument('-v', dest='verbose', action='store_true', help='increase verbosity level')
     parser.add_argument('-tb', '--traceback', dest='traceback', action='store_true', help=argparse.SUPPRESS)
     parser.add_argument('-e', '--echo', dest='echo', action='store_true', help=argparse.SUPPRESS)
@@ -135,25 +254,43 @@ def create_load_hgt_parser():
     # Database connection args
     db_group = parser.add_argument_group('database', 'database connection configuration')
     db_group.add_argument('--type', type=str, dest='type', default="postgres",
-                          help='The type of your database (default : postgres)')
+                          help='The type of your database : postgres, mysql or sqlite (default : postgres)')
     db_group.add_argument('-H', '--host', type=str, dest='host', default="localhost",
                           help='The hostname of the database')
     db_group.add_argument('-P', '--port', type=int, dest='port', help='The port of the database')
-    db_group.add_argument('-d', '--db', type=str, dest='database', default="gmalt", help='The name of the database')
-    db_group.add_argument('-u', '--user', type=str, dest='username', required=True,
-                          help='The user to connect to the database')
+    db_group.add_argument('-d', '--db', type=str, dest='database', default="gmalt",
+                          help='The name of the database (the path of the database file for sqlite)')
+    db_group.add_argument('-u', '--user', type=str, dest='username',
+                          help='The user to connect to the database (required except for sqlite)')
     db_group.add_argument('-p', '--pass', type=str, dest='password', help='The password to connect to the database')
     db_group.add_argument('-t', '--table', type=str, dest='table', default="elevation",
                           help='The table name to import data')
+    db_group.add_argument('--method', type=str, dest='method', default="insert", choices=['insert', 'copy'],
+                          help='The loading method : multi-row INSERT queries or COPY FROM STDIN streams '
+                               '(LOAD DATA LOCAL INFILE for mysql) (default : insert)')
+    db_group.add_argument('--schema', type=str, dest='schema', default="standard", choices=['standard', 'grid'],
+                          help='The schema of the table without raster : the bounds of each value or the id of its '
+                               'cell in the arc second grid (default : standard)')
+    db_group.add_argument('--partition-band', type=int, dest='partition_band', metavar='DEGREES',
+                          help='Create the table without raster partitioned by bands of DEGREES degrees of latitude '
+                               '(postgres 11 or later only)')
 
     # Raster configuration
     gis_group = parser.add_argument_group('gis', 'GIS configuration')
     gis_group.add_argument('-r', '--raster', dest='use_raster', action='store_true',
                            help='Use raster to import data. Your database must have GIS capabilities '
-                                'like PostGIS for PostgreSQL.')
+                                'like PostGIS for PostgreSQL or MySQL 8.0.')
     gis_group.add_argument('-s', '--sample', nargs=2, type=int, dest='sample', metavar=('LNG_SAMPLE', 'LAT_SAMPLE'),
                            default=(None, None), help="Separate a HGT file in multiple rasters. Sample on lng axis "
                                                       "and lat axis.")
+    gis_group.add_argument('--overviews', type=tools.overview_factors, dest='overviews', metavar='FACTORS',
+                           help='Also store the rasters downsampled by each comma separated factor (for example 2,4,8) '
+                                'in the overview tables o_FACTOR_TABLE registered in PostGIS raster_overviews')
+    gis_group.add_argument('--tune-sample', dest='tune_sample', action='store_true',
+                           help='Benchmark several raster sizes on a sample of the files against the database then '
+                                'log the best one and stop')
+    gis_group.add_argument('--tune-apply', dest='tune_apply', action='store_true',
+                           help='Same benchmark as --tune-sample then load the files with the best raster size')
     gis_group.add_argument('--skip-raster2pgsql-check', dest='check_raster2pgsql', default=True, action='store_false',
                            help='Skip raster2pgsql presence check')
 
@@ -166,10 +303,32 @@ def load_hgt():
     Usage:
 
         gmalt-hgtload [options] -u <user> <folder>
+        gmalt-hgtload [options] --type sqlite -d <database file> <folder>
     """
     # Parse command line arguments
     parser = create_load_hgt_parser()
     args = vars(parser.parse_args())
+    if args['type'] != 'sqlite' and not args['username']:
+        parser.error('the following arguments are required: -u/--user')
+    if (args['unlogged'] or args['cluster']) and not args['bulk']:
+        parser.error('--unlogged and --cluster require --bulk')
+    if args['merge_runs'] and (args['use_raster'] or args['schema'] != 'standard'):
+        parser.error('--merge-runs requires the standard schema without raster')
+    if args['incremental'] and (args['use_raster'] or args['schema'] != 'standard' or args['bulk']
+                                or args['writers']):
+        parser.error('--incremental cannot be combined with raster, --bulk, --writers or the grid schema')
+    if args['resample'] is not None and args['resample'] < 2:
+        parser.error('--resample must be greater than 1')
+    if args['resample'] and args['schema'] == 'grid' and not args['use_raster']:
+        parser.error('--resample is not supported by the grid schema')
+    if args['overviews'] and (not args['use_raster'] or args['type'] != 'postgres'):
+        parser.error('--overviews requires --raster with --type postgres')
+    if (args['tune_sample'] or args['tune_apply']) and (not args['use_raster'] or args['sample'][0]):
+        parser.error('--tune-sample and --tune-apply require --raster without --sample')
+    if args['partition_band'] is not None and (args['use_raster'] or args['type'] != 'postgres'):
+        parser.error('--partition-band requires --type postgres without raster')
+    if args['partition_band'] is not None and not 1 <= args['partition_band'] <= 90:
+        parser.error('--partition-band must be between 1 and 90')
 
     # logging
     traceback = args.pop('traceback')
@@ -177,46 +336,112 @@ def load_hgt():
 
     # Pop everything not related to database uri string
     concurrency = args.pop('concurrency')
+    executor = args.pop('executor')
+    writers = args.pop('writers')
+    stats_file = args.pop('stats_file')
+    batch_size = args.pop('batch_size')
+    resume = args.pop('resume')
+    bulk = args.pop('bulk')
+    unlogged = args.pop('unlogged')
+    cluster = args.pop('cluster')
+    merge_runs = args.pop('merge_runs')
+    incremental = args.pop('incremental')
+    resample = args.pop('resample')
+    resample_method = args.pop('resample_method')
+    resample = (resample, resample_method) if resample else None
     folder = args.pop('folder')
     use_raster = args.pop('use_raster')
     samples = args.pop('sample')
+    tune_sample = 'apply' if args.pop('tune_apply') else 'recommend' if args.pop('tune_sample') else None
+    overviews = args.pop('overviews') or ()
     db_driver = args.pop('type')
     table_name = args.pop('table')
+    method = args.pop('method')
+    schema = args.pop('schema')
+    partition_band = args.pop('partition_band')
     check_raster2pgsql = args.pop('check_raster2pgsql')
 
     # sqlalchemy.engine.url.URL args
     db_info = args
 
     # If postgres driver and raster2pgsql is available, propose to use this solution instead.
-    if db_driver == 'postgres' and use_raster and check_raster2pgsql and tools.check_for_raster2pgsql():
+    if db_driver == 'postgres' and use_raster and check_raster2pgsql and not resample and not overviews and \
+            not tune_sample and tools.check_for_raster2pgsql(folder, table_name, samples):
         sys.exit(0)
 
     logging.info('config - parallelism : %i' % concurrency)
+    logging.info('config - executor : %s' % executor)
+    logging.info('config - writers : {}'.format(writers or 'none'))
     logging.info('config - folder : %s' % folder)
+    logging.debug('config - batch size : {}'.format(batch_size or 'default'))
+    logging.debug('config - resume : %s' % resume)
+    logging.info('config - bulk : %s' % bulk)
+    logging.info('config - merge runs : %s' % merge_runs)
+    logging.info('config - incremental : %s' % incremental)
+    logging.info('config - resample : {}'.format('{} {}x{}'.format(resample[1], resample[0], resample[0])
+                                                 if resample else 'none'))
+    if bulk:
+        logging.debug('config - unlogged : %s' % unlogged)
+        logging.debug('config - cluster : %s' % cluster)
     logging.info('config - db driver : %s' % db_driver)
     logging.info('config - db host : %s' % db_info.get('host'))
     logging.info('config - db user : %s' % db_info.get('username'))
     logging.info('config - db name : %s' % db_info.get('database'))
     logging.info('config - db table : %s' % table_name)
+    logging.info('config - loading method : %s' % method)
+    logging.info('config - schema : %s' % schema)
+    logging.info('config - partition band : {}'.format('{} degrees'.format(partition_band)
+                                                       if partition_band else 'none'))
     if use_raster:
         logging.debug('config - use raster : %s' % use_raster)
         logging.debug('config - raster sampling : {}'.format('{}x{}'.format(*samples) if samples[0] else 'none'))
+        logging.debug('config - tune sample : {}'.format(tune_sample or 'none'))
+        logging.debug('config - overviews : {}'.format(', '.join(str(factor) for factor in overviews) or 'none'))
 
     # create sqlalchemy engine
-    factory = database.ManagerFactory(db_driver, table_name, pool_size=concurrency, **db_info)
+    factory = database.ManagerFactory(db_driver, table_name, pool_size=concurrency + (writers or 0),
+                                      batch_size=batch_size, method=method, bulk=bulk, schema=schema,
+                                      overviews=overviews, partition_band=partition_band, **db_info)
 
+    collector = metrics.MetricsCollector('load')
     try:
         # First validate that the database is ready
         with factory.get_manager(use_raster) as manager:
-            manager.prepare_environment()
+            manager.prepare_environment(unlogged=unlogged)
+            if incremental:
+                manager.create_block_hashes()
+
+        # Benchmark the raster sizes before the load
+        if tune_sample:
+            best = tools.tune_raster_sample(folder, factory, concurrency)[0]['sample']
+            logging.info('tune - recommended sample : {}'.format(
+                '--sample {0} {0}'.format(best) if best else 'one raster per file (no --sample)'))
+            if tune_sample == 'recommend':
+                return sys.exit(0)
+            samples = (best, best)
 
         # Then process HGT files
-        tools.import_hgt_zip_files(folder, concurrency, factory, use_raster, samples)
+        start = time.time()
+        tools.import_hgt_zip_files(folder, concurrency, factory, use_raster, samples, executor=executor,
+                                   resume=resume, merge_runs=merge_runs, writers=writers, collector=collector,
+                                   resample=resample, incremental=incremental)
+        logging.info('phase - load : {:.1f}s'.format(time.time() - start))
+
+        # Finally build the indexes deferred by the bulk mode
+        if bulk:
+            with factory.get_manager(use_raster) as manager:
+                manager.optimize(cluster=cluster, unlogged=unlogged)
     except sqlalchemy.exc.OperationalError:
         logging.error('Unable to connect to database with these settings : {}'.format(factory.engine.url),
                       exc_info=traceback)
-    except database.NotSupportedException:
-        logging.error('Database does not support raster settings. Have you enabled GIS extension ?', exc_info=traceback)
+    except database.TableExistsException:
+        logging.error('Table {} already exists with its indexes. The bulk mode needs a table without '
+                      'index.'.format(table_name),
+                      exc_info=traceback)
+        return sys.exit(1)
+    except database.NotSupportedException as e:
+        logging.error('Database does not support these settings ({}). Have you enabled GIS extension '
+                      '(or local_infile for MySQL) ?'.format(str(e)), exc_info=traceback)
         return sys.exit(1)
     except KeyboardInterrupt:
         return sys.exit(0)
@@ -227,4 +452,146 @@ def load_hgt():
     except Exception as e:
         logging.error('Unknown error : {}'.format(str(e)), exc_info=traceback)
         return sys.exit(1)
+    finally:
+        if stats_file:
+            metrics.write_stats_file(stats_file, [collector])
+    return sys.exit(0)
+
+
+def create_export_hgt_parser():
+    """ CLI parser for gmalt-hgtexport
+
+    :return: cli parser
+    :rtype: :class:`argparse.ArgumentParser`
+    """
+    parser = argparse.ArgumentParser(description='Read HGT files and write them in files the database can ingest '
+                                                 'natively, one output file per HGT file')
+    parser.add_argument('folder', type=tools.existing_folder,
+                        help='Path to the folder where the HGT files are stored.')
+    parser.add_argument('output', type=tools.writable_folder,
+                        help='Path to the folder where the output files will be written.')
+    parser.add_argument('-f', '--format', type=str, dest='format', default='csv',
+                        choices=sorted(export.ExporterRegistry.REGISTRY),
+                        help='The output format : CSV, PostgreSQL binary COPY, Parquet (requires pyarrow) or '
+                             'PostGIS rasters in PostgreSQL text COPY (default : csv)')
+    parser.add_argument('-s', '--sample', nargs=2, type=int, dest='sample', metavar=('LNG_SAMPLE', 'LAT_SAMPLE'),
+                        default=(None, None), help="With the pgraster format, separate a HGT file in multiple "
+                                                   "rasters. Sample on lng axis and lat axis.")
+    parser.add_argument('-c', type=int, dest='concurrency', default=1,
+                        help='How many worker will attempt to export files in parallel')
+    parser.add_argument('--executor', type=str, dest='executor', default='thread', choices=['thread', 'process'],
+                        help='Export files in a pool of threads or in a pool of processes (default : thread)')
+    parser.add_argument('--stats-file', type=str, dest='stats_file',
+                        help='Write the metrics of the workers (counters, timers, rates) in this JSON file at exit')
+    parser.add_argument('--overwrite', dest='overwrite', action='store_true',
+                        help='Write again the output files which already exist')
+    parser.add_argument('-v', dest='verbose', action='store_true', help='increase verbosity level')
+    return parser
+
+
+def export_hgt():
+    """ Function called by the console_script `gmalt-hgtexport`
+
+    Usage:
+
+        gmalt-hgtexport [options] <folder> <output folder>
+    """
+    # Parse command line arguments
+    parser = create_export_hgt_parser()
+    args = parser.parse_args()
+
+    tools.configure_logging(args.verbose)
+
+    logging.info('config - parallelism : %i' % args.concurrency)
+    logging.info('config - executor : %s' % args.executor)
+    logging.info('config - folder : %s' % args.folder)
+    logging.info('config - output folder : %s' % args.output)
+    logging.info('config - format : %s' % args.format)
+
+    collector = metrics.MetricsCollector('export')
+    try:
+        start = time.time()
+        tools.export_hgt_files(args.folder, args.output, args.concurrency,
+                               export.ExporterRegistry.get_exporter_class(args.format), args.sample,
+                               executor=args.executor, overwrite=args.overwrite, collector=collector)
+        logging.info('phase - export : {:.1f}s'.format(time.time() - start))
+    except KeyboardInterrupt:
+        return sys.exit(0)
+    except worker.WorkerPoolException:
+        # in case of ThreadPoolException, the worker which raised the error
+        # logs it using logging.exception
+        return sys.exit(1)
+    except Exception as exception:
+        logging.exception(exception)
+        return sys.exit(1)
+    finally:
+        if args.stats_file:
+            metrics.write_stats_file(args.stats_file, [collector])
+    return sys.exit(0)
+
+
+def create_serve_hgt_parser():
+    """ CLI parser for gmalt-hgtserve
+
+    :return: cli parser
+    :rtype: :class:`argparse.ArgumentParser`
+    """
+    parser = argparse.ArgumentParser(description='Serve the elevation of points over HTTP. The HGT files are indexed '
+                                                 'once and kept memory-mapped between the requests.')
+    parser.add_argument('hgt_path', type=str,
+                        help='The folder of the HGT files (example: path/to/downloaded/hgt/files) or a HGT file')
+    parser.add_argument('--host', type=str, dest='host', default='127.0.0.1',
+                        help='The host to listen on (default : 127.0.0.1)')
+    parser.add_argument('--port', type=int, dest='port', default=8080, help='The port to listen on (default : 8080)')
+    parser.add_argument('--socket', type=str, dest='socket', metavar='PATH',
+                        help='Serve the same requests on the Unix socket PATH too')
+    parser.add_argument('--interpolate', type=str, dest='interpolate', default='nearest', choices=lookup.INTERPOLATIONS,
+                        help='The interpolation of the requests without interpolate parameter (default : nearest)')
+    parser.add_argument('--max-tiles', type=int, dest='max_tiles', default=lookup.CACHE_MAX_TILES, metavar='N',
+                        help='The maximum number of HGT files kept memory-mapped, the least recently used file is '
+                             'closed first (default : {})'.format(lookup.CACHE_MAX_TILES))
+    parser.add_argument('--max-mapped', type=int, dest='max_mapped', metavar='MB',
+                        help='The maximum size in MB of the HGT files kept memory-mapped (default : no limit)')
+    parser.add_argument('-v', dest='verbose', action='store_true', help='increase verbosity level')
+    return parser
+
+
+def serve_hgt():
+    """ Function called by the console_script `gmalt-hgtserve`
+
+    Usage:
+
+        gmalt-hgtserve [options] <path to hgt folder or file>
+
+    Serve until interrupted (see :class:`gmaltcli.server.ElevationRequestHandler` for the endpoints)
+    """
+    parser = create_serve_hgt_parser()
+    args = parser.parse_args()
+    if args.max_tiles < 1 or (args.max_mapped is not None and args.max_mapped < 1):
+        parser.error('--max-tiles and --max-mapped must be positive')
+
+    tools.configure_logging(args.verbose)
+
+    logging.info('config - path : %s' % args.hgt_path)
+    logging.info('config - interpolation : %s' % args.interpolate)
+    logging.info('config - max tiles : %i' % args.max_tiles)
+
+    try:
+        service = server.ElevationService(args.hgt_path, args.max_tiles,
+                                          args.max_mapped * 1024 * 1024 if args.max_mapped else None,
+                                          args.interpolate)
+    except Exception as e:
+        logging.error(str(e))
+        return sys.exit(1)
+
+    try:
+        server.serve(service, args.host, args.port, args.socket)
+    except KeyboardInterrupt:
+        pass
+    except Exception as exception:
+        logging.exception(exception)
+        return sys.exit(1)
+    finally:
+        logging.info('stats - {}'.format(service.stats()['cache']))
+        service.close()
     return sys.exit(0)
@@ -1,11 +1,30 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+import time
+import struct
+import binascii
 import logging
-
+import tempfile
+import threading
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+import numpy
+import gmalthgtparser as hgt
 from future.utils import with_metaclass
 from sqlalchemy import create_engine as sqlalchemy_create_engine
 import sqlalchemy.engine.url as sql_url
+import sqlalchemy.event
 import sqlalchemy.exc
 
+import gmaltcli.metrics as metrics
+
 
 class NotSupportedException(sqlalchemy.exc.SQLAlchemyError):
     """ Exception raised if database does not support the provided settings. Most probably because
@@ -13,31 +32,49 @@ class NotSupportedException(sqlalchemy.exc.SQLAlchemyError):
     pass
 
 
+class TableExistsException(sqlalchemy.exc.SQLAlchemyError):
+    """ Exception raised in bulk mode if the table to store the elevation data already exists with its indexes """
+    pass
+
+
+class WriterException(sqlalchemy.exc.SQLAlchemyError):
+    """ Exception raised in an import worker if the queries it submitted to a
+    :class:`gmaltcli.database.SqliteWriter` failed """
+    pass
+
+
 class ManagerRegistry(type):
     """ Python Registry pattern to store all manager.
 
     .. note:: A manager extends :class:`gmaltcli.database.BaseManager` to insert elevation data
         into the database. A database driver may have multiple manager if gmalt supports multiple
-        schema for this one.
+        schema (standard, grid) or multiple loading methods (INSERT, COPY) for this one.
     """
     REGISTRY = {}
 
     def __new__(cls, *args, **kwargs):
         new_cls = type.__new__(cls, *args, **kwargs)
-        cls.REGISTRY[(new_cls.TYPE, new_cls.USE_RASTER)] = new_cls
+        cls.REGISTRY[(new_cls.TYPE, new_cls.USE_RASTER, new_cls.SCHEMA, new_cls.METHOD)] = new_cls
         return new_cls
 
     @staticmethod
-    def get_manager_class(db_driver, use_raster):
-        """ Get a manager class matching the database driver and the model (raster support or not)
+    def get_manager_class(db_driver, use_raster, method='insert', schema='standard'):
+        """ Get a manager class matching the database driver, the model (raster support or not),
+        the loading method and the schema
 
         :param str db_driver: the database drive
         :param bool use_raster: True if the manager must be of raster type (GIS extension in database)
+        :param str method: the loading method (`insert` or `copy`)
+        :param str schema: the schema of the table without raster (`standard` or `grid`)
         :return: :class:`gmaltcli.database.BaseManager`
         """
-        if (db_driver, use_raster) not in ManagerRegistry.REGISTRY:
+        if not any(key[0] == db_driver for key in ManagerRegistry.REGISTRY):
             raise Exception('Unknown database driver {}'.format(db_driver))
-        return ManagerRegistry.REGISTRY[(db_driver, use_raster)]
+        if (db_driver, use_raster, schema, method) not in ManagerRegistry.REGISTRY:
+            raise NotSupportedException('Method {} is not supported by database driver {}{}{}'.format(
+                method, db_driver, ' with raster' if use_raster else '',
+                ' with schema {}'.format(schema) if schema != 'standard' else ''))
+        return ManagerRegistry.REGISTRY[(db_driver, use_raster, schema, method)]
 
 
 class Manager(object):
@@ -48,10 +85,40 @@ class Manager(object):
         Here it uses the :class:`gmaltcli.database.ManagerRegistry` to return the right manager when
         developer instantiates the Manager.
 
+        .. note:: the optional `method` and `schema` keywords select the loading method and the schema
+            of the manager
+
         :return: a manager object
         :rtype: :class:`gmaltcli.database.BaseManager`
         """
-        return ManagerRegistry.get_manager_class(db_driver, use_raster)(*args, **kwargs)
+        method = kwargs.pop('method', 'insert')
+        schema = kwargs.pop('schema', 'standard')
+        return ManagerRegistry.get_manager_class(db_driver, use_raster, method, schema)(*args, **kwargs)
+
+
+# Pragmas of each SQLite connection : write-ahead log for concurrent reads during the single writer transactions,
+# no fsync on each commit, 256MB of page cache and wait for the lock instead of failing
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-262144',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=60000',
+)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """ Listener of the `connect` event of a SQLite sqlalchemy engine which applies `SQLITE_PRAGMAS`
+
+    :param dbapi_connection: the new sqlite3 connection
+    :param connection_record: the sqlalchemy connection record (not used)
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
 
 
 class ManagerFactory(object):
@@ -59,10 +126,29 @@ class ManagerFactory(object):
 
     .. seealso: :func:`gmaltcli.database.ManagerBuilder.__create_engine` for details on constructor args
     """
-    def __init__(self, type_, table_name, pool_size=1, **db_info):
+    def __init__(self, type_, table_name, pool_size=1, batch_size=None, method='insert', bulk=False,
+                 schema='standard', overviews=(), partition_band=None, **db_info):
         self.db_driver = type_
         self.table_name = table_name
-        self.engine = self.__create_engine(type_, pool_size=pool_size, **db_info)
+        self.batch_size = batch_size
+        self.method = method
+        self.bulk = bulk
+        self.schema = schema
+        self.overviews = tuple(overviews or ())
+        self.partition_band = partition_band
+        self.engine_info = dict(db_info, pool_size=pool_size)
+        self.engine = self.__create_engine(type_, **self.engine_info)
+
+    def __getstate__(self):
+        """ The engine is not pickled, it is created again from the same settings when unpickled (for example
+        in each process of a :class:`gmaltcli.worker.ProcessWorkerPool`) """
+        state = self.__dict__.copy()
+        del state['engine']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.engine = self.__create_engine(self.db_driver, **self.engine_info)
 
     @staticmethod
     def __create_engine(type_, pool_size=1, debug=False, **db_info):
@@ -70,18 +156,53 @@ class ManagerFactory(object):
 
         .. seealso:: supports all keywords arguments of constructor :class:`sqlalchemy.engine.url.URL`
 
-        :param str type_: the type of engine (postgres, mysql)
+        .. note:: for mysql, the engine uses the PyMySQL driver with `LOAD DATA LOCAL INFILE` enabled
+
+        .. note:: for sqlite, only the `database` argument (path of the database file) is used and the engine
+            does not pool its connections
+
+        :param str type_: the type of engine (postgres, mysql, sqlite)
         :param int pool_size: pool size of the engine (at least as much as the number of threads
             in :class:`gmaltcli.worker.WorkerPool`)
         :param bool debug: Enable echo parameters of sqlalchemy engine
         :return: a sqlalchemy engine
         :rtype: :class:`sqlalchemy.engine.base.Engine`
         """
+        if type_ == 'mysql':
+            # LOAD DATA LOCAL INFILE must be enabled on the client side
+            uri = sql_url.URL('mysql+pymysql', **db_info)
+            return sqlalchemy_create_engine(uri, pool_size=pool_size, echo=debug, connect_args={'local_infile': True})
+
+        if type_ == 'sqlite':
+            engine = sqlalchemy_create_engine(sql_url.URL(type_, database=db_info.get('database')), echo=debug)
+            sqlalchemy.event.listen(engine, 'connect', set_sqlite_pragmas)
+            return engine
+
         uri = sql_url.URL(type_, **db_info)
         return sqlalchemy_create_engine(uri, pool_size=pool_size, echo=debug)
 
+    def with_table(self, table_name):
+        """ Get a factory of managers of another table sharing the engine of this factory
+
+        :param str table_name: the name of the other table
+        :return: a factory with the same settings
+        :rtype: :class:`gmaltcli.database.ManagerFactory`
+        """
+        # not copied with `copy` which would create another engine through `__getstate__`
+        factory = self.__class__.__new__(self.__class__)
+        factory.__dict__.update(self.__dict__, table_name=table_name)
+        return factory
+
     def get_manager(self, use_raster=False):
-        return Manager(self.db_driver, use_raster, self.engine, self.table_name)
+        # the schema and the partitions only apply to the table without raster and the overviews to the table
+        # with raster
+        manager = Manager(self.db_driver, use_raster, self.engine, self.table_name, batch_size=self.batch_size,
+                          method=self.method, schema='standard' if use_raster else self.schema, bulk=self.bulk)
+        if use_raster:
+            manager.overviews = self.overviews
+        else:
+            manager.partition_band = self.partition_band
+        return manager
 
 
 class BaseManager(object):
@@ -90,24 +211,95 @@ class BaseManager(object):
     .. note:: child class needs to define the different queries and the `prepare_params`
         method (which provides the parameters for the queries)
 
-    .. note:: manager object needs to be accessed using a context manager
+    .. note:: manager object needs to be accessed using a context manager. Elevation data are buffered
+        and inserted by batch of `batch_size` rows, the remaining rows are flushed when leaving the context manager
+
+    .. note:: the import of each HGT file is recorded in a ledger table `{table_name}_ledger`. The data of a file
+        are inserted between `start_tile` and `end_tile` in a single transaction which also marks the file as
+        done in the ledger so that an interrupted import can be resumed without the files already imported
+
+    .. note:: in bulk mode, the table is created without its indexes by `prepare_environment` and the data are
+        inserted without deduplication. The indexes are built once all the data are loaded by `optimize`.
+
+    .. note:: each batch of rows is encoded by `encode_rows` then sent by `send_rows`. If a `sink` callable is
+        set, the encoded batches are passed to it instead of being sent (see :class:`gmaltcli.worker.ImportPipeline`)
+
+    .. note:: the time spent encoding, sending and committing the rows is added to the `encode`, `execute` and
+        `commit` timers of `metrics`, the worker using the manager sets its own :class:`gmaltcli.metrics.Metrics`
+
+    .. note:: the managers supporting the incremental import (`BLOCK_DELETE_QUERY`) record the md5 checksum of
+        each block of lines of the imported files in the table `{table_name}_block`. When a file changes, only
+        its changed blocks are deleted (see `delete_block`) and inserted again.
+
+    .. note:: the raster managers supporting overviews (`OVERVIEW_CREATE_QUERY`) also store each HGT file
+        downsampled by the factors of `overviews` in the tables `o_{factor}_{table_name}` (see `insert_overviews`)
+
+    .. note:: the managers supporting partitions (`PARTITIONED_TABLE_CREATE_QUERY`) create the table partitioned
+        by bands of `partition_band` degrees of latitude (see `get_partitions`). The rows are inserted in the table
+        and routed to their partition by the database.
 
     :param engine: a sqlalchemy engine
     :type engine: :class:`sqlalchemy.engine.base.Engine`
     :param str table_name: the name of the table to store the elevation value
+    :param int batch_size: number of rows inserted by a single query (default to `DEFAULT_BATCH_SIZE`)
+    :param bool bulk: True to load the data in bulk mode
     """
     TYPE = None
     USE_RASTER = None
+    SCHEMA = 'standard'
+    METHOD = 'insert'
+
+    DEFAULT_BATCH_SIZE = 1
 
     TABLE_EXISTS_QUERY = None
     TABLE_CREATE_QUERY = None
-    VALUE_EXIST_QUERY = None
+    INDEX_EXISTS_QUERY = None
+    INDEX_CREATE_QUERY = None
+    DEDUPLICATE_QUERY = None
+    HELPERS_CREATE_QUERY = None
+    ANALYZE_QUERY = None
+    CLUSTER_QUERY = None
+    SET_LOGGED_QUERY = None
     VALUE_CREATE_QUERY = None
+    VALUE_ROW_TEMPLATE = None
+    VALUE_COLUMNS = None
+
+    LEDGER_CREATE_QUERY = None
+    LEDGER_START_QUERY = None
+    LEDGER_DONE_QUERY = None
+    LEDGER_DONE_TILES_QUERY = None
+
+    OVERVIEW_CREATE_QUERY = None
+    OVERVIEW_VALUE_CREATE_QUERY = None
+
+    PARTITIONED_TABLE_CREATE_QUERY = None
+    PARTITION_CREATE_QUERY = None
+    PARTITIONED_QUERY = None
 
-    def __init__(self, engine, table_name):
+    BLOCK_DELETE_QUERY = None
+    BLOCK_HASH_CREATE_QUERY = None
+    BLOCK_HASH_SELECT_QUERY = None
+    BLOCK_HASH_DELETE_QUERY = None
+    BLOCK_HASH_INSERT_QUERY = None
+
+    # Used by the raster size tuner (see :func:`gmaltcli.tools.tune_raster_sample`)
+    TABLE_SIZE_QUERY = None
+    POINT_QUERY = None
+    DROP_QUERY = None
+
+    def __init__(self, engine, table_name, batch_size=None, bulk=False):
         self.engine = engine
         self.table_name = table_name
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        self.bulk = bulk
         self.connection = None
+        self.transaction = None
+        self.buffer = []
+        self.nb_rows = 0
+        self.sink = None
+        self.metrics = metrics.Metrics()
+        self.overviews = ()
+        self.partition_band = None
 
     def __enter__(self):
         if not self.connection:
@@ -115,8 +307,15 @@ class BaseManager(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.connection:
-            self.connection.close()
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.buffer = []
+            # an uncommitted tile transaction is rolled back when the connection is closed
+            self.transaction = None
+            if self.connection:
+                self.connection.close()
 
     def _execute(self, connection, query, params=None, method='fetchall'):
         """ Execute the SQL `query` with the binded `params` and call the `method` on the result cursor
@@ -131,8 +330,9 @@ class BaseManager(object):
             sqlalchemy result cursor (see method from :class:`sqlalchemy.engine.ResultProxy`)
         :return: the result of the query or None
         """
-        params = params or {}
-        params.update({'table_name': self.table_name})
+        params = dict(params or {})
+        # a partition is managed with the queries of the table by providing its name as `table_name`
+        params.setdefault('table_name', self.table_name)
         # print(conn.connection.cursor().mogrify(query.format(**params), params))
         result = connection.execute(query.format(**params), params)
         if result.returns_rows:
@@ -158,16 +358,322 @@ class BaseManager(object):
         """
         return self.execute(self.TABLE_EXISTS_QUERY, method='scalar')
 
-    def create_table(self):
+    def create_table(self, unlogged=False):
         """ Execute the `TABLE_CREATE_QUERY` query
 
+        .. note:: with `partition_band`, the table is created by the `PARTITIONED_TABLE_CREATE_QUERY` query then
+            its partitions by the `PARTITION_CREATE_QUERY` query in the same transaction. The partitions are
+            UNLOGGED instead of the table.
+
+        :param bool unlogged: True to create an UNLOGGED table (not written to the write-ahead log)
+        :return: None
+        :raise NotSupportedException: with `partition_band` if the manager does not support partitions
+        """
+        if not self.partition_band:
+            return self.execute(self.TABLE_CREATE_QUERY, {'unlogged': 'UNLOGGED ' if unlogged else ''})
+
+        if not self.PARTITIONED_TABLE_CREATE_QUERY:
+            raise NotSupportedException('Partitions are not supported by {}'.format(self.__class__.__name__))
+        with self.connection.begin():
+            self._execute(self.connection, self.PARTITIONED_TABLE_CREATE_QUERY)
+            for partition_name, bound_from, bound_to in self.get_partitions():
+                self._execute(self.connection, self.PARTITION_CREATE_QUERY,
+                              {'unlogged': 'UNLOGGED ' if unlogged else '', 'partition_name': partition_name,
+                               'bound_from': bound_from, 'bound_to': bound_to})
+
+    def is_partitioned(self):
+        """ Execute the `PARTITIONED_QUERY` query
+
+        :return: True if the table is partitioned
+        :rtype: bool
+        """
+        return bool(self.PARTITIONED_QUERY and self.execute(self.PARTITIONED_QUERY, method='scalar'))
+
+    def get_partitions(self):
+        """ Get the partitions of the table, one per band of `partition_band` degrees of latitude from -90 to 90
+
+        .. note:: the partitions are named after the latitude of the bottom of their band like the HGT files
+            (`{table_name}_s10`, `{table_name}_n00`, ...). The first partition has no lower bound and the last
+            partition no upper bound as the squares of the edges of the HGT files extend beyond their latitude.
+
+        :return: the name, the lower bound and the upper bound of each partition as SQL literals
+        :rtype: list[(str, str, str)]
+        """
+        partitions = []
+        for lat in range(-90, 90, self.partition_band):
+            partitions.append(('{}_{}{:02d}'.format(self.table_name, 's' if lat < 0 else 'n', abs(lat)),
+                               'MINVALUE' if lat == -90 else str(self.partition_bound(lat)),
+                               'MAXVALUE' if lat + self.partition_band >= 90
+                               else str(self.partition_bound(lat + self.partition_band))))
+        return partitions
+
+    @staticmethod
+    def partition_bound(lat):
+        """ Get the value of the partition key at a latitude
+
+        :param int lat: the latitude in degrees
+        :return: the value of the partition key
+        :rtype: int
+        """
+        return lat
+
+    def indexes_exist(self):
+        """ Execute the `INDEX_EXISTS_QUERY` query
+
+        :return: 1 if the indexes of the table exist else None
+        :rtype: int
+        """
+        return self.execute(self.INDEX_EXISTS_QUERY, method='scalar')
+
+    def create_helpers(self):
+        """ Execute the `HELPERS_CREATE_QUERY` query if the schema provides helpers (tables or SQL functions
+        used to read the elevation data)
+
         :return: None
         """
-        return self.execute(self.TABLE_CREATE_QUERY)
+        if self.HELPERS_CREATE_QUERY:
+            return self.execute(self.HELPERS_CREATE_QUERY)
+
+    def create_overviews(self):
+        """ Execute the `OVERVIEW_CREATE_QUERY` query for each factor of `overviews` which creates the overview
+        table if it does not exist and registers it as an overview of the table
+
+        :return: None
+        :raise NotSupportedException: if the manager has no `OVERVIEW_CREATE_QUERY`
+        """
+        if not self.OVERVIEW_CREATE_QUERY:
+            raise NotSupportedException('Overviews are not supported by {}'.format(self.__class__.__name__))
+        for factor in self.overviews:
+            self.execute(self.OVERVIEW_CREATE_QUERY,
+                         {'factor': factor, 'overview_table': 'o_{}_{}'.format(factor, self.table_name)})
+
+    def deduplicate(self):
+        """ Execute the `DEDUPLICATE_QUERY` query if the schema needs it
+
+        :return: None
+        """
+        if self.DEDUPLICATE_QUERY:
+            return self.execute(self.DEDUPLICATE_QUERY)
+
+    def create_indexes(self):
+        """ Execute the `INDEX_CREATE_QUERY` query
+
+        :return: None
+        """
+        return self.execute(self.INDEX_CREATE_QUERY)
+
+    def analyze(self):
+        """ Execute the `ANALYZE_QUERY` query
+
+        :return: None
+        """
+        return self.execute(self.ANALYZE_QUERY)
+
+    def cluster(self):
+        """ Execute the `CLUSTER_QUERY` query, on each partition with `partition_band`
+
+        :return: None
+        """
+        if not self.partition_band:
+            return self.execute(self.CLUSTER_QUERY)
+        for partition_name, bound_from, bound_to in self.get_partitions():
+            self.execute(self.CLUSTER_QUERY, {'table_name': partition_name})
+
+    def set_logged(self):
+        """ Execute the `SET_LOGGED_QUERY` query, on each partition with `partition_band`
+
+        :return: None
+        """
+        if not self.partition_band:
+            return self.execute(self.SET_LOGGED_QUERY)
+        for partition_name, bound_from, bound_to in self.get_partitions():
+            self.execute(self.SET_LOGGED_QUERY, {'table_name': partition_name})
+
+    def optimize(self, cluster=False, unlogged=False):
+        """ Remove the duplicated rows of a table loaded in bulk mode, build its indexes, update its statistics and
+        optionally cluster it and write it to the write-ahead log
+
+        .. note:: two adjacent HGT files share their edge values, these values are loaded twice in bulk mode
+
+        .. note:: the cluster and logged phases are skipped if the database does not support them (no query)
+
+        :param bool cluster: True to physically reorder the table according to its index
+        :param bool unlogged: True if the table has been created UNLOGGED, it is set LOGGED at the end
+        :return: the name and the duration in seconds of each phase
+        :rtype: list[(str, float)]
+        """
+        phases = [('deduplicate', self.deduplicate), ('index', self.create_indexes), ('analyze', self.analyze)]
+        if cluster and self.CLUSTER_QUERY:
+            phases.append(('cluster', self.cluster))
+        if unlogged and self.SET_LOGGED_QUERY:
+            phases.append(('logged', self.set_logged))
+
+        durations = []
+        for name, phase in phases:
+            start = time.time()
+            phase()
+            durations.append((name, time.time() - start))
+            logging.info('phase - {} : {:.1f}s'.format(name, durations[-1][1]))
+        return durations
+
+    def get_table_size(self):
+        """ Execute the `TABLE_SIZE_QUERY` query
+
+        :return: the size in bytes of the table and the size in bytes of its indexes
+        :rtype: tuple
+        :raise NotSupportedException: if the manager has no `TABLE_SIZE_QUERY`
+        """
+        if not self.TABLE_SIZE_QUERY:
+            raise NotSupportedException('Table size is not supported by {}'.format(self.__class__.__name__))
+        return tuple(self.execute(self.TABLE_SIZE_QUERY)[0])
+
+    def get_point_value(self, lat, lng):
+        """ Execute the `POINT_QUERY` query
+
+        :param float lat: the latitude of the point
+        :param float lng: the longitude of the point
+        :return: the elevation value at the point or None
+        :rtype: int
+        :raise NotSupportedException: if the manager has no `POINT_QUERY`
+        """
+        if not self.POINT_QUERY:
+            raise NotSupportedException('Point query is not supported by {}'.format(self.__class__.__name__))
+        return self.execute(self.POINT_QUERY, {'lat': lat, 'lng': lng}, method='scalar')
+
+    def drop_table(self):
+        """ Execute the `DROP_QUERY` query which drops the table and its ledger if they exist
+
+        :return: None
+        :raise NotSupportedException: if the manager has no `DROP_QUERY`
+        """
+        if not self.DROP_QUERY:
+            raise NotSupportedException('Drop table is not supported by {}'.format(self.__class__.__name__))
+        return self.execute(self.DROP_QUERY)
+
+    def create_ledger(self):
+        """ Execute the `LEDGER_CREATE_QUERY` query which creates the ledger table if it does not exist
+
+        :return: None
+        """
+        return self.execute(self.LEDGER_CREATE_QUERY)
+
+    def get_done_tiles(self):
+        """ Execute the `LEDGER_DONE_TILES_QUERY` query
+
+        :return: the size and the modification time of each file completely imported, by file name
+        :rtype: dict
+        """
+        return dict((row[0], (row[1], row[2])) for row in self.execute(self.LEDGER_DONE_TILES_QUERY))
+
+    def get_done_hashes(self):
+        """ Execute the `LEDGER_DONE_TILES_QUERY` query
+
+        :return: the md5 checksum of each file completely imported, by file name
+        :rtype: dict
+        """
+        return dict((row[0], row[3]) for row in self.execute(self.LEDGER_DONE_TILES_QUERY))
+
+    def create_block_hashes(self):
+        """ Execute the `BLOCK_HASH_CREATE_QUERY` query which creates the table of the checksums of the blocks
+        if it does not exist
+
+        :return: None
+        :raise NotSupportedException: if the manager does not support the incremental import
+        """
+        if not self.BLOCK_DELETE_QUERY:
+            raise NotSupportedException('Incremental import is not supported by {}'.format(self.__class__.__name__))
+        return self.execute(self.BLOCK_HASH_CREATE_QUERY)
+
+    def get_block_hashes(self, tile):
+        """ Execute the `BLOCK_HASH_SELECT_QUERY` query
+
+        :param str tile: the name of the file
+        :return: the md5 checksum of each block of the file, by first line of the block
+        :rtype: dict
+        """
+        return dict((row[0], row[1]) for row in self.execute(self.BLOCK_HASH_SELECT_QUERY, {'tile': tile}))
+
+    def record_block_hashes(self, tile, hashes):
+        """ Replace the checksums of the blocks of a file with `BLOCK_HASH_DELETE_QUERY` and
+        `BLOCK_HASH_INSERT_QUERY` in the transaction of the file
+
+        :param str tile: the name of the file
+        :param dict hashes: the md5 checksum of each block of the file, by first line of the block
+        """
+        self.execute(self.BLOCK_HASH_DELETE_QUERY, {'tile': tile})
+        for line, md5digest in sorted(hashes.items()):
+            self.execute(self.BLOCK_HASH_INSERT_QUERY, {'tile': tile, 'line': line, 'hash': md5digest})
+
+    def delete_block(self, lat_min, lng_min, lat_max, lng_max):
+        """ Execute the `BLOCK_DELETE_QUERY` query which deletes the rows inside the bounds of a block in the
+        transaction of the file
+
+        .. note:: the bounds are computed like the bounds of the rows (see
+            :func:`gmaltcli.reader.HgtBlockReader.get_block_bounds`) so they are compared exactly
+
+        :param float lat_min: the bottom latitude of the block
+        :param float lng_min: the left longitude of the block
+        :param float lat_max: the top latitude of the block
+        :param float lng_max: the right longitude of the block
+        """
+        self.execute(self.BLOCK_DELETE_QUERY, {'lat_min': lat_min, 'lng_min': lng_min, 'lat_max': lat_max,
+                                               'lng_max': lng_max})
+
+    def record_tile_start(self, tile):
+        """ Record the import of a file as started in the ledger
+
+        :param dict tile: the file information (`tile`, `size`, `mtime` and `hash` keys) provided
+            by :func:`gmaltcli.worker.get_tile_info`
+        """
+        self.execute(self.LEDGER_START_QUERY, dict(tile))
+
+    def record_tile_done(self, tile, nb_rows):
+        """ Record the import of a file as done in the ledger
+
+        :param dict tile: the file information provided to `record_tile_start`
+        :param int nb_rows: the number of rows imported
+        """
+        self.execute(self.LEDGER_DONE_QUERY, {'tile': tile['tile'], 'nb_rows': nb_rows})
+
+    def start_tile(self, tile):
+        """ Record the import of a file as started in the ledger then begin the transaction in which the data
+        of the file are inserted
+
+        :param dict tile: the file information (`tile`, `size`, `mtime` and `hash` keys) provided
+            by :func:`gmaltcli.worker.get_tile_info`
+        """
+        self.record_tile_start(tile)
+        self.nb_rows = 0
+        self.transaction = self.connection.begin()
 
-    def prepare_environment(self):
+    def end_tile(self, tile):
+        """ Flush the buffer, record the import of the file as done in the ledger and commit the transaction
+
+        :param dict tile: the file information provided to `start_tile`
+        """
+        self.flush()
+        self._execute(self.connection, self.LEDGER_DONE_QUERY, {'tile': tile['tile'], 'nb_rows': self.nb_rows})
+        with self.metrics.timer('commit'):
+            self.transaction.commit()
+        self.transaction = None
+
+    def rollback_tile(self):
+        """ Drop the buffer and rollback the transaction of the file. The file stays started in the ledger """
+        self.buffer = []
+        self.transaction.rollback()
+        self.transaction = None
+
+    def prepare_environment(self, unlogged=False):
         """ Check if the database is compatible with the chosen format of the elevation data and create the table to
-        store these data if it does not exist
+        store these data if it does not exist. The ledger table of the imported files is also created
+
+        .. note:: in bulk mode, the table is created without its indexes. An existing table is accepted only
+            without its indexes (a previous bulk load has been interrupted). Without bulk mode, the missing
+            indexes of an existing table are built.
+
+        :param bool unlogged: True to create an UNLOGGED table
+        :raise TableExistsException: in bulk mode if the table already exists with its indexes or with
+            `partition_band` if the table already exists without partitions
         """
         if not self.is_compatible():
             raise NotSupportedException('Database is not compatible with the provided settings')
@@ -176,11 +682,29 @@ class BaseManager(object):
 
         if not self.table_exists():
             logging.debug('Table {} not found. Creation in progress.'.format(self.table_name))
-            self.create_table()
+            self.create_table(unlogged=unlogged)
+            indexes_exist = False
             logging.info('Table {} created.'.format(self.table_name))
         else:
+            if self.partition_band and not self.is_partitioned():
+                raise TableExistsException('Table {} already exists without partitions'.format(self.table_name))
+            indexes_exist = self.indexes_exist()
             logging.debug('Table {} exists. Nothing to create.'.format(self.table_name))
 
+        if self.bulk and indexes_exist:
+            raise TableExistsException('Table {} already exists with its indexes'.format(self.table_name))
+        elif not self.bulk and not indexes_exist:
+            self.create_indexes()
+            logging.debug('Indexes of table {} created.'.format(self.table_name))
+
+        self.create_helpers()
+
+        if self.overviews:
+            self.create_overviews()
+            logging.debug('Overviews {} of table {} created.'.format(self.overviews, self.table_name))
+
+        self.create_ledger()
+
     def is_compatible(self):
         """ Override in child class to check if the database if compatible with the chosen format of elevation
         data (for example, you can check if the PostGIS extension is installed for raster data on PostgreSQL
@@ -191,7 +715,7 @@ class BaseManager(object):
         return True
 
     def prepare_params(self, data, parser):
-        """ Prepare params for SELECT (to check if these elevations data have already been import) or INSERT queries
+        """ Prepare the params of a row inserted by the `VALUE_CREATE_QUERY` query
 
         .. note:: see implementation in child class
 
@@ -199,13 +723,13 @@ class BaseManager(object):
         :type data: tuple
         :param parser: the HGT parser
         :type parser: :class:`gmalthgtparser.HgtParser`
-        :return: dict with the params for both queries
+        :return: dict with the params of the row
         :rtype: dict
         """
         raise Exception('to be implemented in child class')
 
     def insert_data(self, data, parser):
-        """ Insert elevation data if they don't exist in the table yet
+        """ Buffer elevation data and insert the buffer if it contains `batch_size` rows
 
         :param data: data coming from a HGT iterator (:class:`gmalthgtparser.HgtSampleIterator`
             or :class:`gmalthgtparser.HgtValueIterator`)
@@ -215,45 +739,130 @@ class BaseManager(object):
         :rtype: :class:`gmalthgtparser.HgtParser`
         """
         # Don't import void elevation values
-        elevation_value = data[4]
-        if elevation_value == parser.VOID_VALUE:
+        if self.is_void(data, parser):
             return
 
-        params = self.prepare_params(data, parser)
-        value_exists = self.execute(self.VALUE_EXIST_QUERY, params, method='scalar')
-        if not value_exists:
-            self.execute(self.VALUE_CREATE_QUERY, params, method='scalar')
+        self.buffer.append(self.prepare_params(data, parser))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
 
+    def is_void(self, data, parser):
+        """ Check if the elevation data only contain void values
 
-class PostgresValueManager(with_metaclass(ManagerRegistry, BaseManager)):
-    """ Provides SQL queries to import elevation value in a PostgreSQL table WITHOUT PostGIS """
-    TYPE = 'postgres'
-    USE_RASTER = False
+        ..seealso:: :func:`gmaltcli.database.BaseManager.insert_data` for params description
 
-    TABLE_EXISTS_QUERY = ("SELECT EXISTS("
-                          "    SELECT  1"
-                          "    FROM    information_schema.tables"
-                          "    WHERE   table_name=%(table_name)s"
-                          ")")
+        :return: True if the data must not be imported
+        :rtype: bool
+        """
+        return data[4] == parser.VOID_VALUE
 
-    TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" ("
-                          "    lat_min DOUBLE PRECISION,"
-                          "    lng_min DOUBLE PRECISION,"
-                          "    lat_max DOUBLE PRECISION,"
-                          "    lng_max DOUBLE PRECISION,"
-                          "    \"value\" SMALLINT,"
-                          "    PRIMARY KEY (lat_min, lng_min, lat_max, lng_max)"
-                          ");")
+    def insert_block(self, block):
+        """ Buffer a block of elevation data and insert the complete batches of `batch_size` rows
 
-    VALUE_EXIST_QUERY = ("SELECT 1 "
-                         "FROM   \"{table_name}\" "
-                         "WHERE  lat_min=%(lat_min)s"
-                         "       AND lng_min=%(lng_min)s"
-                         "       AND lat_max=%(lat_max)s"
-                         "       AND lng_max=%(lng_max)s;")
+        .. note:: see implementation in child class
 
-    VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
-                          "VALUES (%(lat_min)s, %(lng_min)s, %(lat_max)s, %(lng_max)s, %(value)s)")
+        :param block: block of elevation data without void values
+        :type block: :class:`gmaltcli.reader.HgtBlock`
+        """
+        raise Exception('to be implemented in child class')
+
+    def insert_overviews(self, block_reader, width, height):
+        """ Insert a HGT file downsampled by each factor of `overviews` in the overview tables
+
+        .. note:: see implementation in child class
+
+        :param block_reader: the reader of the HGT file with its values in memory
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :param int width: the number of columns of a raster
+        :param int height: the number of lines of a raster
+        :raise NotSupportedException: if the manager does not support overviews
+        """
+        raise NotSupportedException('Overviews are not supported by {}'.format(self.__class__.__name__))
+
+    def insert_many(self, data_iter, parser):
+        """ Insert all the elevation data of an iterable by batch of `batch_size` rows
+
+        ..seealso:: :func:`gmaltcli.database.BaseManager.insert_data` for params description
+        """
+        for data in data_iter:
+            self.insert_data(data, parser)
+        self.flush()
+
+    def flush(self, partial=True):
+        """ Insert the buffered rows by batch of `batch_size` rows, each batch in a single transaction
+
+        :param bool partial: if False, the last rows which don't fill a complete batch stay in the buffer
+        """
+        nb_rows = len(self.buffer) if partial else len(self.buffer) - len(self.buffer) % self.batch_size
+        for idx in range(0, nb_rows, self.batch_size):
+            self.insert_rows(self.buffer[idx:min(idx + self.batch_size, nb_rows)])
+        self.buffer = self.buffer[nb_rows:]
+        self.nb_rows += nb_rows
+        self.metrics.count('rows', nb_rows)
+
+    def insert_rows(self, rows):
+        """ Encode the rows and send them or pass them to the `sink`
+
+        :param list rows: list of dict provided by `prepare_params`
+        """
+        with self.metrics.timer('encode'):
+            batch = self.encode_rows(rows)
+        if self.sink is not None:
+            return self.sink(batch)
+        with self.metrics.timer('execute'):
+            self.send_rows(batch)
+
+    def encode_rows(self, rows):
+        """ Encode a batch of rows in the format sent by `send_rows`, the params of a multi-row query by default
+
+        :param list rows: list of dict provided by `prepare_params`
+        :return: the encoded batch
+        """
+        return self.bind_rows(rows)
+
+    def send_rows(self, batch):
+        """ Insert the rows which don't exist in the table yet with a single multi-row `VALUE_CREATE_QUERY` query
+
+        :param batch: the batch encoded by `encode_rows`
+        """
+        self.execute(self.VALUE_CREATE_QUERY, batch)
+
+    def bind_rows(self, rows):
+        """ Bind the rows to the `{values}` placeholder of a multi-row query
+
+        .. note:: each row is bound to the `VALUE_ROW_TEMPLATE` with its keys suffixed by the position
+            of the row in the batch
+
+        :param rows: list of dict provided by `prepare_params` or array of the rows of blocks with one column
+            per name of `VALUE_COLUMNS` (see :func:`gmaltcli.database.BaseValueManager.insert_block`)
+        :type rows: list or :class:`numpy.ndarray`
+        :return: the params of the multi-row query
+        :rtype: dict
+        """
+        if isinstance(rows, numpy.ndarray):
+            keys = ['{}_{}'.format(column, idx) for idx in range(len(rows)) for column in self.VALUE_COLUMNS]
+            params = dict(zip(keys, rows.ravel().tolist()))
+            params['values'] = ', '.join(self.VALUE_ROW_TEMPLATE.format(idx=idx) for idx in range(len(rows)))
+            return params
+
+        params = {}
+        values = []
+        for idx, row in enumerate(rows):
+            values.append(self.VALUE_ROW_TEMPLATE.format(idx=idx))
+            for key, value in row.items():
+                params['{}_{}'.format(key, idx)] = value
+        params['values'] = ', '.join(values)
+        return params
+
+
+class BaseValueManager(BaseManager):
+    """ Base class of the managers storing each elevation value with the bounds of its square
+    (`lat_min`, `lng_min`, `lat_max`, `lng_max` and `value` params)
+    """
+    VALUE_COLUMNS = ('lat_min', 'lng_min', 'lat_max', 'lng_max', 'value')
+
+    # a line of the text format of `COPY` and `LOAD DATA`, %r keeps all the digits of the bounds
+    ROW_FORMAT = '%r\t%r\t%r\t%r\t%d\n'
 
     def prepare_params(self, data, parser):
         """
@@ -270,6 +879,160 @@ class PostgresValueManager(with_metaclass(ManagerRegistry, BaseManager)):
             'value': elevation_value
         }
 
+    def insert_block(self, block):
+        """ The rows of the block are buffered as an array with one column per name of `VALUE_COLUMNS` so that
+        the batches are encoded from the arrays without a dict per value
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.insert_block`
+        """
+        self.buffer_columns(block.lat_min, block.lng_min, block.lat_max, block.lng_max, block.value)
+
+    def buffer_columns(self, *columns):
+        """ Append rows to the buffer from their column arrays then insert the complete batches
+
+        .. warning:: the buffer must be empty or hold rows of blocks, not rows of `prepare_params`
+
+        :param columns: the values of each column of `VALUE_COLUMNS`
+        :type columns: :class:`numpy.ndarray`
+        """
+        rows = numpy.column_stack(columns)
+        self.buffer = numpy.concatenate((self.buffer, rows)) if len(self.buffer) else rows
+        self.flush(partial=False)
+
+    @classmethod
+    def format_rows(cls, rows):
+        """ Format rows in the tab separated text format of the `COPY` (PostgreSQL) and
+        `LOAD DATA` (MySQL) commands
+
+        :param rows: list of dict provided by `prepare_params` or array of the rows of blocks (see
+            :func:`gmaltcli.database.BaseValueManager.insert_block`)
+        :type rows: list or :class:`numpy.ndarray`
+        :return: the encoded rows, one line per row with tab separated columns
+        :rtype: bytes
+        """
+        if isinstance(rows, numpy.ndarray):
+            return (cls.ROW_FORMAT * len(rows) % tuple(rows.ravel().tolist())).encode('ascii')
+        lines = [cls.ROW_FORMAT % (row['lat_min'], row['lng_min'], row['lat_max'], row['lng_max'], row['value'])
+                 for row in rows]
+        return ''.join(lines).encode('ascii')
+
+
+class PostgresValueManager(with_metaclass(ManagerRegistry, BaseValueManager)):
+    """ Provides SQL queries to import elevation value in a PostgreSQL table WITHOUT PostGIS """
+    TYPE = 'postgres'
+    USE_RASTER = False
+
+    TABLE_EXISTS_QUERY = ("SELECT EXISTS("
+                          "    SELECT  1"
+                          "    FROM    information_schema.tables"
+                          "    WHERE   table_name=%(table_name)s"
+                          ")")
+
+    TABLE_CREATE_QUERY = ("CREATE {unlogged}TABLE \"{table_name}\" ("
+                          "    lat_min DOUBLE PRECISION NOT NULL,"
+                          "    lng_min DOUBLE PRECISION NOT NULL,"
+                          "    lat_max DOUBLE PRECISION NOT NULL,"
+                          "    lng_max DOUBLE PRECISION NOT NULL,"
+                          "    \"value\" SMALLINT"
+                          ");")
+
+    INDEX_EXISTS_QUERY = ("SELECT EXISTS("
+                          "    SELECT  1"
+                          "    FROM    pg_indexes"
+                          "    WHERE   tablename=%(table_name)s"
+                          ")")
+
+    INDEX_CREATE_QUERY = ("ALTER TABLE \"{table_name}\" "
+                          "ADD CONSTRAINT \"{table_name}_pkey\" PRIMARY KEY (lat_min, lng_min, lat_max, lng_max);")
+
+    DEDUPLICATE_QUERY = ("DELETE FROM \"{table_name}\" a "
+                         "USING       \"{table_name}\" b "
+                         "WHERE       a.lat_min = b.lat_min AND a.lng_min = b.lng_min "
+                         "AND         a.lat_max = b.lat_max AND a.lng_max = b.lng_max "
+                         "AND         a.ctid < b.ctid;")
+
+    ANALYZE_QUERY = "ANALYZE \"{table_name}\";"
+
+    CLUSTER_QUERY = "CLUSTER \"{table_name}\" USING \"{table_name}_pkey\";"
+
+    SET_LOGGED_QUERY = "ALTER TABLE \"{table_name}\" SET LOGGED;"
+
+    # PostgreSQL 11 or later for the primary key and ON CONFLICT on a partitioned table
+    PARTITIONED_TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" ("
+                                      "    lat_min DOUBLE PRECISION NOT NULL,"
+                                      "    lng_min DOUBLE PRECISION NOT NULL,"
+                                      "    lat_max DOUBLE PRECISION NOT NULL,"
+                                      "    lng_max DOUBLE PRECISION NOT NULL,"
+                                      "    \"value\" SMALLINT"
+                                      ") PARTITION BY RANGE (lat_min);")
+
+    PARTITION_CREATE_QUERY = ("CREATE {unlogged}TABLE \"{partition_name}\" "
+                              "PARTITION OF \"{table_name}\" FOR VALUES FROM ({bound_from}) TO ({bound_to});")
+
+    PARTITIONED_QUERY = ("SELECT EXISTS("
+                         "    SELECT  1"
+                         "    FROM    pg_partitioned_table p"
+                         "    JOIN    pg_class c ON c.oid = p.partrelid"
+                         "    WHERE   c.relname=%(table_name)s"
+                         ")")
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
+                          "VALUES {values} "
+                          "ON CONFLICT DO NOTHING;")
+
+    VALUE_ROW_TEMPLATE = ("(%(lat_min_{idx})s::double precision, %(lng_min_{idx})s::double precision, "
+                          "%(lat_max_{idx})s::double precision, %(lng_max_{idx})s::double precision, "
+                          "%(value_{idx})s::smallint)")
+
+    LEDGER_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"{table_name}_ledger\" ("
+                           "    tile VARCHAR(64) PRIMARY KEY,"
+                           "    size BIGINT,"
+                           "    mtime DOUBLE PRECISION,"
+                           "    hash VARCHAR(32),"
+                           "    nb_rows BIGINT,"
+                           "    status VARCHAR(16) NOT NULL,"
+                           "    started_at TIMESTAMP,"
+                           "    finished_at TIMESTAMP"
+                           ");")
+
+    LEDGER_START_QUERY = ("INSERT INTO \"{table_name}_ledger\" "
+                          "(tile, size, mtime, hash, nb_rows, status, started_at, finished_at) "
+                          "VALUES (%(tile)s, %(size)s, %(mtime)s, %(hash)s, 0, 'started', clock_timestamp(), NULL) "
+                          "ON CONFLICT (tile) DO UPDATE "
+                          "SET    size = EXCLUDED.size, mtime = EXCLUDED.mtime, hash = EXCLUDED.hash, nb_rows = 0,"
+                          "       status = 'started', started_at = EXCLUDED.started_at, finished_at = NULL;")
+
+    # clock_timestamp() as now() is the start time of the transaction of the file
+    LEDGER_DONE_QUERY = ("UPDATE \"{table_name}_ledger\" "
+                         "SET    nb_rows = %(nb_rows)s, status = 'done', finished_at = clock_timestamp() "
+                         "WHERE  tile = %(tile)s;")
+
+    LEDGER_DONE_TILES_QUERY = ("SELECT tile, size, mtime, hash "
+                               "FROM   \"{table_name}_ledger\" "
+                               "WHERE  status = 'done';")
+
+    BLOCK_DELETE_QUERY = ("DELETE FROM \"{table_name}\" "
+                          "WHERE  lat_min >= %(lat_min)s AND lng_min >= %(lng_min)s "
+                          "AND    lat_max <= %(lat_max)s AND lng_max <= %(lng_max)s;")
+
+    BLOCK_HASH_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"{table_name}_block\" ("
+                               "    tile VARCHAR(255) NOT NULL,"
+                               "    line INTEGER NOT NULL,"
+                               "    hash CHAR(32) NOT NULL,"
+                               "    PRIMARY KEY (tile, line)"
+                               ");")
+
+    BLOCK_HASH_SELECT_QUERY = ("SELECT line, hash "
+                               "FROM   \"{table_name}_block\" "
+                               "WHERE  tile = %(tile)s;")
+
+    BLOCK_HASH_DELETE_QUERY = "DELETE FROM \"{table_name}_block\" WHERE tile = %(tile)s;"
+
+    BLOCK_HASH_INSERT_QUERY = ("INSERT INTO \"{table_name}_block\" (tile, line, hash) "
+                               "VALUES (%(tile)s, %(line)s, %(hash)s);")
+
 
 class PostgresRasterManager(with_metaclass(ManagerRegistry, BaseManager)):
     """ Provides SQL queries to import elevation value in a PostgreSQL table WITH PostGIS """
@@ -282,29 +1045,129 @@ class PostgresRasterManager(with_metaclass(ManagerRegistry, BaseManager)):
                           "    WHERE   table_name=%(table_name)s"
                           ")")
 
-    TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" (\"rid\" serial PRIMARY KEY,\"rast\" raster);"
+    TABLE_CREATE_QUERY = "CREATE {unlogged}TABLE \"{table_name}\" (\"rid\" serial NOT NULL,\"rast\" raster);"
+
+    INDEX_CREATE_QUERY = ("ALTER TABLE \"{table_name}\" ADD CONSTRAINT \"{table_name}_pkey\" PRIMARY KEY (\"rid\");"
                           "CREATE INDEX \"{table_name}_rast_gist_idx\" "
                           "ON           \"{table_name}\" "
                           "USING gist   (st_convexhull(\"rast\"));")
 
+    INDEX_EXISTS_QUERY = PostgresValueManager.INDEX_EXISTS_QUERY
+
+    ANALYZE_QUERY = PostgresValueManager.ANALYZE_QUERY
+
+    CLUSTER_QUERY = "CLUSTER \"{table_name}\" USING \"{table_name}_rast_gist_idx\";"
+
+    SET_LOGGED_QUERY = PostgresValueManager.SET_LOGGED_QUERY
+
     POSTGIS_AVAILABLE_QUERY = ("SELECT EXISTS("
                                "    SELECT  1"
                                "    FROM    pg_extension"
                                "    WHERE   extname='postgis'"
                                ")")
 
-    VALUE_EXIST_QUERY = ("SELECT 1 "
-                         "FROM   \"{table_name}\" "
-                         "WHERE  ST_Envelope(rast) = ST_GeomFromText('POLYGON((%(minx)s %(miny)s, %(minx)s %(maxy)s, %(maxx)s %(maxy)s, %(maxx)s %(miny)s, %(minx)s %(miny)s))', 4326);")  # noqa
+    DEFAULT_BATCH_SIZE = 10
+
+    STAGING_CREATE_QUERY = ("CREATE TEMPORARY TABLE IF NOT EXISTS \"{table_name}_staging\" (\"rast\" raster) "
+                            "ON COMMIT DELETE ROWS;")
+
+    # The transaction of a batch is nested in the transaction of its file, the staging table is not emptied by
+    # ON COMMIT before the next batch
+    STAGING_TRUNCATE_QUERY = "TRUNCATE \"{table_name}_staging\";"
+
+    VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}_staging\" (\"rast\") "
+                          "VALUES {values};")
+
+    # In bulk mode, the table has no index yet to merge the rasters efficiently
+    BULK_VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}\" (\"rast\") "
+                               "VALUES {values};")
+
+    # Anti-join on the bounding box of the convex hull to use the GiST index of the table
+    MERGE_QUERY = ("INSERT INTO \"{table_name}\" (\"rast\") "
+                   "SELECT s.rast "
+                   "FROM   \"{table_name}_staging\" s "
+                   "WHERE  NOT EXISTS("
+                   "    SELECT  1"
+                   "    FROM    \"{table_name}\" e"
+                   "    WHERE   st_convexhull(e.rast) ~= st_convexhull(s.rast)"
+                   ");")
+
+    VALUE_ROW_TEMPLATE = "(%(rast_{idx})s::raster)"
+
+    LEDGER_CREATE_QUERY = PostgresValueManager.LEDGER_CREATE_QUERY
+    LEDGER_START_QUERY = PostgresValueManager.LEDGER_START_QUERY
+    LEDGER_DONE_QUERY = PostgresValueManager.LEDGER_DONE_QUERY
+    LEDGER_DONE_TILES_QUERY = PostgresValueManager.LEDGER_DONE_TILES_QUERY
+
+    TABLE_SIZE_QUERY = ("SELECT pg_table_size('\"{table_name}\"'), "
+                        "       pg_indexes_size('\"{table_name}\"');")
+
+    # ST_Intersects uses the GiST index on the convex hull of the rasters
+    POINT_QUERY = ("SELECT  ST_Value(rast, ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326)) "
+                   "FROM    \"{table_name}\" "
+                   "WHERE   ST_Intersects(rast, ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326)) "
+                   "LIMIT   1;")
+
+    DROP_QUERY = "DROP TABLE IF EXISTS \"{table_name}\", \"{table_name}_ledger\";"
+
+    # The overview is registered in the `raster_overviews` view of PostGIS by its constraints
+    OVERVIEW_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"o_{factor}_{table_name}\" ("
+                             "    \"rid\" serial PRIMARY KEY,"
+                             "    \"rast\" raster"
+                             ");"
+                             "CREATE INDEX IF NOT EXISTS \"o_{factor}_{table_name}_rast_gist_idx\" "
+                             "ON           \"o_{factor}_{table_name}\" "
+                             "USING gist   (st_convexhull(\"rast\"));"
+                             "SELECT AddOverviewConstraints(%(overview_table)s::name, 'rast'::name, "
+                             "                              %(table_name)s::name, 'rast'::name, %(factor)s) "
+                             "WHERE  NOT EXISTS("
+                             "    SELECT  1"
+                             "    FROM    raster_overviews"
+                             "    WHERE   o_table_name=%(overview_table)s"
+                             ");")
+
+    # The overview tables are small and always indexed, the rasters are merged without staging table
+    OVERVIEW_VALUE_CREATE_QUERY = ("INSERT INTO \"o_{factor}_{table_name}\" (\"rast\") "
+                                   "SELECT v.rast "
+                                   "FROM   (VALUES {values}) v (\"rast\") "
+                                   "WHERE  NOT EXISTS("
+                                   "    SELECT  1"
+                                   "    FROM    \"o_{factor}_{table_name}\" e"
+                                   "    WHERE   st_convexhull(e.rast) ~= st_convexhull(v.rast)"
+                                   ");")
+
+    def encode_rows(self, rows):
+        """ The rows of an overview carry its `factor` which is added to the batch to select the overview table
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.encode_rows`
+        """
+        if isinstance(rows, numpy.ndarray) or 'factor' not in rows[0]:
+            return self.bind_rows(rows)
+        batch = self.bind_rows([{'rast': row['rast']} for row in rows])
+        batch['factor'] = rows[0]['factor']
+        return batch
+
+    def send_rows(self, batch):
+        """ Insert the rows in the staging table with a single multi-row `VALUE_CREATE_QUERY` query then merge
+        the rasters which don't exist in the table yet with `MERGE_QUERY` in a single transaction. The staging
+        table is emptied once merged.
+
+        .. note:: in bulk mode, the rows are directly inserted in the table with `BULK_VALUE_CREATE_QUERY`
+
+        .. note:: the rasters of an overview are inserted in its table with `OVERVIEW_VALUE_CREATE_QUERY`
 
-    VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}\" (\"rast\") "
-                          "VALUES (ST_SetValues("
-                          "    ST_AddBand("
-                          "        ST_MakeEmptyRaster(%(width)s, %(height)s, %(topleftx)s, %(toplefty)s, %(scalex)s, %(scaley)s, 0, 0, 4326),"  # noqa
-                          "        '16BSI'::text, %(default_value)s, %(nodata_value)s"
-                          "    ),"
-                          "    1, 1, 1, %(elevation_values)s::double precision[][]"
-                          "));")
+        :param dict batch: the params of the multi-row query provided by `encode_rows`
+        """
+        if 'factor' in batch:
+            return self.execute(self.OVERVIEW_VALUE_CREATE_QUERY, batch)
+        if self.bulk:
+            return self.execute(self.BULK_VALUE_CREATE_QUERY, batch)
+
+        with self.connection.begin():
+            self._execute(self.connection, self.STAGING_CREATE_QUERY)
+            self._execute(self.connection, self.VALUE_CREATE_QUERY, batch)
+            self._execute(self.connection, self.MERGE_QUERY)
+            self._execute(self.connection, self.STAGING_TRUNCATE_QUERY)
 
     def is_compatible(self):
         """ Execute query to check if the postgis extension is enabled
@@ -314,31 +1177,951 @@ class PostgresRasterManager(with_metaclass(ManagerRegistry, BaseManager)):
         """
         return self.execute(self.POSTGIS_AVAILABLE_QUERY, method='scalar')
 
+    def is_void(self, data, parser):
+        """ A raster is not imported if all its values are void
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.is_void`
+        """
+        return bool(numpy.all(numpy.asarray(data[4]) == parser.VOID_VALUE))
+
+    def prepare_params(self, data, parser):
+        """ The raster is encoded client side in the PostGIS raster WKB format and sent as an hexadecimal string
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.prepare_params`
+        """
+        area_corners = data[3]
+        top_left_corner = area_corners[1]
+
+        wkb = raster_wkb(data[4], top_left_corner[1], top_left_corner[0], float(parser.square_width),
+                         -1 * float(parser.square_height),  # raster descending on latitude (line per line)
+                         parser.VOID_VALUE)
+        return {'rast': binascii.hexlify(wkb).decode('ascii')}
+
+    def insert_overviews(self, block_reader, width, height):
+        """ The overviews are downsampled from the values of the file in memory (see
+        :func:`gmaltcli.reader.HgtBlockReader.get_overview_iterator`) and split in rasters of the same size as the
+        rasters of the table, the rasters with only void values are not imported
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.insert_overviews`
+        """
+        parser = block_reader.parser
+        for factor in self.overviews:
+            rows = []
+            for lat, lng, values in block_reader.get_overview_iterator(factor, width, height):
+                if numpy.all(values == parser.VOID_VALUE):
+                    continue
+                wkb = raster_wkb(values, lng, lat, float(parser.square_width * factor),
+                                 -1 * float(parser.square_height * factor), parser.VOID_VALUE)
+                rows.append({'rast': binascii.hexlify(wkb).decode('ascii'), 'factor': factor})
+            for idx in range(0, len(rows), self.batch_size):
+                self.insert_rows(rows[idx:idx + self.batch_size])
+
+
+# PostGIS raster WKB band pixel type and flag
+RASTER_16BSI = 5
+RASTER_HAS_NODATA = 0x40
+
+
+def raster_wkb(elevation_values, topleftx, toplefty, scalex, scaley, nodata_value, srid=4326):
+    """ Encode elevation values as a PostGIS raster WKB with a single 16BSI band
+
+    .. note:: the WKB is encoded in big endian (XDR) like the HGT files so the pixels of a big-endian int16 array
+        (for example :class:`gmaltcli.reader.HgtBlockReader` values) are copied as is
+
+    :param elevation_values: the elevation values line per line
+    :type elevation_values: :class:`numpy.ndarray` or list[list[int]]
+    :param float topleftx: the longitude of the top left corner of the raster
+    :param float toplefty: the latitude of the top left corner of the raster
+    :param float scalex: the width of a pixel
+    :param float scaley: the height of a pixel (negative as lines are descending on latitude)
+    :param int nodata_value: the value of the pixels without elevation
+    :param int srid: the spatial reference of the raster
+    :return: the raster WKB
+    :rtype: bytes
+    """
+    pixels = numpy.asarray(elevation_values, dtype='>i2')
+    height, width = pixels.shape
+    header = struct.pack('>BHHddddddiHH', 0, 0, 1, scalex, scaley, topleftx, toplefty, 0, 0, srid, width, height)
+    band_header = struct.pack('>Bh', RASTER_16BSI | RASTER_HAS_NODATA, nodata_value)
+    return header + band_header + pixels.tobytes()
+
+
+class PostgresCopyValueManager(PostgresValueManager):
+    """ Provides the same schema as :class:`gmaltcli.database.PostgresValueManager` but loads elevation
+    values with `COPY ... FROM STDIN`
+
+    .. note:: each batch is streamed in text format into a temporary staging table then merged into the
+        elevation table with `ON CONFLICT DO NOTHING` so that values already imported are not duplicated
+    """
+    METHOD = 'copy'
+
+    DEFAULT_BATCH_SIZE = 100000
+
+    STAGING_CREATE_QUERY = ("CREATE TEMPORARY TABLE IF NOT EXISTS \"{table_name}_staging\" "
+                            "(LIKE \"{table_name}\") "
+                            "ON COMMIT DELETE ROWS;")
+
+    STAGING_TRUNCATE_QUERY = PostgresRasterManager.STAGING_TRUNCATE_QUERY
+
+    COPY_QUERY = ("COPY \"{table_name}_staging\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
+                  "FROM STDIN;")
+
+    # In bulk mode, the table has no primary key yet so the rows are copied directly in the table
+    BULK_COPY_QUERY = ("COPY \"{table_name}\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
+                       "FROM STDIN;")
+
+    MERGE_QUERY = ("INSERT INTO \"{table_name}\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
+                   "SELECT lat_min, lng_min, lat_max, lng_max, \"value\" "
+                   "FROM   \"{table_name}_staging\" "
+                   "ON CONFLICT DO NOTHING;")
+
+    def encode_rows(self, rows):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseValueManager.format_rows`
+        """
+        return self.format_rows(rows)
+
+    def send_rows(self, batch):
+        """ Stream the rows in the staging table with `COPY_QUERY` then merge them with `MERGE_QUERY` in a single
+        transaction. The staging table is emptied once merged.
+
+        .. note:: in bulk mode, the rows are directly streamed in the table with `BULK_COPY_QUERY`
+
+        :param bytes batch: the rows in the text format of `COPY` provided by `encode_rows`
+        """
+        if self.bulk:
+            with self.connection.begin():
+                self.copy(self.BULK_COPY_QUERY, io.BytesIO(batch))
+            return
+
+        with self.connection.begin():
+            self._execute(self.connection, self.STAGING_CREATE_QUERY)
+            self.copy(self.COPY_QUERY, io.BytesIO(batch))
+            self._execute(self.connection, self.MERGE_QUERY)
+            self._execute(self.connection, self.STAGING_TRUNCATE_QUERY)
+
+    def copy(self, query, stream):
+        """ Execute a `COPY ... FROM STDIN` query with the raw psycopg2 connection behind the sqlalchemy connection
+
+        .. warning:: executed inside the current transaction of the sqlalchemy connection
+
+        :param str query: the COPY query
+        :param stream: file-like object providing the data in the format expected by the query
+        """
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(query.format(table_name=self.table_name), stream)
+        finally:
+            cursor.close()
+
+
+# Offsets of the arc second coordinates in a grid cell id so that they are positive
+GRID_LAT_OFFSET = 90 * 3600
+GRID_LNG_OFFSET = 180 * 3600
+# Number of bits of the longitude in a grid cell id
+GRID_LNG_BITS = 21
+
+
+def grid_cell_id(lat_seconds, lng_seconds):
+    """ Compute the 64 bits id of a grid cell from the position of its center in arc seconds
+
+    .. note:: the latitude is stored in the high bits and the longitude in the `GRID_LNG_BITS` low bits.
+        Works with integers or with :class:`numpy.ndarray` of int64.
+
+    :param lat_seconds: the latitude of the center of the cell in arc seconds
+    :type lat_seconds: int or :class:`numpy.ndarray`
+    :param lng_seconds: the longitude of the center of the cell in arc seconds
+    :type lng_seconds: int or :class:`numpy.ndarray`
+    :return: the id of the cell
+    :rtype: int or :class:`numpy.ndarray`
+    """
+    return ((lat_seconds + GRID_LAT_OFFSET) << GRID_LNG_BITS) | (lng_seconds + GRID_LNG_OFFSET)
+
+
+class PostgresGridValueManager(PostgresValueManager):
+    """ Provides SQL queries to import elevation value in a PostgreSQL table WITHOUT PostGIS, each value
+    being identified by a 64 bits integer id of the cell of the arc second grid at its center
+    (see :func:`gmaltcli.database.grid_cell_id`)
+
+    .. note:: the resolution in arc seconds of each imported HGT file is stored in the `{table_name}_tile` table.
+        The bounds of a cell are computed on read by the SQL functions `{table_name}_cell(lat, lng)` and
+        `{table_name}_elevation(lat, lng)` which look up a value with a single probe of the primary key.
+
+    .. note:: two adjacent HGT files share their edge values which have the same cell id. They are imported once.
+    """
+    SCHEMA = 'grid'
+
+    # The cells are not stored with their bounds
+    BLOCK_DELETE_QUERY = None
+
+    TABLE_CREATE_QUERY = ("CREATE {unlogged}TABLE \"{table_name}\" ("
+                          "    cell_id BIGINT NOT NULL,"
+                          "    \"value\" SMALLINT"
+                          ");")
+
+    INDEX_CREATE_QUERY = ("ALTER TABLE \"{table_name}\" "
+                          "ADD CONSTRAINT \"{table_name}_pkey\" PRIMARY KEY (cell_id);")
+
+    DEDUPLICATE_QUERY = ("DELETE FROM \"{table_name}\" a "
+                         "USING       \"{table_name}\" b "
+                         "WHERE       a.cell_id = b.cell_id "
+                         "AND         a.ctid < b.ctid;")
+
+    # the latitude is in the high bits of the cell id so a band of latitude is a range of cell ids
+    PARTITIONED_TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" ("
+                                      "    cell_id BIGINT NOT NULL,"
+                                      "    \"value\" SMALLINT"
+                                      ") PARTITION BY RANGE (cell_id);")
+
+    HELPERS_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"{table_name}_tile\" ("
+                            "    tile_lat SMALLINT,"
+                            "    tile_lng SMALLINT,"
+                            "    resolution SMALLINT NOT NULL,"
+                            "    PRIMARY KEY (tile_lat, tile_lng)"
+                            ");"
+                            "CREATE OR REPLACE FUNCTION \"{table_name}_cell_id\"("
+                            "    lat DOUBLE PRECISION, lng DOUBLE PRECISION, resolution INTEGER"
+                            ") RETURNS BIGINT AS $$"
+                            "    SELECT (((round(lat * 3600 / resolution)::bigint * resolution + 324000) << 21)"
+                            "            | (round(lng * 3600 / resolution)::bigint * resolution + 648000))"
+                            "$$ LANGUAGE SQL IMMUTABLE;"
+                            "CREATE OR REPLACE FUNCTION \"{table_name}_cell\"("
+                            "    lat DOUBLE PRECISION, lng DOUBLE PRECISION"
+                            ") RETURNS TABLE ("
+                            "    lat_min DOUBLE PRECISION, lng_min DOUBLE PRECISION,"
+                            "    lat_max DOUBLE PRECISION, lng_max DOUBLE PRECISION,"
+                            "    \"value\" SMALLINT"
+                            ") AS $$"
+                            "    SELECT ((e.cell_id >> 21) - 324000 - t.resolution / 2.0)::double precision / 3600,"
+                            "           ((e.cell_id & 2097151) - 648000 - t.resolution / 2.0)::double precision / 3600,"
+                            "           ((e.cell_id >> 21) - 324000 + t.resolution / 2.0)::double precision / 3600,"
+                            "           ((e.cell_id & 2097151) - 648000 + t.resolution / 2.0)::double precision / 3600,"
+                            "           e.\"value\""
+                            "    FROM   \"{table_name}_tile\" t"
+                            "    JOIN   \"{table_name}\" e"
+                            "    ON     e.cell_id = \"{table_name}_cell_id\"(lat, lng, t.resolution)"
+                            "    WHERE  t.tile_lat = floor(lat) AND t.tile_lng = floor(lng)"
+                            "$$ LANGUAGE SQL STABLE;"
+                            "CREATE OR REPLACE FUNCTION \"{table_name}_elevation\"("
+                            "    lat DOUBLE PRECISION, lng DOUBLE PRECISION"
+                            ") RETURNS SMALLINT AS $$"
+                            "    SELECT \"value\" FROM \"{table_name}_cell\"(lat, lng)"
+                            "$$ LANGUAGE SQL STABLE;")
+
+    TILE_CREATE_QUERY = ("INSERT INTO \"{table_name}_tile\" (tile_lat, tile_lng, resolution) "
+                         "VALUES (%(tile_lat)s, %(tile_lng)s, %(resolution)s) "
+                         "ON CONFLICT (tile_lat, tile_lng) DO UPDATE SET resolution = EXCLUDED.resolution;")
+
+    VALUE_CREATE_QUERY = ("INSERT INTO \"{table_name}\" (cell_id, \"value\") "
+                          "VALUES {values} "
+                          "ON CONFLICT DO NOTHING;")
+
+    VALUE_ROW_TEMPLATE = "(%(cell_id_{idx})s::bigint, %(value_{idx})s::smallint)"
+
+    VALUE_COLUMNS = ('cell_id', 'value')
+
+    def record_tile_start(self, tile):
+        """ Also record the position and the resolution of the file in the `{table_name}_tile` table
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.record_tile_start`
+
+        :raise NotSupportedException: if the resolution of the file is not a whole number of arc seconds
+        """
+        params = self.tile_params(tile)
+        with self.connection.begin():
+            self._execute(self.connection, self.LEDGER_START_QUERY, dict(tile))
+            self._execute(self.connection, self.TILE_CREATE_QUERY, params)
+
+    @staticmethod
+    def partition_bound(lat):
+        """ Get the id of the first cell at a latitude
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.partition_bound`
+        """
+        return grid_cell_id(lat * 3600, -GRID_LNG_OFFSET)
+
+    @staticmethod
+    def tile_params(tile):
+        """ Get the position and the resolution of a squared HGT file from its name and its size
+
+        :param dict tile: the file information provided by :func:`gmaltcli.worker.get_tile_info`
+        :return: dict with the `tile_lat`, `tile_lng` (position of the bottom left value) and `resolution`
+            (in arc seconds) keys
+        :rtype: dict
+        """
+        lat, lng = hgt.HgtParser._get_bottom_left_center(tile['tile'])
+        nb_squares = int(round((tile['size'] / 2) ** 0.5)) - 1
+        if nb_squares < 1 or 3600 % nb_squares:
+            raise NotSupportedException('Resolution of file {} is not a whole number of arc seconds'.format(
+                tile['tile']))
+        return {'tile_lat': int(lat), 'tile_lng': int(lng), 'resolution': 3600 // nb_squares}
+
     def prepare_params(self, data, parser):
         """
         .. seealso:: :func:`gmaltcli.database.BaseManager.prepare_params`
         """
-        elevation_values = data[4]
+        area_corners = data[3]
+        lat_center = (min([corner[0] for corner in area_corners]) + max([corner[0] for corner in area_corners])) / 2
+        lng_center = (min([corner[1] for corner in area_corners]) + max([corner[1] for corner in area_corners])) / 2
+
+        return {
+            'cell_id': grid_cell_id(int(round(lat_center * 3600)), int(round(lng_center * 3600))),
+            'value': data[4]
+        }
+
+    def insert_block(self, block):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseManager.insert_block`
+        """
+        # the center of the cells in arc seconds
+        lat_seconds = numpy.rint((block.lat_min + block.lat_max) * 1800).astype(numpy.int64)
+        lng_seconds = numpy.rint((block.lng_min + block.lng_max) * 1800).astype(numpy.int64)
+        self.buffer_columns(grid_cell_id(lat_seconds, lng_seconds), block.value)
+
+
+class SqliteWriter(threading.Thread):
+    """ Single writer of a SQLite database as SQLite allows only one writer at a time
+
+    The managers of the import workers submit their queries with the rows to insert. The writer executes them in
+    the submission order with `executemany`, all the pending queries being grouped in a single transaction.
+
+    .. note:: a writer is shared by all the managers of a process using the same database. It is started by
+        the first manager calling `acquire` and stopped when the last one calls `release`.
+
+    :param engine: a sqlalchemy engine
+    :type engine: :class:`sqlalchemy.engine.base.Engine`
+    """
+    WRITERS = {}
+    LOCK = threading.Lock()
+
+    # maximum number of pending queries, the managers wait for the writer beyond
+    QUEUE_SIZE = 16
+    # maximum number of queries grouped in a transaction
+    GROUP_SIZE = 64
+
+    def __init__(self, engine):
+        super(SqliteWriter, self).__init__()
+        self.daemon = True
+        self.engine = engine
+        self.key = self.get_key(engine)
+        self.queue = queue.Queue(self.QUEUE_SIZE)
+        self.users = 0
+        self.error = None
+
+    @staticmethod
+    def get_key(engine):
+        # the process id as a forked process gets a copy of the writers of its parent which are not running
+        return os.getpid(), str(engine.url)
+
+    @classmethod
+    def acquire(cls, engine):
+        """ Get the running writer of the database, start it if needed
+
+        :param engine: a sqlalchemy engine
+        :type engine: :class:`sqlalchemy.engine.base.Engine`
+        :return: the writer of the database
+        :rtype: :class:`gmaltcli.database.SqliteWriter`
+        """
+        with cls.LOCK:
+            writer = cls.WRITERS.get(cls.get_key(engine))
+            if writer is None:
+                writer = cls.WRITERS[cls.get_key(engine)] = cls(engine)
+                writer.start()
+            writer.users += 1
+            return writer
+
+    def release(self, token=None):
+        """ Stop the writer once the last manager using it releases it. The pending queries are executed first.
+
+        .. note:: if other managers still use the writer, wait for the execution of the last query of the manager
+            : a manager acquiring a new writer once this one is stopped must not overtake it
+
+        :param token: the token of the last query submitted by the manager, None if it submitted nothing
+        :type token: :class:`threading.Event`
+        """
+        with self.LOCK:
+            self.users -= 1
+            last = not self.users
+            if last:
+                del self.WRITERS[self.key]
+        if not last:
+            if token is not None:
+                token.wait()
+            return
+        self.queue.put(None)
+        self.join()
+
+    def submit(self, query, rows):
+        """ Submit a query to execute for each row
+
+        :param str query: the query (without placeholder of the table name)
+        :param list rows: the params of the query, one item per row
+        :return: a token set when the query is executed
+        :rtype: :class:`threading.Event`
+        :raise WriterException: if a previous query failed
+        """
+        self.check()
+        token = threading.Event()
+        self.queue.put((query, rows, token))
+        return token
+
+    def wait(self, token):
+        """ Wait for the execution of a query
+
+        :param token: the token returned by `submit`
+        :type token: :class:`threading.Event`
+        :raise WriterException: if the query or a previous query failed
+        """
+        token.wait()
+        self.check()
+
+    def check(self):
+        if self.error is not None:
+            raise WriterException('Write to {} failed : {}'.format(self.engine.url, self.error))
+
+    def run(self):
+        connection = self.engine.raw_connection()
+        try:
+            stop = False
+            while not stop:
+                items = [self.queue.get()]
+                # Only consumer of the queue so a non empty queue can't block
+                while items[-1] is not None and len(items) < self.GROUP_SIZE and not self.queue.empty():
+                    items.append(self.queue.get())
+                if items[-1] is None:
+                    stop = True
+                    items.pop()
+                self._write(connection, items)
+        finally:
+            connection.close()
+
+    def _write(self, connection, items):
+        """ Execute the queries in a single transaction and set their tokens
+
+        .. note:: once a query failed, the next ones are not executed
+
+        :param connection: the raw sqlite3 connection of the writer
+        :param list items: list of (query, rows, token)
+        """
+        if self.error is None and items:
+            cursor = connection.cursor()
+            try:
+                for query, rows, token in items:
+                    cursor.executemany(query, rows)
+                connection.commit()
+            except Exception as exception:
+                connection.rollback()
+                self.error = exception
+                logging.error('Write to {} failed : {}'.format(self.engine.url, exception))
+            finally:
+                cursor.close()
+
+        for query, rows, token in items:
+            token.set()
+
+
+class SqliteValueManager(with_metaclass(ManagerRegistry, BaseValueManager)):
+    """ Provides SQL queries to import elevation value in a SQLite database file
+
+    .. note:: the rows are not inserted by the manager itself but by the :class:`gmaltcli.database.SqliteWriter`
+        of the database which groups the rows of all the import workers in its transactions. The ledger records
+        a file as done once all its rows are committed. A file which has not been completely imported
+        (stopped import) stays started in the ledger with the rows already written, they are ignored when
+        the file is imported again.
+    """
+    TYPE = 'sqlite'
+    USE_RASTER = False
+
+    DEFAULT_BATCH_SIZE = 10000
+
+    TABLE_EXISTS_QUERY = ("SELECT count(*) "
+                          "FROM   sqlite_master "
+                          "WHERE  type = 'table' AND name = :table_name")
+
+    TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" ("
+                          "    lat_min REAL NOT NULL,"
+                          "    lng_min REAL NOT NULL,"
+                          "    lat_max REAL NOT NULL,"
+                          "    lng_max REAL NOT NULL,"
+                          "    \"value\" INTEGER"
+                          ")")
+
+    INDEX_EXISTS_QUERY = ("SELECT count(*) "
+                          "FROM   sqlite_master "
+                          "WHERE  type = 'index' AND tbl_name = :table_name")
+
+    INDEX_CREATE_QUERY = ("CREATE UNIQUE INDEX \"{table_name}_pkey\" "
+                          "ON \"{table_name}\" (lat_min, lng_min, lat_max, lng_max)")
+
+    DEDUPLICATE_QUERY = ("DELETE FROM \"{table_name}\" "
+                         "WHERE rowid NOT IN ("
+                         "    SELECT   min(rowid)"
+                         "    FROM     \"{table_name}\""
+                         "    GROUP BY lat_min, lng_min, lat_max, lng_max"
+                         ")")
+
+    ANALYZE_QUERY = "ANALYZE \"{table_name}\""
+
+    VALUE_CREATE_QUERY = ("INSERT OR IGNORE INTO \"{table_name}\" (lat_min, lng_min, lat_max, lng_max, \"value\") "
+                          "VALUES (:lat_min, :lng_min, :lat_max, :lng_max, :value)")
+
+    LEDGER_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"{table_name}_ledger\" ("
+                           "    tile TEXT PRIMARY KEY,"
+                           "    size INTEGER,"
+                           "    mtime REAL,"
+                           "    hash TEXT,"
+                           "    nb_rows INTEGER,"
+                           "    status TEXT NOT NULL,"
+                           "    started_at TEXT,"
+                           "    finished_at TEXT"
+                           ")")
+
+    LEDGER_START_QUERY = ("INSERT OR REPLACE INTO \"{table_name}_ledger\" "
+                          "(tile, size, mtime, hash, nb_rows, status, started_at, finished_at) "
+                          "VALUES (:tile, :size, :mtime, :hash, 0, 'started', datetime('now'), NULL)")
+
+    LEDGER_DONE_QUERY = ("UPDATE \"{table_name}_ledger\" "
+                         "SET    nb_rows = :nb_rows, status = 'done', finished_at = datetime('now') "
+                         "WHERE  tile = :tile")
+
+    LEDGER_DONE_TILES_QUERY = ("SELECT tile, size, mtime, hash "
+                               "FROM   \"{table_name}_ledger\" "
+                               "WHERE  status = 'done'")
+
+    BLOCK_DELETE_QUERY = ("DELETE FROM \"{table_name}\" "
+                          "WHERE  lat_min >= :lat_min AND lng_min >= :lng_min "
+                          "AND    lat_max <= :lat_max AND lng_max <= :lng_max")
+
+    BLOCK_HASH_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS \"{table_name}_block\" ("
+                               "    tile TEXT NOT NULL,"
+                               "    line INTEGER NOT NULL,"
+                               "    hash TEXT NOT NULL,"
+                               "    PRIMARY KEY (tile, line)"
+                               ")")
+
+    BLOCK_HASH_SELECT_QUERY = ("SELECT line, hash "
+                               "FROM   \"{table_name}_block\" "
+                               "WHERE  tile = :tile")
+
+    BLOCK_HASH_DELETE_QUERY = "DELETE FROM \"{table_name}_block\" WHERE tile = :tile"
+
+    BLOCK_HASH_INSERT_QUERY = "INSERT INTO \"{table_name}_block\" (tile, line, hash) VALUES (:tile, :line, :hash)"
+
+    def __init__(self, engine, table_name, batch_size=None, bulk=False):
+        super(SqliteValueManager, self).__init__(engine, table_name, batch_size=batch_size, bulk=bulk)
+        self.writer = None
+        self.token = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            super(SqliteValueManager, self).__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            if self.writer:
+                self.writer.release(self.token)
+                self.writer = None
+
+    def submit(self, query, rows):
+        """ Submit a query to the writer of the database, the writer is acquired on first use
+
+        :param str query: the query with the `{table_name}` placeholder
+        :param list rows: the params of the query, one item per row
+        :return: a token set when the query is executed
+        :rtype: :class:`threading.Event`
+        """
+        if self.writer is None:
+            self.writer = SqliteWriter.acquire(self.engine)
+        self.token = self.writer.submit(query.format(table_name=self.table_name), rows)
+        return self.token
+
+    def encode_rows(self, rows):
+        """ The rows are sent as is, the writer binds them with `executemany`. The rows of blocks are converted to
+        the dict expected by the named parameters of the queries.
+
+        :param rows: list of dict provided by `prepare_params` or array of the rows of blocks (see
+            :func:`gmaltcli.database.BaseValueManager.insert_block`)
+        :type rows: list or :class:`numpy.ndarray`
+        :rtype: list
+        """
+        if isinstance(rows, numpy.ndarray):
+            return [dict(zip(self.VALUE_COLUMNS, row)) for row in rows.tolist()]
+        return rows
+
+    def send_rows(self, batch):
+        """ Submit the rows to the writer which inserts them with `executemany` ignoring the existing ones
+
+        :param list batch: list of dict provided by `prepare_params`
+        """
+        self.submit(self.VALUE_CREATE_QUERY, batch)
+
+    def record_tile_start(self, tile):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseManager.record_tile_start`
+        """
+        self.submit(self.LEDGER_START_QUERY, [dict(tile)])
+
+    def record_tile_done(self, tile, nb_rows):
+        """ Record the import of the file as done in the ledger after the rows already submitted and wait for the
+        writer to commit it
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.record_tile_done`
+        """
+        token = self.submit(self.LEDGER_DONE_QUERY, [{'tile': tile['tile'], 'nb_rows': nb_rows}])
+        self.writer.wait(token)
+
+    def record_block_hashes(self, tile, hashes):
+        """ Submit the checksums of the blocks to the writer after the rows of the file
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.record_block_hashes`
+        """
+        self.submit(self.BLOCK_HASH_DELETE_QUERY, [{'tile': tile}])
+        self.submit(self.BLOCK_HASH_INSERT_QUERY, [{'tile': tile, 'line': line, 'hash': md5digest}
+                                                   for line, md5digest in sorted(hashes.items())])
+
+    def delete_block(self, lat_min, lng_min, lat_max, lng_max):
+        """ Submit the deletion of the rows of the block to the writer, it is executed before the rows of the
+        block which are submitted after
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.delete_block`
+        """
+        self.submit(self.BLOCK_DELETE_QUERY, [{'lat_min': lat_min, 'lng_min': lng_min, 'lat_max': lat_max,
+                                               'lng_max': lng_max}])
+
+    def start_tile(self, tile):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseManager.start_tile`
+        """
+        self.record_tile_start(tile)
+        self.nb_rows = 0
+
+    def end_tile(self, tile):
+        """ Flush the buffer and record the import of the file as done in the ledger then wait for the writer
+        to commit it
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.end_tile`
+        """
+        self.flush()
+        with self.metrics.timer('commit'):
+            self.record_tile_done(tile, self.nb_rows)
+
+    def rollback_tile(self):
+        """ Drop the buffer. The rows already submitted are kept and the file stays started in the ledger. """
+        self.buffer = []
+
+
+class SqliteTileManager(SqliteValueManager):
+    """ Provides SQL queries to import elevation values in a SQLite database file as BLOB, one BLOB per HGT file
+    or per sample of a HGT file
+
+    .. note:: the BLOB contains the `height` lines of `width` elevation values of the sample encoded as big-endian
+        int16 like in the HGT file. The value at the line `l` and the column `c` starts at the byte
+        `2 * (l * width + c)`.
+    """
+    USE_RASTER = True
+
+    DEFAULT_BATCH_SIZE = 10
+
+    # The incremental import replaces blocks of lines, not rasters
+    BLOCK_DELETE_QUERY = None
+
+    TABLE_CREATE_QUERY = ("CREATE TABLE \"{table_name}\" ("
+                          "    lat_min REAL NOT NULL,"
+                          "    lng_min REAL NOT NULL,"
+                          "    lat_max REAL NOT NULL,"
+                          "    lng_max REAL NOT NULL,"
+                          "    width INTEGER NOT NULL,"
+                          "    height INTEGER NOT NULL,"
+                          "    data BLOB NOT NULL"
+                          ")")
+
+    VALUE_CREATE_QUERY = ("INSERT OR IGNORE INTO \"{table_name}\" "
+                          "(lat_min, lng_min, lat_max, lng_max, width, height, data) "
+                          "VALUES (:lat_min, :lng_min, :lat_max, :lng_max, :width, :height, :data)")
+
+    def is_void(self, data, parser):
+        """ A sample is not imported if all its values are void
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.is_void`
+        """
+        return bool(numpy.all(numpy.asarray(data[4]) == parser.VOID_VALUE))
+
+    def prepare_params(self, data, parser):
+        """ The bounds of the sample and its values as BLOB
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.prepare_params`
+        """
+        area_corners = data[3]
+        values = numpy.asarray(data[4], dtype='>i2')
+
+        return {
+            'lat_min': min([corner[0] for corner in area_corners]),
+            'lat_max': max([corner[0] for corner in area_corners]),
+            'lng_min': min([corner[1] for corner in area_corners]),
+            'lng_max': max([corner[1] for corner in area_corners]),
+            'width': values.shape[1],
+            'height': values.shape[0],
+            'data': values.tobytes()
+        }
+
+
+class MysqlValueManager(with_metaclass(ManagerRegistry, BaseValueManager)):
+    """ Provides SQL queries to import elevation value in a MySQL (InnoDB) table with multi-row
+    `INSERT IGNORE` queries
+
+    .. note:: the bulk mode is not supported. InnoDB stores the rows in the order of the primary key so adding
+        the primary key after the load rebuilds the whole table and MySQL can't remove the duplicated values of a
+        table without key in a single query.
+    """
+    TYPE = 'mysql'
+    USE_RASTER = False
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    TABLE_EXISTS_QUERY = ("SELECT EXISTS("
+                          "    SELECT  1"
+                          "    FROM    information_schema.tables"
+                          "    WHERE   table_schema = DATABASE() AND table_name = %(table_name)s"
+                          ")")
+
+    TABLE_CREATE_QUERY = ("CREATE TABLE `{table_name}` ("
+                          "    lat_min DOUBLE NOT NULL,"
+                          "    lng_min DOUBLE NOT NULL,"
+                          "    lat_max DOUBLE NOT NULL,"
+                          "    lng_max DOUBLE NOT NULL,"
+                          "    `value` SMALLINT"
+                          ") ENGINE=InnoDB;")
+
+    INDEX_EXISTS_QUERY = ("SELECT EXISTS("
+                          "    SELECT  1"
+                          "    FROM    information_schema.statistics"
+                          "    WHERE   table_schema = DATABASE() AND table_name = %(table_name)s"
+                          ")")
+
+    INDEX_CREATE_QUERY = "ALTER TABLE `{table_name}` ADD PRIMARY KEY (lat_min, lng_min, lat_max, lng_max);"
+
+    VALUE_CREATE_QUERY = ("INSERT IGNORE INTO `{table_name}` (lat_min, lng_min, lat_max, lng_max, `value`) "
+                          "VALUES {values};")
+
+    VALUE_ROW_TEMPLATE = ("(%(lat_min_{idx})s, %(lng_min_{idx})s, %(lat_max_{idx})s, %(lng_max_{idx})s, "
+                          "%(value_{idx})s)")
+
+    LEDGER_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS `{table_name}_ledger` ("
+                           "    tile VARCHAR(64) PRIMARY KEY,"
+                           "    size BIGINT,"
+                           "    mtime DOUBLE,"
+                           "    hash VARCHAR(32),"
+                           "    nb_rows BIGINT,"
+                           "    status VARCHAR(16) NOT NULL,"
+                           "    started_at DATETIME(6) NULL,"
+                           "    finished_at DATETIME(6) NULL"
+                           ") ENGINE=InnoDB;")
+
+    # SYSDATE() as NOW() is the start time of the statement
+    LEDGER_START_QUERY = ("INSERT INTO `{table_name}_ledger` "
+                          "(tile, size, mtime, hash, nb_rows, status, started_at, finished_at) "
+                          "VALUES (%(tile)s, %(size)s, %(mtime)s, %(hash)s, 0, 'started', SYSDATE(6), NULL) "
+                          "ON DUPLICATE KEY UPDATE "
+                          "size = VALUES(size), mtime = VALUES(mtime), hash = VALUES(hash), nb_rows = 0, "
+                          "status = 'started', started_at = VALUES(started_at), finished_at = NULL;")
+
+    LEDGER_DONE_QUERY = ("UPDATE `{table_name}_ledger` "
+                         "SET    nb_rows = %(nb_rows)s, status = 'done', finished_at = SYSDATE(6) "
+                         "WHERE  tile = %(tile)s;")
+
+    LEDGER_DONE_TILES_QUERY = ("SELECT tile, size, mtime, hash "
+                               "FROM   `{table_name}_ledger` "
+                               "WHERE  status = 'done';")
+
+    BLOCK_DELETE_QUERY = ("DELETE FROM `{table_name}` "
+                          "WHERE  lat_min >= %(lat_min)s AND lng_min >= %(lng_min)s "
+                          "AND    lat_max <= %(lat_max)s AND lng_max <= %(lng_max)s;")
+
+    BLOCK_HASH_CREATE_QUERY = ("CREATE TABLE IF NOT EXISTS `{table_name}_block` ("
+                               "    tile VARCHAR(255) NOT NULL,"
+                               "    line INT NOT NULL,"
+                               "    hash CHAR(32) NOT NULL,"
+                               "    PRIMARY KEY (tile, line)"
+                               ") ENGINE=InnoDB;")
+
+    BLOCK_HASH_SELECT_QUERY = ("SELECT line, hash "
+                               "FROM   `{table_name}_block` "
+                               "WHERE  tile = %(tile)s;")
+
+    BLOCK_HASH_DELETE_QUERY = "DELETE FROM `{table_name}_block` WHERE tile = %(tile)s;"
+
+    BLOCK_HASH_INSERT_QUERY = ("INSERT INTO `{table_name}_block` (tile, line, hash) "
+                               "VALUES (%(tile)s, %(line)s, %(hash)s);")
+
+    def prepare_environment(self, unlogged=False):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseManager.prepare_environment`
+
+        :raise NotSupportedException: in bulk mode
+        """
+        if self.bulk:
+            raise NotSupportedException('Bulk mode is not supported by database driver {}'.format(self.TYPE))
+        return super(MysqlValueManager, self).prepare_environment(unlogged=unlogged)
+
+
+class MysqlLoadValueManager(MysqlValueManager):
+    """ Provides the same schema as :class:`gmaltcli.database.MysqlValueManager` but loads elevation
+    values with `LOAD DATA LOCAL INFILE`
+
+    .. note:: each batch is written in a temporary file in the tab separated format of `LOAD DATA` then streamed
+        to the server by the client. The values already imported are skipped with `IGNORE`.
+
+    .. warning:: the `local_infile` system variable must be enabled on the MySQL server
+    """
+    METHOD = 'copy'
 
+    DEFAULT_BATCH_SIZE = 100000
+
+    LOCAL_INFILE_QUERY = "SELECT @@GLOBAL.local_infile;"
+
+    LOAD_QUERY = ("LOAD DATA LOCAL INFILE %(path)s "
+                  "IGNORE INTO TABLE `{table_name}` (lat_min, lng_min, lat_max, lng_max, `value`);")
+
+    def is_compatible(self):
+        """ Execute query to check if `LOAD DATA LOCAL INFILE` is enabled on the server
+
+        :return: 1 if enabled else 0
+        :rtype: int
+        """
+        return self.execute(self.LOCAL_INFILE_QUERY, method='scalar')
+
+    def encode_rows(self, rows):
+        """
+        .. seealso:: :func:`gmaltcli.database.BaseValueManager.format_rows`
+        """
+        return self.format_rows(rows)
+
+    def send_rows(self, batch):
+        """ Load the rows with `LOAD_QUERY` in a single transaction
+
+        :param bytes batch: the rows in the text format of `LOAD DATA` provided by `encode_rows`
+        """
+        with self.connection.begin():
+            self.load(self.LOAD_QUERY, batch)
+
+    def load(self, query, data):
+        """ Write `data` in a temporary file and execute a `LOAD DATA LOCAL INFILE` query reading this file
+
+        .. warning:: executed inside the current transaction of the sqlalchemy connection
+
+        :param str query: the LOAD DATA query with a `%(path)s` placeholder for the path of the file
+        :param bytes data: the rows in the format expected by the query
+        """
+        fd, path = tempfile.mkstemp(prefix='gmalt-', suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'wb') as stream:
+                stream.write(data)
+            self._execute(self.connection, query, {'path': path})
+        finally:
+            os.remove(path)
+
+
+class MysqlTileManager(MysqlValueManager):
+    """ Provides SQL queries to import elevation values in a MySQL table as BLOB, one BLOB per HGT file
+    or per sample of a HGT file, with a spatial index on the envelope of the sample
+
+    .. note:: the BLOB has the same layout as the one of :class:`gmaltcli.database.SqliteTileManager`. The rows are
+        inserted with multi-row `INSERT IGNORE` queries, the BLOB being sent in hexadecimal.
+
+    .. warning:: MySQL 8.0 or later is required for the spatial index (SRID attribute of the envelope column)
+    """
+    USE_RASTER = True
+
+    DEFAULT_BATCH_SIZE = 10
+
+    # The incremental import replaces blocks of lines, not rasters
+    BLOCK_DELETE_QUERY = None
+
+    VERSION_QUERY = "SELECT VERSION();"
+
+    TABLE_CREATE_QUERY = ("CREATE TABLE `{table_name}` ("
+                          "    lat_min DOUBLE NOT NULL,"
+                          "    lng_min DOUBLE NOT NULL,"
+                          "    lat_max DOUBLE NOT NULL,"
+                          "    lng_max DOUBLE NOT NULL,"
+                          "    width INT NOT NULL,"
+                          "    height INT NOT NULL,"
+                          "    data LONGBLOB NOT NULL,"
+                          "    envelope POLYGON NOT NULL SRID 0"
+                          ") ENGINE=InnoDB;")
+
+    INDEX_CREATE_QUERY = ("ALTER TABLE `{table_name}` "
+                          "ADD PRIMARY KEY (lat_min, lng_min, lat_max, lng_max), "
+                          "ADD SPATIAL INDEX `{table_name}_envelope_idx` (envelope);")
+
+    VALUE_CREATE_QUERY = ("INSERT IGNORE INTO `{table_name}` "
+                          "(lat_min, lng_min, lat_max, lng_max, width, height, data, envelope) "
+                          "VALUES {values};")
+
+    VALUE_ROW_TEMPLATE = ("(%(lat_min_{idx})s, %(lng_min_{idx})s, %(lat_max_{idx})s, %(lng_max_{idx})s, "
+                          "%(width_{idx})s, %(height_{idx})s, UNHEX(%(data_{idx})s), "
+                          "ST_MakeEnvelope(Point(%(lng_min_{idx})s, %(lat_min_{idx})s), "
+                          "Point(%(lng_max_{idx})s, %(lat_max_{idx})s)))")
+
+    def is_compatible(self):
+        """ Check if the server is MySQL 8.0 or later
+
+        :rtype: bool
+        """
+        if not super(MysqlTileManager, self).is_compatible():
+            return False
+        version = self.execute(self.VERSION_QUERY, method='scalar')
+        return 'mariadb' not in version.lower() and int(version.split('.')[0]) >= 8
+
+    def is_void(self, data, parser):
+        """ A sample is not imported if all its values are void
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.is_void`
+        """
+        return bool(numpy.all(numpy.asarray(data[4]) == parser.VOID_VALUE))
+
+    def prepare_params(self, data, parser):
+        """ The bounds of the sample and its values as hexadecimal BLOB
+
+        .. seealso:: :func:`gmaltcli.database.BaseManager.prepare_params`
+        """
         area_corners = data[3]
-        top_left_corner = area_corners[1]
-        bottom_right_corner = area_corners[3]
+        values = numpy.asarray(data[4], dtype='>i2')
 
         return {
-            # Used in INSERT query
-            'width': len(elevation_values[0]),
-            'height': len(elevation_values),
-            'topleftx': top_left_corner[1],
-            'toplefty': top_left_corner[0],
-            'scalex': float(parser.square_width),
-            'scaley': -1 * float(parser.square_height),  # raster descending on latitude (line per line)
-            'default_value': 0,
-            'nodata_value': parser.VOID_VALUE,
-            'elevation_values': elevation_values,
-
-            # Used in SELECT query
-            'minx': top_left_corner[1],
-            'miny': bottom_right_corner[0],
-            'maxx': bottom_right_corner[1],
-            'maxy': top_left_corner[0]
+            'lat_min': min([corner[0] for corner in area_corners]),
+            'lat_max': max([corner[0] for corner in area_corners]),
+            'lng_min': min([corner[1] for corner in area_corners]),
+            'lng_max': max([corner[1] for corner in area_corners]),
+            'width': values.shape[1],
+            'height': values.shape[0],
+            'data': binascii.hexlify(values.tobytes()).decode('ascii')
         }
+
+
+class MysqlLoadTileManager(MysqlTileManager, MysqlLoadValueManager):
+    """ Provides the same schema as :class:`gmaltcli.database.MysqlTileManager` but loads the samples with
+    `LOAD DATA LOCAL INFILE`
+
+    .. note:: :func:`gmaltcli.database.MysqlTileManager.is_compatible` also checks that `LOAD DATA LOCAL INFILE` is
+        enabled as it calls the one of :class:`gmaltcli.database.MysqlLoadValueManager` next in the MRO
+
+    .. warning:: the `local_infile` system variable must be enabled on the MySQL server
+    """
+    METHOD = 'copy'
+
+    LOAD_QUERY = ("LOAD DATA LOCAL INFILE %(path)s "
+                  "IGNORE INTO TABLE `{table_name}` (lat_min, lng_min, lat_max, lng_max, width, height, @data) "
+                  "SET data = UNHEX(@data), envelope = ST_MakeEnvelope(Point(lng_min, lat_min), "
+                  "Point(lng_max, lat_max));")
+
+    @staticmethod
+    def format_rows(rows):
+        """ Format rows in the tab separated text format of the `LOAD_QUERY`
+
+        :param list rows: list of dict provided by `prepare_params`
+        :return: the encoded rows, one line per row with tab separated columns
+        :rtype: bytes
+        """
+        lines = ['{!r}\t{!r}\t{!r}\t{!r}\t{:d}\t{:d}\t{}\n'.format(
+            row['lat_min'], row['lng_min'], row['lat_max'], row['lng_max'], row['width'], row['height'],
+            row['data']) for row in rows]
+        return ''.join(lines).encode('ascii')
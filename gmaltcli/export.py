@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+import binascii
+
+import numpy
+from future.utils import with_metaclass
+
+import gmaltcli.database as database
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ExporterRegistry(type):
+    """ Python Registry pattern to store all exporters by output format
+
+    .. note:: An exporter extends :class:`gmaltcli.export.BaseExporter` to write the elevation data of a HGT file
+        in a file the database can ingest natively
+    """
+    REGISTRY = {}
+
+    def __new__(cls, *args, **kwargs):
+        new_cls = type.__new__(cls, *args, **kwargs)
+        if new_cls.FORMAT:
+            cls.REGISTRY[new_cls.FORMAT] = new_cls
+        return new_cls
+
+    @staticmethod
+    def get_exporter_class(format_):
+        """ Get the exporter class of an output format
+
+        :param str format_: the output format
+        :return: :class:`gmaltcli.export.BaseExporter`
+        """
+        if format_ not in ExporterRegistry.REGISTRY:
+            raise Exception('Unknown export format {}'.format(format_))
+        return ExporterRegistry.REGISTRY[format_]
+
+
+class BaseExporter(with_metaclass(ExporterRegistry, object)):
+    """ Base class to write the elevation data of a HGT file in an output file
+
+    .. note:: child class needs to define the `FORMAT`, the `EXTENSION` and the `write` method which writes an item
+        provided by `get_iterator`
+
+    .. note:: exporter object needs to be accessed using a context manager. The data are streamed in a temporary
+        `.part` file which is renamed once complete so that an existing output file is always a complete one
+
+    :param str filepath: the path of the output file
+    :param tuple samples: tuple with raster sampling on lng and lat (raster formats only)
+    """
+    FORMAT = None
+    EXTENSION = None
+
+    BLOCK_LINES = 100
+
+    def __init__(self, filepath, samples=(None, None)):
+        self.filepath = filepath
+        self.sample_width, self.sample_height = samples
+        self.stream = None
+        self.nb_rows = 0
+        self.discarded = False
+
+    @classmethod
+    def get_output_path(cls, output_dir, hgt_filepath):
+        """ Get the path of the output file of a HGT file
+
+        :param str output_dir: the folder of the output files
+        :param str hgt_filepath: the path of the HGT file
+        :return: the path of the output file, named after the HGT file with the `EXTENSION` of the format
+        :rtype: str
+        """
+        name = os.path.splitext(os.path.basename(hgt_filepath))[0]
+        return os.path.join(output_dir, '{}.{}'.format(name, cls.EXTENSION))
+
+    def __enter__(self):
+        self.stream = open(self.filepath + '.part', 'wb')
+        self.write_header()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        complete = exc_type is None and not self.discarded
+        try:
+            if complete:
+                self.write_footer()
+        finally:
+            self.stream.close()
+            self.stream = None
+
+        if complete:
+            os.rename(self.filepath + '.part', self.filepath)
+        else:
+            os.remove(self.filepath + '.part')
+
+    def discard(self):
+        """ Remove the incomplete output file when leaving the context manager instead of creating it """
+        self.discarded = True
+
+    def write_header(self):
+        """ Write the beginning of the file if the format needs it """
+        pass
+
+    def write_footer(self):
+        """ Write the end of the file if the format needs it """
+        pass
+
+    def get_iterator(self, block_reader):
+        """ Get the iterator of the items to write, blocks of `BLOCK_LINES` lines without void values by default
+
+        :param block_reader: the reader of the HGT file
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :return: iterator of items accepted by `write`
+        :rtype: iter
+        """
+        return block_reader.get_block_iterator(self.BLOCK_LINES)
+
+    def write(self, item):
+        """ Write an item provided by `get_iterator`
+
+        .. note:: see implementation in child class
+
+        :param item: an item provided by `get_iterator`
+        :type item: :class:`gmaltcli.reader.HgtBlock`
+        """
+        raise Exception('to be implemented in child class')
+
+
+class CsvExporter(BaseExporter):
+    """ Write the elevation values in CSV with a header line, the columns of the standard table
+
+    .. note:: load it with `\\copy elevation FROM 'N00E010.csv' WITH (FORMAT csv, HEADER)` in psql
+    """
+    FORMAT = 'csv'
+    EXTENSION = 'csv'
+
+    def write_header(self):
+        self.stream.write(b'lat_min,lng_min,lat_max,lng_max,value\n')
+
+    def write(self, item):
+        """ Write a block of elevation values, one line per value
+
+        :param item: a block of elevation values
+        :type item: :class:`gmaltcli.reader.HgtBlock`
+        """
+        columns = (item.lat_min.tolist(), item.lng_min.tolist(), item.lat_max.tolist(), item.lng_max.tolist(),
+                   item.value.tolist())
+        lines = ['{!r},{!r},{!r},{!r},{:d}\n'.format(*row) for row in zip(*columns)]
+        self.stream.write(''.join(lines).encode('ascii'))
+        self.nb_rows += len(lines)
+
+
+# Signature, flags and header extension length of the PostgreSQL binary COPY format
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# A row of the standard table in the PostgreSQL binary COPY format : the number of fields then the length and the
+# big-endian value of each field
+PGCOPY_ROW_DTYPE = numpy.dtype([
+    ('nb_fields', '>i2'),
+    ('lat_min_length', '>i4'), ('lat_min', '>f8'),
+    ('lng_min_length', '>i4'), ('lng_min', '>f8'),
+    ('lat_max_length', '>i4'), ('lat_max', '>f8'),
+    ('lng_max_length', '>i4'), ('lng_max', '>f8'),
+    ('value_length', '>i4'), ('value', '>i2'),
+])
+
+
+class PgCopyExporter(BaseExporter):
+    """ Write the elevation values in the PostgreSQL binary COPY format, the columns of the standard table
+
+    .. note:: load it with `\\copy elevation FROM 'N00E010.pgcopy' WITH (FORMAT binary)` in psql. The binary
+        format is parsed faster than the text formats by the server.
+    """
+    FORMAT = 'pgcopy'
+    EXTENSION = 'pgcopy'
+
+    def write_header(self):
+        self.stream.write(PGCOPY_HEADER)
+
+    def write_footer(self):
+        self.stream.write(PGCOPY_TRAILER)
+
+    def write(self, item):
+        """ Write a block of elevation values, the rows are encoded at once in a NumPy structured array
+
+        :param item: a block of elevation values
+        :type item: :class:`gmaltcli.reader.HgtBlock`
+        """
+        rows = numpy.empty(len(item.value), dtype=PGCOPY_ROW_DTYPE)
+        rows['nb_fields'] = 5
+        for column in ('lat_min', 'lng_min', 'lat_max', 'lng_max', 'value'):
+            rows[column + '_length'] = PGCOPY_ROW_DTYPE[column].itemsize
+            rows[column] = getattr(item, column)
+        self.stream.write(rows.tobytes())
+        self.nb_rows += len(rows)
+
+
+class ParquetExporter(BaseExporter):
+    """ Write the elevation values in a Parquet file, one row group per block, the columns of the standard table
+
+    .. note:: requires the optional `pyarrow` package
+    """
+    FORMAT = 'parquet'
+    EXTENSION = 'parquet'
+
+    def __init__(self, filepath, samples=(None, None)):
+        if pyarrow is None:
+            raise Exception('The parquet format requires the pyarrow package')
+        super(ParquetExporter, self).__init__(filepath, samples=samples)
+        self.writer = None
+
+    def write_header(self):
+        schema = pyarrow.schema([('lat_min', pyarrow.float64()), ('lng_min', pyarrow.float64()),
+                                 ('lat_max', pyarrow.float64()), ('lng_max', pyarrow.float64()),
+                                 ('value', pyarrow.int16())])
+        self.writer = pyarrow.parquet.ParquetWriter(self.stream, schema)
+
+    def write_footer(self):
+        self.writer.close()
+
+    def write(self, item):
+        """ Write a block of elevation values as a row group
+
+        :param item: a block of elevation values
+        :type item: :class:`gmaltcli.reader.HgtBlock`
+        """
+        columns = [pyarrow.array(getattr(item, column)) for column in ('lat_min', 'lng_min', 'lat_max', 'lng_max')]
+        columns.append(pyarrow.array(item.value.astype(numpy.int16)))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            columns, names=['lat_min', 'lng_min', 'lat_max', 'lng_max', 'value']))
+        self.nb_rows += len(item.value)
+
+
+class PgRasterExporter(BaseExporter):
+    """ Write the PostGIS rasters of a HGT file in the PostgreSQL text COPY format, one raster per line encoded
+    in hexadecimal WKB (one raster per file or per sample)
+
+    .. note:: load it with `\\copy elevation (rast) FROM 'N00E010.pgraster'` in psql, it is the offline
+        equivalent of the import with `raster2pgsql`
+    """
+    FORMAT = 'pgraster'
+    EXTENSION = 'pgraster'
+
+    def __init__(self, filepath, samples=(None, None)):
+        super(PgRasterExporter, self).__init__(filepath, samples=samples)
+        self.parser = None
+
+    def get_iterator(self, block_reader):
+        """ Iterate over the file by samples of `samples` values, a single sample by default
+
+        .. seealso:: :func:`gmaltcli.export.BaseExporter.get_iterator`
+        """
+        self.parser = block_reader.parser
+        return block_reader.get_sample_iterator(self.sample_width or block_reader.parser.sample_lng,
+                                                self.sample_height or block_reader.parser.sample_lat)
+
+    def write(self, item):
+        """ Write a sample as a raster. The samples with only void values are skipped
+
+        :param item: a sample provided by :class:`gmaltcli.reader.HgtSampleIterator`
+        :type item: tuple
+        """
+        values = numpy.asarray(item[4])
+        if numpy.all(values == self.parser.VOID_VALUE):
+            return
+
+        top_left_corner = item[3][1]
+        wkb = database.raster_wkb(values, top_left_corner[1], top_left_corner[0], float(self.parser.square_width),
+                                  -1 * float(self.parser.square_height), self.parser.VOID_VALUE)
+        self.stream.write(binascii.hexlify(wkb) + b'\n')
+        self.nb_rows += 1
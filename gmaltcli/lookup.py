@@ -0,0 +1,600 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import glob
+import json
+import math
+import logging
+import itertools
+import collections
+
+import numpy
+
+import gmaltcli.reader as reader
+
+
+# Formats of the points read by :func:`gmaltcli.lookup.lookup_stream`
+INPUT_FORMATS = ('csv', 'jsonl')
+
+# Number of points read, looked up and written at once
+CHUNK_SIZE = 100000
+
+# Maximum number of HGT files kept open by default by :class:`gmaltcli.lookup.TileCache`
+CACHE_MAX_TILES = 64
+
+# Interpolations of the elevation between the samples of the HGT files (see :meth:`TileLookup.interpolate`)
+INTERPOLATIONS = ('nearest', 'bilinear', 'bicubic')
+
+
+def tile_keys(lats, lngs):
+    """ Get the key of the 1x1 degree tile of each point, the tile is identified by the latitude and the longitude
+    of its bottom left corner like the HGT files (N00E010 for the points from 0 to 1 and from 10 to 11)
+
+    :param lats: the latitudes of the points
+    :type lats: :class:`numpy.ndarray` of float64
+    :param lngs: the longitudes of the points
+    :type lngs: :class:`numpy.ndarray` of float64
+    :return: the key of the tile of each point
+    :rtype: :class:`numpy.ndarray` of int64
+    """
+    return (numpy.floor(lats).astype(numpy.int64) + 90) * 361 + (numpy.floor(lngs).astype(numpy.int64) + 180)
+
+
+def tile_from_key(key):
+    """ Get the latitude and the longitude of the bottom left corner of a tile from its key
+
+    :param int key: the key of the tile provided by :func:`gmaltcli.lookup.tile_keys`
+    :return: the latitude and the longitude in degrees
+    :rtype: (int, int)
+    """
+    return int(key) // 361 - 90, int(key) % 361 - 180
+
+
+def tile_name(lat, lng):
+    """ Get the name of the HGT file of a tile without extension
+
+    :param int lat: the latitude of the bottom left corner of the tile
+    :param int lng: the longitude of the bottom left corner of the tile
+    :return: the name of the tile (for example N48E002)
+    :rtype: str
+    """
+    return '{}{:02d}{}{:03d}'.format('N' if lat >= 0 else 'S', abs(lat), 'E' if lng >= 0 else 'W', abs(lng))
+
+
+def cubic_weights(t):
+    """ Get the Catmull-Rom weights of the 4 samples around a point
+
+    :param t: the position of each point between the second and the third sample, from 0 to 1
+    :type t: :class:`numpy.ndarray` of float64
+    :return: the weight of each sample for each point
+    :rtype: :class:`numpy.ndarray` of float64 of shape (4, number of points)
+    """
+    t2, t3 = t * t, t * t * t
+    return numpy.array([-t3 + 2 * t2 - t, 3 * t3 - 5 * t2 + 2, -3 * t3 + 4 * t2 + t, t3 - t2]) / 2.
+
+
+def has_elevation(values, found):
+    """ Check if the points have an elevation
+
+    :param values: the elevation of each point, masked (values of :meth:`TileLookup.lookup`), `VOID_VALUE` of the
+        reader (integer values) or NaN (interpolated values) if no value
+    :type values: :class:`numpy.ndarray`
+    :param found: True for each point found in a HGT file
+    :type found: :class:`numpy.ndarray` of bool
+    :return: True for each point with an elevation
+    :rtype: :class:`numpy.ndarray` of bool
+    """
+    if numpy.ma.isMaskedArray(values):
+        return found & ~numpy.ma.getmaskarray(values)
+    if values.dtype.kind == 'f':
+        return found & ~numpy.isnan(values)
+    return found & (values != reader.HgtBlockReader.VOID_VALUE)
+
+
+HgtTile = collections.namedtuple('HgtTile', ['name', 'lat', 'lng', 'path', 'sample'])
+HgtTile.__doc__ = """ A HGT file of a :class:`gmaltcli.lookup.TileIndex`
+
+:param str name: the name of the tile (for example N48E002)
+:param int lat: the latitude of the bottom left corner of the tile
+:param int lng: the longitude of the bottom left corner of the tile
+:param str path: the path of the HGT file
+:param int sample: the number of values on each axis of the file (1201 for SRTM3, 3601 for SRTM1)
+"""
+
+
+class TileIndex(object):
+    """ In-memory index of HGT files by tile
+
+    .. note:: the tile and the resolution of a file are found from its name and its size once when the index is
+        built. A point is routed to a file without any access to the file system.
+
+    .. note:: a HGT file covers half a square more than its tile on each side as its values are the centers of the
+        squares. A point is routed to the file of its tile (see :func:`gmaltcli.lookup.tile_keys`) and, if this file
+        is missing or does not cover it, to the file of the nearest adjacent tile covering it. So the points on the
+        edges of the tiles are found even when only one of the adjacent files is available.
+
+    :param list paths: the paths of the HGT files, the files whose name is not a tile name are ignored
+    """
+    FILENAME_REGEX = re.compile(r'^([NS])([0-9]{2})([EW])([0-9]{3})')
+
+    def __init__(self, paths):
+        tiles = {}
+        for path in paths:
+            tile = self.parse(path)
+            if tile is not None:
+                tiles[(tile.lat + 90) * 361 + tile.lng + 180] = tile
+
+        self.keys = numpy.array(sorted(tiles), dtype=numpy.int64)
+        self.tiles = [tiles[key] for key in self.keys.tolist()]
+        self.samples = numpy.array([tile.sample for tile in self.tiles], dtype=numpy.int64)
+        # the bottom, left, top and right bounds of the area covered by each file
+        margins = numpy.array([0.5 / (tile.sample - 1) for tile in self.tiles])
+        corners = numpy.array([(tile.lat, tile.lng) for tile in self.tiles], dtype=float).reshape((-1, 2))
+        self.bounds = numpy.column_stack((corners[:, 0] - margins, corners[:, 1] - margins,
+                                          corners[:, 0] + 1 + margins, corners[:, 1] + 1 + margins))
+
+    @classmethod
+    def from_path(cls, path):
+        """ Build the index of a HGT file or of the HGT files of a folder
+
+        :param str path: the path of a HGT file or of a folder
+        :return: the index
+        :rtype: :class:`gmaltcli.lookup.TileIndex`
+        :raise Exception: if the path is neither a folder nor a HGT file
+        """
+        if os.path.isdir(path):
+            return cls(glob.glob(os.path.join(path, '*.hgt')))
+        if not os.path.isfile(path):
+            raise Exception('file {} not found'.format(path))
+        if cls.parse(path) is None:
+            raise Exception('file {} does not match expected HGT file pattern'.format(os.path.basename(path)))
+        return cls([path])
+
+    @classmethod
+    def parse(cls, path):
+        """ Get the tile of a HGT file from its name and its resolution from its size
+
+        :param str path: the path of the HGT file
+        :return: the tile or None if the name is not a tile name or the file is not square
+        :rtype: :class:`gmaltcli.lookup.HgtTile`
+        """
+        result = cls.FILENAME_REGEX.match(os.path.basename(path))
+        if not result:
+            return None
+        sample = int(math.sqrt(os.path.getsize(path) // 2))
+        if sample < 2 or 2 * sample * sample != os.path.getsize(path):
+            logging.warning('file {} is not a square HGT file, ignored'.format(path))
+            return None
+
+        lat_order, lat, lng_order, lng = result.groups()
+        lat = -int(lat) if lat_order == 'S' else int(lat)
+        lng = -int(lng) if lng_order == 'W' else int(lng)
+        return HgtTile(tile_name(lat, lng), lat, lng, path, sample)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def get_positions(self, keys):
+        """ Get the position in `tiles` of the tile of each key
+
+        :param keys: the keys of the tiles (see :func:`gmaltcli.lookup.tile_keys`)
+        :type keys: :class:`numpy.ndarray` of int64
+        :return: the position of each tile, -1 if the tile is not in the index
+        :rtype: :class:`numpy.ndarray` of int64
+        """
+        if not len(self.keys):
+            return numpy.full(len(keys), -1, dtype=numpy.int64)
+        positions = numpy.minimum(numpy.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return numpy.where(self.keys[positions] == keys, positions, -1)
+
+    def route(self, lats, lngs):
+        """ Get the file covering each point
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :return: the position in `tiles` of the file of each point, -1 if no file covers the point
+        :rtype: :class:`numpy.ndarray` of int64
+        """
+        positions = numpy.full(len(lats), -1, dtype=numpy.int64)
+        valid = numpy.nonzero(numpy.isfinite(lats) & numpy.isfinite(lngs))[0]
+        lats, lngs = lats[valid], lngs[valid]
+        keys = tile_keys(lats, lngs)
+        # the adjacent tiles on the side of the nearest edge
+        lat_step = numpy.where(lats - numpy.floor(lats) < 0.5, -361, 361)
+        lng_step = numpy.where(lngs - numpy.floor(lngs) < 0.5, -1, 1)
+        for candidates in (keys, keys + lat_step, keys + lng_step, keys + lat_step + lng_step):
+            todo = numpy.nonzero(positions[valid] == -1)[0]
+            candidate = self.get_positions(candidates[todo])
+            known = candidate >= 0
+            bounds = self.bounds[candidate[known]]
+            inside = ((bounds[:, 0] < lats[todo[known]]) & (bounds[:, 1] < lngs[todo[known]])
+                      & (lats[todo[known]] < bounds[:, 2]) & (lngs[todo[known]] < bounds[:, 3]))
+            positions[valid[todo[known][inside]]] = candidate[known][inside]
+        return positions
+
+    def find(self, lat, lng):
+        """ Get the file covering a point
+
+        :param float lat: the latitude of the point
+        :param float lng: the longitude of the point
+        :return: the tile or None if no file covers the point
+        :rtype: :class:`gmaltcli.lookup.HgtTile`
+        """
+        position = self.route(numpy.array([lat], dtype=float), numpy.array([lng], dtype=float))[0]
+        return self.tiles[position] if position >= 0 else None
+
+
+class TileCache(object):
+    """ LRU cache of the memory-mapped HGT files
+
+    .. note:: a file is memory-mapped by :class:`gmaltcli.reader.HgtBlockReader` when it is first used so that the
+        values are read through the page cache of the OS. It stays open until it is the least recently used file
+        and the cache is full : more than `max_tiles` files or more than `max_bytes` bytes mapped.
+
+    .. note:: the number of `hits` (file already open), `misses` (file opened) and `evictions` (file closed to
+        free the cache) are counted
+
+    :param int max_tiles: the maximum number of files kept open, None for no limit
+    :param int max_bytes: the maximum number of bytes mapped, None for no limit. The last file used is kept open
+        even if it is larger.
+    """
+    def __init__(self, max_tiles=CACHE_MAX_TILES, max_bytes=None):
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self.readers = collections.OrderedDict()
+        self.nb_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.readers)
+
+    def get(self, tile):
+        """ Get the opened reader of a file, the file is opened on a miss
+
+        :param tile: the file
+        :type tile: :class:`gmaltcli.lookup.HgtTile`
+        :return: the reader
+        :rtype: :class:`gmaltcli.reader.HgtBlockReader`
+        """
+        block_reader = self.readers.pop(tile.path, None)
+        if block_reader is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            size = 2 * tile.sample * tile.sample
+            while self.readers and ((self.max_tiles is not None and len(self.readers) >= self.max_tiles)
+                                    or (self.max_bytes is not None and self.nb_bytes + size > self.max_bytes)):
+                self.evict()
+            block_reader = reader.HgtBlockReader(tile.path, tile.sample, tile.sample).__enter__()
+            self.nb_bytes += size
+        # the most recently used file is the last one
+        self.readers[tile.path] = block_reader
+        return block_reader
+
+    def evict(self):
+        """ Close the least recently used file """
+        block_reader = self.readers.popitem(last=False)[1]
+        self.nb_bytes -= block_reader.values.size * block_reader.values.itemsize
+        block_reader.__exit__(None, None, None)
+        self.evictions += 1
+
+    def clear(self):
+        """ Close all the files, the counters are kept """
+        for block_reader in self.readers.values():
+            block_reader.__exit__(None, None, None)
+        self.readers.clear()
+        self.nb_bytes = 0
+
+    @property
+    def stats(self):
+        """
+        :return: the counters of the cache and the number of files open and of bytes mapped
+        :rtype: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'tiles': len(self.readers),
+                'bytes': self.nb_bytes}
+
+
+class TileLookup(object):
+    """ Look up the elevation of many points in HGT files
+
+    .. note:: the points are routed to their file by a :class:`gmaltcli.lookup.TileIndex` then grouped by file.
+        The files are memory-mapped and kept open by a :class:`gmaltcli.lookup.TileCache`, the elevations of the
+        points of a file are read with a single vectorized lookup.
+
+    .. note:: the names of the missing tiles of the points not found are collected in `missing`
+
+    .. note:: lookup object needs to be accessed using a context manager. The files opened are closed when leaving
+        the context manager.
+
+    :param str path: the HGT file or the folder of the HGT files of the points
+    :param int max_tiles: the maximum number of files kept open, None for no limit
+    :param int max_bytes: the maximum number of bytes mapped, None for no limit
+    """
+    def __init__(self, path, max_tiles=CACHE_MAX_TILES, max_bytes=None):
+        self.index = TileIndex.from_path(path)
+        self.cache = TileCache(max_tiles, max_bytes)
+        self.missing = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cache.clear()
+
+    def get_reader(self, position):
+        """ Get the opened reader of a file of the index from the cache
+
+        :param int position: the position of the file in the `tiles` of the index
+        :return: the reader
+        :rtype: :class:`gmaltcli.reader.HgtBlockReader`
+        """
+        return self.cache.get(self.index.tiles[position])
+
+    def lookup(self, lats, lngs):
+        """ Get the elevation of each point
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :return: the elevation of each point, masked if no value or if the point is not in a HGT file (None in
+            `tolist()` like :func:`gmaltcli.hgt.HgtParser.get_elevation`), and True for each point found in a HGT file
+        :rtype: (:class:`numpy.ma.MaskedArray` of int16, :class:`numpy.ndarray` of bool)
+        """
+        values = numpy.full(len(lats), reader.HgtBlockReader.VOID_VALUE, dtype=numpy.int16)
+        positions = self.index.route(lats, lngs)
+        found = positions >= 0
+
+        for position, indexes in self.group(positions):
+            values[indexes] = self.get_reader(position).get_elevations(lats[indexes], lngs[indexes])[2]
+
+        lost = ~found & numpy.isfinite(lats) & numpy.isfinite(lngs)
+        self.missing.update(tile_name(*tile_from_key(key)) for key in numpy.unique(tile_keys(lats[lost], lngs[lost])))
+        return numpy.ma.masked_equal(values, reader.HgtBlockReader.VOID_VALUE, copy=False), found
+
+    @staticmethod
+    def group(positions):
+        """ Group the items by file
+
+        :param positions: the position of the file of each item, -1 if no file
+        :type positions: :class:`numpy.ndarray` of int64
+        :return: iterator of the position of each file and of the indexes of its items
+        :rtype: iter
+        """
+        routed = numpy.nonzero(positions >= 0)[0]
+        # the items of a file are consecutive once sorted by position
+        order = numpy.argsort(positions[routed], kind='mergesort')
+        files, starts = numpy.unique(positions[routed][order], return_index=True)
+        return zip(files.tolist(), numpy.split(routed[order], starts[1:]))
+
+    def get_samples(self, keys, lines, cols, samples):
+        """ Get the values of samples of the tiles
+
+        .. note:: a line or a column index may be one step beyond the edges of the file (-1 or `samples`), the value
+            is read in the adjacent file as the files share their edges. The value is `VOID_VALUE` if the adjacent
+            file is missing or if its resolution is not the same.
+
+        :param keys: the key of the tile of each sample (see :func:`gmaltcli.lookup.tile_keys`)
+        :type keys: :class:`numpy.ndarray` of int64
+        :param lines: the zero based line number of each sample
+        :type lines: :class:`numpy.ndarray` of int64
+        :param cols: the zero based column number of each sample
+        :type cols: :class:`numpy.ndarray` of int64
+        :param samples: the number of values on each axis of the file of each sample
+        :type samples: :class:`numpy.ndarray` of int64
+        :return: the value of each sample
+        :rtype: :class:`numpy.ndarray` of int16
+        """
+        north, south = (lines < 0).astype(numpy.int64), (lines >= samples).astype(numpy.int64)
+        west, east = (cols < 0).astype(numpy.int64), (cols >= samples).astype(numpy.int64)
+        keys = keys + 361 * (north - south) + east - west
+        lines = lines + (samples - 1) * (north - south)
+        cols = cols + (samples - 1) * (west - east)
+
+        positions = self.index.get_positions(keys)
+        known = positions >= 0
+        positions[known] = numpy.where(self.index.samples[positions[known]] == samples[known], positions[known], -1)
+
+        values = numpy.full(len(keys), reader.HgtBlockReader.VOID_VALUE, dtype=numpy.int16)
+        for position, indexes in self.group(positions):
+            values[indexes] = self.get_reader(position).values[lines[indexes], cols[indexes]]
+        return values
+
+    def interpolate(self, lats, lngs, method='bilinear'):
+        """ Get the elevation of each point interpolated between the samples around it
+
+        .. note:: `bilinear` interpolates the 4 samples around the point, the void samples are left out. `bicubic`
+            interpolates the 16 samples around the point with Catmull-Rom splines, the bilinear value is used if one
+            of the 16 samples is void. The samples beyond the edge of the file of the point are read in the adjacent
+            files (see :meth:`get_samples`). `nearest` is the value of :meth:`lookup`.
+
+        .. note:: a point outside of the tiles of the index but inside the half square margin of a file gets the
+            values of the edge of the file
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :param str method: one of `INTERPOLATIONS`
+        :return: the elevation of each point (NaN if no value) and True for each point found in a HGT file
+        :rtype: (:class:`numpy.ndarray` of float64, :class:`numpy.ndarray` of bool)
+        :raise ValueError: if the method is unknown
+        """
+        if method == 'nearest':
+            values, found = self.lookup(lats, lngs)
+            return values.astype(numpy.float64).filled(numpy.nan), found
+        if method not in INTERPOLATIONS:
+            raise ValueError('Unknown interpolation method {}'.format(method))
+
+        elevations = numpy.full(len(lats), numpy.nan)
+        positions = self.index.route(lats, lngs)
+        found = positions >= 0
+        routed = numpy.nonzero(found)[0]
+        lats, lngs = lats[routed], lngs[routed]
+
+        # the samples are read in the file of the tile of the point if available
+        own = self.index.get_positions(tile_keys(lats, lngs))
+        homes = numpy.where(own >= 0, own, positions[routed])
+        keys, samples = self.index.keys[homes], self.index.samples[homes]
+        last = samples - 1
+        y = numpy.clip((keys // 361 - 89 - lats) * last, 0, last)
+        x = numpy.clip((lngs - (keys % 361 - 180)) * last, 0, last)
+        lines = numpy.minimum(numpy.floor(y).astype(numpy.int64), last - 1)
+        cols = numpy.minimum(numpy.floor(x).astype(numpy.int64), last - 1)
+        t, u = y - lines, x - cols
+
+        # the values of the size x size samples around each point
+        offsets = numpy.arange(-1, 3) if method == 'bicubic' else numpy.arange(2)
+        size = len(offsets)
+        shape = (size, size, len(routed))
+        grid = self.get_samples(numpy.broadcast_to(keys, shape).ravel(),
+                                numpy.broadcast_to(lines + offsets[:, None, None], shape).ravel(),
+                                numpy.broadcast_to(cols + offsets[:, None], shape).ravel(),
+                                numpy.broadcast_to(samples, shape).ravel()).reshape(shape)
+
+        inner = grid[size // 2 - 1:size // 2 + 1, size // 2 - 1:size // 2 + 1]
+        weights = numpy.array([1 - t, t])[:, None] * numpy.array([1 - u, u])[None, :]
+        weights = numpy.where(inner != reader.HgtBlockReader.VOID_VALUE, weights, 0)
+        total = weights.sum(axis=(0, 1))
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            values = numpy.where(total > 0, (weights * inner).sum(axis=(0, 1)) / total, numpy.nan)
+
+        if method == 'bicubic':
+            cubic = (cubic_weights(t)[:, None] * cubic_weights(u)[None, :] * grid).sum(axis=(0, 1))
+            complete = (grid != reader.HgtBlockReader.VOID_VALUE).all(axis=(0, 1))
+            values = numpy.where(complete, cubic, values)
+
+        elevations[routed] = values
+        return elevations, found
+
+    def get_elevation(self, lat, lng):
+        """ Get the elevation of a point
+
+        :param float lat: the latitude of the point
+        :param float lng: the longitude of the point
+        :return: the elevation in meters or None if no value or if no file covers the point
+        :rtype: int
+        """
+        values, found = self.lookup(numpy.array([lat], dtype=float), numpy.array([lng], dtype=float))
+        return values.tolist()[0]
+
+
+def parse_points(lines, input_format='csv'):
+    """ Parse the latitude and the longitude of the point of each line
+
+    :param list lines: the lines of the input, `lat,lng[,...]` with the csv format or a JSON object with the `lat`
+        and `lng` keys with the jsonl format
+    :param str input_format: one of `INPUT_FORMATS`
+    :return: the latitudes and the longitudes (NaN if the line could not be parsed) and the JSON objects with the
+        jsonl format (None with the csv format)
+    :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, list)
+    """
+    points = numpy.full((len(lines), 2), numpy.nan)
+    objects = [] if input_format == 'jsonl' else None
+    for idx, line in enumerate(lines):
+        if objects is not None:
+            objects.append(None)
+        try:
+            if objects is None:
+                fields = line.split(',', 2)
+                points[idx] = float(fields[0]), float(fields[1])
+            else:
+                objects[idx] = json.loads(line)
+                points[idx] = float(objects[idx]['lat']), float(objects[idx]['lng'])
+        except (ValueError, IndexError, KeyError, TypeError):
+            pass
+    return points[:, 0], points[:, 1], objects
+
+
+def format_results(lines, objects, values, found):
+    """ Add the elevation to each line of the input
+
+    :param list lines: the lines of the input
+    :param list objects: the JSON objects parsed from the lines with the jsonl format, None with the csv format
+    :param values: the elevation of each point, integer values or interpolated values (see
+        :func:`gmaltcli.lookup.has_elevation`)
+    :type values: :class:`numpy.ndarray`
+    :param found: True for each point found in a HGT file
+    :type found: :class:`numpy.ndarray` of bool
+    :return: the output lines, the line with a `,elevation` column appended with the csv format (empty if no value)
+        or the JSON object with an `elevation` key (null if no value) with the jsonl format. The interpolated
+        values are rounded to the centimeter.
+    :rtype: list
+    """
+    has_value = has_elevation(values, found)
+    elevations = numpy.where(has_value, values, 0)
+    if elevations.dtype.kind == 'f':
+        elevations = numpy.round(elevations, 2)
+    elevations, has_value = elevations.tolist(), has_value.tolist()
+    if objects is None:
+        return ['{},{}'.format(line, elevation if ok else '')
+                for line, elevation, ok in zip(lines, elevations, has_value)]
+
+    results = []
+    for line, obj, elevation, ok in zip(lines, objects, elevations, has_value):
+        if not isinstance(obj, dict):
+            obj = {'input': line}
+        obj['elevation'] = elevation if ok else None
+        results.append(json.dumps(obj))
+    return results
+
+
+def lookup_stream(input_stream, output_stream, tile_lookup, input_format='csv', chunk_size=CHUNK_SIZE,
+                  interpolation='nearest'):
+    """ Read the points of the input stream, look up their elevation and write them in the output stream in the
+    order of the input
+
+    .. note:: the points are processed by chunks of `chunk_size` lines so that the results are streamed. A csv
+        header line (the first line if its latitude is not a number) is written with an `elevation` column.
+        The empty lines are skipped.
+
+    :param input_stream: the file-like object of the points
+    :param output_stream: the file-like object of the results
+    :param tile_lookup: the lookup of the elevations
+    :type tile_lookup: :class:`gmaltcli.lookup.TileLookup`
+    :param str input_format: one of `INPUT_FORMATS`
+    :param int chunk_size: the number of points looked up at once
+    :param str interpolation: one of `INTERPOLATIONS`, `nearest` writes the integer value of the sample of the
+        point
+    :return: the number of points, of points with an elevation, of points with a void value, of points outside
+        of the HGT files and of lines which could not be parsed
+    :rtype: dict
+    """
+    counts = {'points': 0, 'found': 0, 'void': 0, 'not_found': 0, 'invalid': 0}
+    lines_iter = (line.rstrip('\r\n') for line in input_stream)
+    lines_iter = (line for line in lines_iter if line.strip())
+    check_header = input_format == 'csv'
+    while True:
+        lines = list(itertools.islice(lines_iter, chunk_size))
+        if not lines:
+            break
+
+        if check_header:
+            check_header = False
+            try:
+                float(lines[0].split(',', 1)[0])
+            except ValueError:
+                output_stream.write('{},elevation\n'.format(lines.pop(0)))
+                if not lines:
+                    continue
+
+        lats, lngs, objects = parse_points(lines, input_format)
+        if interpolation == 'nearest':
+            values, found = tile_lookup.lookup(lats, lngs)
+        else:
+            values, found = tile_lookup.interpolate(lats, lngs, interpolation)
+        output_stream.write('\n'.join(format_results(lines, objects, values, found)) + '\n')
+
+        invalid = int(numpy.count_nonzero(~(numpy.isfinite(lats) & numpy.isfinite(lngs))))
+        void = int(numpy.count_nonzero(found & ~has_elevation(values, found)))
+        counts['points'] += len(lines)
+        counts['invalid'] += invalid
+        counts['void'] += void
+        counts['found'] += int(numpy.count_nonzero(found)) - void
+        counts['not_found'] += len(lines) - int(numpy.count_nonzero(found)) - invalid
+    return counts
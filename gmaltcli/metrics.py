@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import logging
+import datetime
+import contextlib
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+
+class Metrics(object):
+    """ Counters and timers of a worker
+
+    .. note:: the timers are exclusive : the time spent in a timer started inside another one is only added to the
+        inner timer. For example, the `execute` timer of a manager runs inside the `encode` timer of the import
+        worker and the `encode` time doesn't include the database time.
+
+    .. note:: the worker sends its metrics by deltas (see `pop`) to the :class:`gmaltcli.metrics.MetricsCollector`
+        of its pool at most every `REPORT_INTERVAL` seconds
+    """
+    REPORT_INTERVAL = 1.
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.stack = []
+        self.last_report = time.time()
+
+    def count(self, name, value=1):
+        """ Increment a counter
+
+        :param str name: the name of the counter (`files`, `rows`, `values`, `bytes`)
+        :param int value: the increment
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        """ Add time to a timer
+
+        :param str name: the name of the timer (`parse`, `encode`, `execute`, `commit`...)
+        :param float seconds: the time to add
+        """
+        self.timers[name] = self.timers.get(name, 0.) + seconds
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """ Context manager adding the time spent in its block to a timer, the enclosing timer is paused
+
+        :param str name: the name of the timer
+        """
+        now = time.time()
+        if self.stack:
+            self.add_time(self.stack[-1][0], now - self.stack[-1][1])
+        self.stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.time()
+            name, start = self.stack.pop()
+            self.add_time(name, now - start)
+            if self.stack:
+                self.stack[-1][1] = now
+
+    def timed(self, iterable, name):
+        """ Iterate over `iterable` adding the time spent to get each item to a timer
+
+        :param iterable: an iterable, for example the block iterator of a HGT reader
+        :param str name: the name of the timer
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.timer(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def is_due(self):
+        """
+        :return: True if the metrics have not been reported for `REPORT_INTERVAL` seconds
+        :rtype: bool
+        """
+        return time.time() - self.last_report >= self.REPORT_INTERVAL
+
+    def pop(self):
+        """ Get the counters and the timers since the last call and reset them
+
+        .. note:: the time already spent in the running timers is included
+
+        :return: dict with the `counters` and `timers` keys
+        :rtype: dict
+        """
+        now = time.time()
+        if self.stack:
+            self.add_time(self.stack[-1][0], now - self.stack[-1][1])
+            self.stack[-1][1] = now
+        report = {'counters': self.counters, 'timers': self.timers}
+        self.counters = {}
+        self.timers = {}
+        self.last_report = now
+        return report
+
+
+class MetricsCollector(object):
+    """ Aggregate the metrics reported by the workers of a pool for a phase of a command (`download`, `extract`,
+    `load`, `export`)
+
+    .. note:: the reports are collected by the main thread (see :func:`gmaltcli.worker.WorkerPool.collect`) which logs
+        a progress line every `PROGRESS_INTERVAL` seconds. The ETA is computed from the bytes processed if
+        `total_bytes` is known else from the files processed.
+
+    .. note:: use the collector as a context manager around the execution of the pool to time the phase
+
+    :param str phase: the name of the phase
+    :param int total_bytes: the number of bytes to process if known
+    """
+    PROGRESS_INTERVAL = 10.
+
+    def __init__(self, phase, total_bytes=None):
+        self.phase = phase
+        self.total_files = 0
+        self.total_bytes = total_bytes
+        self.start_time = None
+        self.end_time = None
+        self.last_progress = time.time()
+        self.workers = {}
+        self.extra = {}
+
+    def __enter__(self):
+        self.start_time = self.last_progress = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end_time = time.time()
+        self.progress(force=True)
+
+    @property
+    def elapsed(self):
+        """
+        :return: the duration of the phase in seconds
+        :rtype: float
+        """
+        if self.start_time is None:
+            return 0.
+        return (self.end_time or time.time()) - self.start_time
+
+    def add(self, worker, report):
+        """ Add a report of a worker
+
+        :param str worker: the name of the worker
+        :param dict report: the report provided by :func:`gmaltcli.metrics.Metrics.pop`
+        """
+        self.add_to(self.workers.setdefault(worker, {'counters': {}, 'timers': {}}), [report])
+
+    def collect(self, reports):
+        """ Add the pending reports of a queue then log the progress line if due
+
+        :param reports: the queue of the (worker name, report) tuples put by the workers
+        :type reports: :class:`queue.Queue`
+        """
+        while True:
+            try:
+                worker, report = reports.get(block=False)
+            except queue.Empty:
+                break
+            self.add(worker, report)
+        self.progress()
+
+    def totals(self):
+        """
+        :return: the counters and the timers of all the workers
+        :rtype: dict
+        """
+        totals = {'counters': {}, 'timers': {}}
+        self.add_to(totals, self.workers.values())
+        return totals
+
+    @staticmethod
+    def add_to(totals, reports):
+        """ Add the counters and the timers of reports to `totals`
+
+        :param dict totals: dict with the `counters` and `timers` keys
+        :param iterable reports: the reports to add
+        """
+        for report in reports:
+            for kind in ('counters', 'timers'):
+                for name, value in report[kind].items():
+                    totals[kind][name] = totals[kind].get(name, 0) + value
+
+    def eta(self, counters):
+        """
+        :param dict counters: the counters of all the workers
+        :return: the estimated remaining time in seconds or None if unknown
+        :rtype: float or None
+        """
+        if self.total_bytes:
+            done, total = counters.get('bytes', 0), self.total_bytes
+        else:
+            done, total = counters.get('files', 0), self.total_files
+        if not done or not total:
+            return None
+        return max(total - done, 0) * self.elapsed / done
+
+    def progress(self, force=False):
+        """ Log the progress line of the phase if it has not been logged for `PROGRESS_INTERVAL` seconds
+
+        :param bool force: if True, log it anyway
+        """
+        if not force and time.time() - self.last_progress < self.PROGRESS_INTERVAL:
+            return
+        self.last_progress = time.time()
+
+        counters = self.totals()['counters']
+        elapsed = self.elapsed or 1.
+        eta = self.eta(counters)
+        logging.info('progress - {} : {}/{} files, {} rows, {:.0f} rows/s, {:.1f} MB/s, ETA {}'.format(
+            self.phase, counters.get('files', 0), self.total_files, counters.get('rows', 0),
+            counters.get('rows', 0) / elapsed, counters.get('bytes', 0) / elapsed / 1e6,
+            datetime.timedelta(seconds=int(eta)) if eta is not None else 'unknown'))
+
+    def summarize(self, report):
+        """
+        :param dict report: the counters and the timers of a worker or of all the workers
+        :return: the report with the rows/s and MB/s rates over the duration of the phase
+        :rtype: dict
+        """
+        elapsed = self.elapsed or 1.
+        summary = dict(report)
+        summary['rows_per_sec'] = report['counters'].get('rows', 0) / elapsed
+        summary['mb_per_sec'] = report['counters'].get('bytes', 0) / elapsed / 1e6
+        return summary
+
+    def summary(self):
+        """
+        :return: the JSON serializable summary of the phase
+        :rtype: dict
+        """
+        summary = {
+            'elapsed': self.elapsed,
+            'total_files': self.total_files,
+            'total_bytes': self.total_bytes,
+            'workers': dict((worker, self.summarize(report)) for worker, report in self.workers.items())
+        }
+        summary.update(self.summarize(self.totals()))
+        summary.update(self.extra)
+        return summary
+
+
+def write_stats_file(path, collectors):
+    """ Write the summary of the phases of a command in a JSON file, the phases which have not been started
+    (skipped or failed before) are left out
+
+    :param str path: the path of the JSON file
+    :param list collectors: list of :class:`gmaltcli.metrics.MetricsCollector`, one per phase
+    """
+    with open(path, 'w') as stats_file:
+        json.dump(dict((collector.phase, collector.summary()) for collector in collectors
+                       if collector.start_time is not None), stats_file, indent=2, sort_keys=True)
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import collections
+
+import numpy
+
+import gmalthgtparser as hgt
+
+
+HgtBlock = collections.namedtuple('HgtBlock', ['line', 'nb_lines', 'nb_values', 'lat_min', 'lng_min', 'lat_max',
+                                               'lng_max', 'value'])
+HgtBlock.__doc__ = """ A block of consecutive lines of a HGT file without the void values.
+
+.. note:: when the runs are merged, each element is a rectangle covering consecutive equal values of a line
+
+:param int line: the zero based line number of the first line of the block
+:param int nb_lines: the number of lines in the block
+:param int nb_values: the number of elevation values in the block without the void values
+:param lat_min: the bottom latitude of each elevation square
+:type lat_min: :class:`numpy.ndarray` of float64
+:param lng_min: the left longitude of each elevation square
+:type lng_min: :class:`numpy.ndarray` of float64
+:param lat_max: the top latitude of each elevation square
+:type lat_max: :class:`numpy.ndarray` of float64
+:param lng_max: the right longitude of each elevation square
+:type lng_max: :class:`numpy.ndarray` of float64
+:param value: the elevation of each square
+:type value: :class:`numpy.ndarray` of int16
+"""
+
+
+def exact_axis(start, step, count):
+    """ Compute `start + i * step` for i in [0, count[ as float64
+
+    .. note:: the values are computed as an integer numerator divided by an integer denominator so each value
+        is the correctly rounded float of the exact fraction. They are the same as the float values provided by
+        :class:`gmalthgtparser.HgtValueIterator` which rounds :class:`fractions.Fraction` values.
+
+    :param start: the first value of the axis
+    :type start: :class:`fractions.Fraction`
+    :param step: the step between two values of the axis
+    :type step: :class:`fractions.Fraction`
+    :param int count: the number of values
+    :return: the values of the axis
+    :rtype: :class:`numpy.ndarray` of float64
+    """
+    denominator = start.denominator * step.denominator // _gcd(start.denominator, step.denominator)
+    start_numerator = start.numerator * (denominator // start.denominator)
+    step_numerator = step.numerator * (denominator // step.denominator)
+    numerators = start_numerator + numpy.arange(count, dtype=numpy.int64) * step_numerator
+    return numerators / float(denominator)
+
+
+# Aggregations of the values of a square by :func:`gmaltcli.reader.downsample`
+DOWNSAMPLE_METHODS = ('mean', 'min', 'max')
+
+
+def downsample(values, factor, void_value, method='mean'):
+    """ Downsample elevation values by aggregating the squares of `factor` x `factor` values
+
+    .. note:: the void values are left out of the aggregation, a square with only void values is void. The last
+        lines and columns are aggregated on the remaining values if the size is not a multiple of `factor`.
+
+    :param values: the elevation values line per line
+    :type values: :class:`numpy.ndarray`
+    :param int factor: the downsampling factor
+    :param int void_value: the value without elevation
+    :param str method: the aggregation of a square, one of `DOWNSAMPLE_METHODS`. The mean is rounded to the
+        nearest integer.
+    :return: the aggregated values
+    :rtype: :class:`numpy.ndarray` of big-endian int16
+    """
+    height, width = values.shape
+    nb_lines, nb_cols = -(-height // factor), -(-width // factor)
+    padded = numpy.full((nb_lines * factor, nb_cols * factor), void_value, dtype=numpy.int64)
+    padded[:height, :width] = values
+    squares = padded.reshape(nb_lines, factor, nb_cols, factor)
+    not_void = squares != void_value
+    counts = not_void.sum(axis=(1, 3))
+
+    if method == 'mean':
+        sums = numpy.where(not_void, squares, 0).sum(axis=(1, 3))
+        aggregated = numpy.rint(sums / numpy.maximum(counts, 1).astype(numpy.float64))
+    elif method == 'min':
+        aggregated = numpy.where(not_void, squares, numpy.iinfo(numpy.int16).max).min(axis=(1, 3))
+    elif method == 'max':
+        aggregated = numpy.where(not_void, squares, numpy.iinfo(numpy.int16).min).max(axis=(1, 3))
+    else:
+        raise ValueError('Unknown downsample method {}'.format(method))
+
+    downsampled = numpy.full((nb_lines, nb_cols), void_value, dtype='>i2')
+    has_value = counts > 0
+    downsampled[has_value] = aggregated[has_value]
+    return downsampled
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+class ResampledHgtParser(hgt.HgtParser):
+    """ Same parser as :class:`gmalthgtparser.HgtParser` with the geometry of the file downsampled by `factor` :
+    the squares are `factor` times larger and the number of lines and columns is divided by `factor` (rounded up)
+
+    .. note:: the top left corner of the file does not move, the last squares may extend beyond the file if its
+        size is not a multiple of `factor`
+
+    .. note:: only the geometry is changed, the values must be read with :class:`gmaltcli.reader.HgtBlockReader`
+        which downsamples them
+
+    :param str filepath: the path to the HGT file to parse
+    :param int factor: the downsampling factor
+    :param int width: provide the number of columns if not standard HGT squared file
+    :param int height: provide the number of lines if not standard HGT squared file
+    """
+    def __init__(self, filepath, factor, width=None, height=None):
+        super(ResampledHgtParser, self).__init__(filepath, width, height)
+        self.factor = factor
+        self.source_shape = (self.sample_lat, self.sample_lng)
+        self.sample_lat = -(-self.sample_lat // factor)
+        self.sample_lng = -(-self.sample_lng // factor)
+        self.square_width *= factor
+        self.square_height *= factor
+        self.top_left_square = self._get_top_left_square()
+
+
+class HgtBlockReader(object):
+    """ Read a HGT file by blocks of lines with NumPy
+
+    The file is memory-mapped as a big-endian int16 array so that a block is decoded in a few vectorized
+    operations instead of one python tuple per elevation value.
+
+    It is intended to be used in a context manager::
+
+        with HgtBlockReader('N00E010.hgt') as reader:
+            for block in reader.get_block_iterator(100):
+                ...
+
+    With `resample`, the values are downsampled when the file is opened (see :func:`gmaltcli.reader.downsample`)
+    and the parser provides the downsampled geometry (see :class:`gmaltcli.reader.ResampledHgtParser`) so the
+    iterators and the managers get coarser squares or rasters.
+
+    :param str filepath: the path to the HGT file to read
+    :param int width: provide the number of columns if not standard HGT squared file
+    :param int height: provide the number of lines if not standard HGT squared file
+    :param tuple resample: the downsampling factor and method (one of `DOWNSAMPLE_METHODS`), None to read the
+        file at its resolution
+    """
+
+    VOID_VALUE = hgt.HgtParser.VOID_VALUE
+
+    def __init__(self, filepath, width=None, height=None, resample=None):
+        self.resample = resample if resample and resample[0] > 1 else None
+        if self.resample:
+            self.parser = ResampledHgtParser(filepath, self.resample[0], width, height)
+        else:
+            self.parser = hgt.HgtParser(filepath, width, height)
+        self.filepath = filepath
+        self.filename = self.parser.filename
+        self.values = None
+
+    def __enter__(self):
+        if self.resample:
+            values = numpy.memmap(self.filepath, dtype='>i2', mode='r', shape=self.parser.source_shape)
+            self.values = downsample(values, self.resample[0], self.VOID_VALUE, self.resample[1])
+        else:
+            self.values = numpy.memmap(self.filepath, dtype='>i2', mode='r',
+                                       shape=(self.parser.sample_lat, self.parser.sample_lng))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.values = None
+
+    @property
+    def nb_values(self):
+        """
+        :return: the total number of values in the file
+        :rtype: int
+        """
+        return self.parser.nb_values
+
+    def get_sample_iterator(self, width, height):
+        """ Iterate over the file by samples of `width` x `height` values
+
+        :param int width: width of the sample area
+        :param int height: height of the sample area
+        :return: a sample iterator
+        :rtype: :class:`gmaltcli.reader.HgtSampleIterator`
+        """
+        return HgtSampleIterator(self, width, height)
+
+    def get_overview_iterator(self, factor, width, height):
+        """ Downsample the file by `factor` (see :func:`gmaltcli.reader.downsample`) and iterate over the
+        downsampled values by samples of `width` x `height` values
+
+        :param int factor: the downsampling factor
+        :param int width: width of the sample area
+        :param int height: height of the sample area
+        :return: iterator of the latitude and the longitude of the top left corner of each sample and its values
+        :rtype: iter
+        """
+        parser = self.parser
+        top_left = parser.top_left_square[1]
+        overview = downsample(numpy.asarray(self.values), factor, self.VOID_VALUE)
+        for line in range(0, overview.shape[0], height):
+            for col in range(0, overview.shape[1], width):
+                yield (float(top_left[0] - line * factor * parser.square_height),
+                       float(top_left[1] + col * factor * parser.square_width),
+                       overview[line:line + height, col:col + width])
+
+    def get_block_iterator(self, nb_lines, merge_runs=False):
+        """ Iterate over the file by blocks of `nb_lines` lines
+
+        :param int nb_lines: the number of lines per block
+        :param bool merge_runs: if True, the consecutive equal values of a line are merged in a single rectangle
+        :return: iterator of :class:`gmaltcli.reader.HgtBlock`
+        :rtype: iter
+        """
+        parser = self.parser
+        top_left = parser.top_left_square[1]
+        lat_max = exact_axis(top_left[0], -parser.square_height, parser.sample_lat)
+        lat_min = exact_axis(top_left[0] - parser.square_height, -parser.square_height, parser.sample_lat)
+        lng_min = exact_axis(top_left[1], parser.square_width, parser.sample_lng)
+        lng_max = exact_axis(top_left[1] + parser.square_width, parser.square_width, parser.sample_lng)
+
+        for line in range(0, parser.sample_lat, nb_lines):
+            values = numpy.asarray(self.values[line:line + nb_lines])
+            not_void = values != self.VOID_VALUE
+            if merge_runs:
+                lines, cols, end_cols = self.get_runs(values)
+                keep = values[lines, cols] != self.VOID_VALUE
+                lines, cols, end_cols = lines[keep], cols[keep], end_cols[keep]
+            else:
+                lines, cols = numpy.nonzero(not_void)
+                end_cols = cols
+            yield HgtBlock(
+                line=line,
+                nb_lines=values.shape[0],
+                nb_values=int(numpy.count_nonzero(not_void)),
+                lat_min=lat_min[line + lines],
+                lng_min=lng_min[cols],
+                lat_max=lat_max[line + lines],
+                lng_max=lng_max[end_cols],
+                value=values[lines, cols].astype(numpy.int16)
+            )
+
+    def get_block_bounds(self, line, nb_lines):
+        """ Get the bounds of the squares of a block of lines
+
+        .. note:: the bounds are the float values of the exact fractions like the bounds of the squares provided
+            by `get_block_iterator` so the squares of the block are found with exact comparisons
+
+        :param int line: the zero based line number of the first line of the block
+        :param int nb_lines: the number of lines in the block
+        :return: the bottom latitude, the left longitude, the top latitude and the right longitude of the block
+        :rtype: (float, float, float, float)
+        """
+        parser = self.parser
+        top_left = parser.top_left_square[1]
+        return (float(top_left[0] - (line + nb_lines) * parser.square_height), float(top_left[1]),
+                float(top_left[0] - line * parser.square_height),
+                float(top_left[1] + parser.sample_lng * parser.square_width))
+
+    def is_inside(self, lats, lngs):
+        """ Check if the points are inside the file (vectorized `is_inside` of the parser)
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :return: True for each point inside the file
+        :rtype: :class:`numpy.ndarray` of bool
+        """
+        bottom_left, top_right = self.parser.corners[0], self.parser.corners[2]
+        return ((float(bottom_left[0]) < lats) & (float(bottom_left[1]) < lngs)
+                & (lats < float(top_right[0])) & (lngs < float(top_right[1])))
+
+    def get_elevations(self, lats, lngs):
+        """ Get the elevation of points inside the file (vectorized `get_elevation` of the parser)
+
+        .. note:: the squares are found with float arithmetic instead of the exact fractions of the parser, a point
+            on the exact edge between two squares may get the value of the other square
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :return: the zero based line number, the zero based column number and the elevation of each point
+            (`VOID_VALUE` if no value)
+        :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        :raise IndexError: if a point is outside the file
+        """
+        parser = self.parser
+        lines = (parser.sample_lat - 1) - numpy.rint(
+            (lats - float(parser.bottom_left_center[0])) * (parser.sample_lat - 1)).astype(numpy.int64)
+        cols = numpy.rint((lngs - float(parser.bottom_left_center[1])) * (parser.sample_lng - 1)).astype(numpy.int64)
+        if len(lines) and (lines.min() < 0 or cols.min() < 0):
+            raise IndexError('point is not inside HGT file {}'.format(self.filename))
+        return lines, cols, numpy.asarray(self.values[lines, cols], dtype=numpy.int16)
+
+    def get_block_hash(self, line, nb_lines):
+        """ Get the md5 checksum of the values of a block of lines
+
+        :param int line: the zero based line number of the first line of the block
+        :param int nb_lines: the number of lines in the block
+        :return: the hexadecimal md5 checksum
+        :rtype: str
+        """
+        return hashlib.md5(numpy.ascontiguousarray(self.values[line:line + nb_lines]).tobytes()).hexdigest()
+
+    @staticmethod
+    def get_runs(values):
+        """ Find the runs of consecutive equal values in each line of a 2D array
+
+        .. note:: the first and the last columns are always runs of a single value. They are shared with the
+            adjacent files so their rows have the same bounds in both files and are imported once.
+
+        :param values: the values line per line
+        :type values: :class:`numpy.ndarray`
+        :return: the line, the first column and the last column of each run ordered line per line
+        :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        """
+        width = values.shape[1]
+        starts = numpy.ones(values.shape, dtype=bool)
+        starts[:, 1:] = values[:, 1:] != values[:, :-1]
+        starts[:, 1:2] = starts[:, -1:] = True
+        lines, cols = numpy.nonzero(starts)
+        # a run ends just before the next run which starts in the same line or at the beginning of the next line
+        end_cols = (numpy.append(lines[1:] * width + cols[1:], values.size) - 1) % width
+        return lines, cols, end_cols
+
+
+class HgtSampleIterator(hgt.parser.HgtSampleIterator):
+    """ Same iterator as :class:`gmalthgtparser.parser.HgtSampleIterator` but the values of a sample are a view
+    of the memory-mapped file (a 2D big-endian int16 array) instead of a list of list read value per value
+
+    :param block_reader: the reader of the HGT file
+    :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+    :param int width: width of the sample area
+    :param int height: height of the sample area
+    """
+    def __init__(self, block_reader, width, height):
+        super(HgtSampleIterator, self).__init__(block_reader.parser, width, height)
+        self.values = block_reader.values
+
+    def _get_square_values(self, top_left_col_idx, top_left_line_idx):
+        return self.values[top_left_line_idx:top_left_line_idx + self.height,
+                           top_left_col_idx:top_left_col_idx + self.width]
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+    from urlparse import urlparse, parse_qs
+
+import numpy
+
+import gmaltcli.lookup as lookup
+
+
+# Content type of the binary protocol of the `/elevations` endpoint
+BINARY_CONTENT_TYPE = 'application/octet-stream'
+
+# Endpoints whose latency is measured by :class:`gmaltcli.server.ElevationService`
+ENDPOINTS = ('elevation', 'elevations')
+
+
+class LatencyHistogram(object):
+    """ Histogram of the latencies of the requests of an endpoint
+
+    .. note:: the buckets are exponential, from 10 microseconds to 1.3 seconds, so the histogram has a constant size
+        and a latency is added in a few operations. The percentiles are the upper bound of their bucket.
+
+    .. note:: the histogram is thread-safe
+    """
+    BOUNDS = tuple(0.00001 * 2 ** power for power in range(18))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        """ Add the latency of a request
+
+        :param float seconds: the latency
+        """
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, ratio):
+        """
+        :param float ratio: the ratio of the requests, from 0 to 1 (0.99 for the 99th percentile)
+        :return: the latency in seconds under which are `ratio` of the requests, 0 without request
+        :rtype: float
+        """
+        rank, cumulated = ratio * self.count, 0
+        for bound, count in zip(self.BOUNDS + (self.max,), self.counts):
+            cumulated += count
+            if cumulated and cumulated >= rank:
+                return min(bound, self.max)
+        return 0.
+
+    def to_dict(self):
+        """
+        :return: the JSON serializable histogram, the latencies are in milliseconds
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                'count': self.count,
+                'mean_ms': self.total * 1000 / self.count if self.count else 0.,
+                'max_ms': self.max * 1000,
+                'p50_ms': self.percentile(0.5) * 1000,
+                'p90_ms': self.percentile(0.9) * 1000,
+                'p99_ms': self.percentile(0.99) * 1000,
+                'buckets': [{'le_ms': bound * 1000 if bound is not None else None, 'count': count}
+                            for bound, count in zip(self.BOUNDS + (None,), self.counts) if count]
+            }
+
+
+class ElevationService(object):
+    """ Look up elevations in the HGT files of a folder for the requests of the server
+
+    .. note:: the files are indexed once and kept memory-mapped between the requests by the
+        :class:`gmaltcli.lookup.TileLookup`. The lookups are serialized by a lock as the cache of the files is
+        shared by the threads of the server.
+
+    :param str path: the folder of the HGT files or a single HGT file
+    :param int max_tiles: the maximum number of HGT files kept memory-mapped
+    :param int max_bytes: the maximum number of bytes of the HGT files kept memory-mapped, None for no limit
+    :param str interpolation: the interpolation of the requests which do not provide one (one of
+        `gmaltcli.lookup.INTERPOLATIONS`)
+    """
+    def __init__(self, path, max_tiles=lookup.CACHE_MAX_TILES, max_bytes=None, interpolation='nearest'):
+        self.tile_lookup = lookup.TileLookup(path, max_tiles, max_bytes)
+        self.interpolation = interpolation
+        self.histograms = dict((endpoint, LatencyHistogram()) for endpoint in ENDPOINTS)
+        self.points = 0
+        self.start_time = time.time()
+        self.lock = threading.Lock()
+
+    def close(self):
+        """ Close the HGT files """
+        with self.lock:
+            self.tile_lookup.__exit__(None, None, None)
+
+    def lookup(self, lats, lngs, interpolation=None):
+        """ Get the elevation of each point
+
+        :param lats: the latitudes of the points
+        :type lats: :class:`numpy.ndarray` of float64
+        :param lngs: the longitudes of the points
+        :type lngs: :class:`numpy.ndarray` of float64
+        :param str interpolation: one of `gmaltcli.lookup.INTERPOLATIONS`, None for the interpolation of the service
+        :return: the elevation of each point, NaN if no value or if the point is not in a HGT file
+        :rtype: :class:`numpy.ndarray` of float64
+        :raise ValueError: if the interpolation is unknown
+        """
+        interpolation = interpolation or self.interpolation
+        if interpolation not in lookup.INTERPOLATIONS:
+            raise ValueError('unknown interpolation {}'.format(interpolation))
+        with self.lock:
+            values = self.tile_lookup.interpolate(lats, lngs, interpolation)[0]
+            self.points += len(lats)
+        return values
+
+    def stats(self):
+        """
+        :return: the JSON serializable statistics of the service : the number of files indexed, of points looked up,
+            the counters of the cache of the files (see :class:`gmaltcli.lookup.TileCache`) and the latency
+            histogram of each endpoint
+        :rtype: dict
+        """
+        with self.lock:
+            cache, points = self.tile_lookup.cache.stats, self.points
+        return {
+            'uptime': time.time() - self.start_time,
+            'tiles': len(self.tile_lookup.index),
+            'points': points,
+            'cache': cache,
+            'latency': dict((endpoint, histogram.to_dict()) for endpoint, histogram in self.histograms.items())
+        }
+
+
+def to_json_values(values, interpolation):
+    """ Convert elevations to JSON values
+
+    :param values: the elevation of each point, NaN if no value
+    :type values: :class:`numpy.ndarray` of float64
+    :param str interpolation: the interpolation of the values, the values of `nearest` are integers and the
+        interpolated values are rounded to the centimeter
+    :return: the elevation of each point, None if no value
+    :rtype: list
+    """
+    has_value = ~numpy.isnan(values)
+    if interpolation == 'nearest':
+        elevations = numpy.where(has_value, values, 0).astype(numpy.int64).tolist()
+    else:
+        elevations = numpy.round(numpy.where(has_value, values, 0), 2).tolist()
+    return [elevation if ok else None for elevation, ok in zip(elevations, has_value.tolist())]
+
+
+class ElevationRequestHandler(BaseHTTPRequestHandler):
+    """ HTTP handler of the elevation server
+
+    Endpoints :
+
+    - `GET /elevation?lat=<lat>&lng=<lng>[&interpolate=<interpolation>]` : the elevation of a point as
+      `{"lat": ..., "lng": ..., "elevation": ...}`
+    - `POST /elevations[?interpolate=<interpolation>]` : the elevation of many points. The JSON body is
+      `{"points": [[lat, lng], ...]}` and the response is `{"elevations": [...]}`. With the
+      `application/octet-stream` content type, the body is the little-endian float64 latitude and longitude of each
+      point and the response is the little-endian float32 elevation of each point (NaN if no value).
+    - `GET /stats` : the statistics of the service (see :meth:`gmaltcli.server.ElevationService.stats`)
+
+    The elevation is null if there is no value or if the point is not inside a HGT file.
+    """
+    server_version = 'gmalt-hgtserve'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/elevation':
+            self.handle_endpoint('elevation', self.get_elevation, parse_qs(url.query))
+        elif url.path == '/stats':
+            self.send_json(200, self.server.service.stats())
+        else:
+            self.send_json(404, {'error': 'unknown endpoint {}'.format(url.path)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if url.path == '/elevations':
+            self.handle_endpoint('elevations', self.get_elevations, parse_qs(url.query), body)
+        else:
+            self.send_json(404, {'error': 'unknown endpoint {}'.format(url.path)})
+
+    def handle_endpoint(self, endpoint, method, *args):
+        """ Call the method of an endpoint and add its latency to the histogram of the endpoint
+
+        :param str endpoint: the name of the endpoint (one of `ENDPOINTS`)
+        :param method: the method sending the response
+        :param args: the arguments of the method
+        """
+        start = time.time()
+        try:
+            method(*args)
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {'error': 'invalid request : {}'.format(e)})
+        self.server.service.histograms[endpoint].add(time.time() - start)
+
+    def get_elevation(self, query):
+        interpolation = query.get('interpolate', [None])[0]
+        lat, lng = float(query['lat'][0]), float(query['lng'][0])
+        values = self.server.service.lookup(numpy.array([lat]), numpy.array([lng]), interpolation)
+        elevation = to_json_values(values, interpolation or self.server.service.interpolation)[0]
+        self.send_json(200, {'lat': lat, 'lng': lng, 'elevation': elevation})
+
+    def get_elevations(self, query, body):
+        interpolation = query.get('interpolate', [None])[0]
+        if self.headers.get('Content-Type', '').startswith(BINARY_CONTENT_TYPE):
+            points = numpy.frombuffer(body, dtype='<f8').reshape((-1, 2))
+            values = self.server.service.lookup(points[:, 0], points[:, 1], interpolation)
+            return self.send_body(200, BINARY_CONTENT_TYPE, values.astype('<f4').tobytes())
+
+        points = numpy.array(json.loads(body.decode('utf-8'))['points'], dtype=float).reshape((-1, 2))
+        values = self.server.service.lookup(points[:, 0], points[:, 1], interpolation)
+        self.send_json(200, {'elevations': to_json_values(values, interpolation or self.server.service.interpolation)})
+
+    def send_json(self, code, content):
+        self.send_body(code, 'application/json', json.dumps(content).encode('utf-8'))
+
+    def send_body(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # the client of a Unix socket has no address
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logging.debug('%s - %s' % (self.address_string(), format % args))
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server answering each connection in a thread """
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """ HTTP server on a Unix socket answering each connection in a thread """
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = self.server_address, 0
+
+
+def create_server(service, host='127.0.0.1', port=8080, socket_path=None):
+    """ Create the HTTP server of a service
+
+    :param service: the service answering the requests
+    :type service: :class:`gmaltcli.server.ElevationService`
+    :param str host: the host to listen on
+    :param int port: the port to listen on, 0 for any free port
+    :param str socket_path: the path of the Unix socket to listen on instead of `host` and `port`
+    :return: the server, call `serve_forever` to start it
+    :rtype: :class:`gmaltcli.server.ThreadingHTTPServer` or :class:`gmaltcli.server.ThreadingUnixHTTPServer`
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, ElevationRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ElevationRequestHandler)
+    server.service = service
+    return server
+
+
+def serve(service, host='127.0.0.1', port=8080, socket_path=None):
+    """ Serve the requests over HTTP and optionally on a Unix socket until interrupted
+
+    :param service: the service answering the requests
+    :type service: :class:`gmaltcli.server.ElevationService`
+    :param str host: the host to listen on
+    :param int port: the port to listen on
+    :param str socket_path: the path of the Unix socket to listen on too, None for HTTP only
+    """
+    servers = [create_server(service, host, port)]
+    logging.info('serving {} HGT files on http://{}:{}'.format(len(service.tile_lookup.index), host,
+                                                               servers[0].server_port))
+    if socket_path:
+        servers.append(create_server(service, socket_path=socket_path))
+        logging.info('serving on the Unix socket {}'.format(socket_path))
+
+    threads = [threading.Thread(target=server.serve_forever) for server in servers[1:]]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        servers[0].serve_forever()
+    finally:
+        for server in servers[1:]:
+            server.shutdown()
+        for server in servers:
+            server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -1,8 +1,17 @@
+import os
+import sys
 import json
+import logging
+import shutil
+import sqlite3
 
 import pytest
 
 import gmaltcli.app as app
+import gmaltcli.database as database
+import gmaltcli.lookup as lookup
+import gmaltcli.tools as tools
+import gmaltcli.worker as worker
 
 
 def test_create_read_from_hgt_parser_too_few_args(capsys):
@@ -12,7 +21,7 @@ def test_create_read_from_hgt_parser_too_few_args(capsys):
         parser.parse_args([])
     out, err = capsys.readouterr()
     assert 'too few arguments' in err \
-           or 'the following arguments are required: lat, lng, hgt_file' in err  # python 3
+           or 'the following arguments are required: hgt_file' in err  # python 3
 
 
 def test_create_read_from_hgt_parser_too_much_args(capsys):
@@ -29,6 +38,102 @@ def test_create_read_from_hgt_parser_all_args():
     assert parsed.hgt_file == 'N00E010.hgt'
     assert parsed.lat == 43.9076
     assert parsed.lng == 2.9876
+    assert parsed.batch is None
+    assert parsed.format == 'csv'
+    assert parsed.max_tiles == 64
+    assert parsed.interpolate == 'nearest'
+    assert parsed.max_mapped is None
+
+
+def test_create_read_from_hgt_parser_batch_args():
+    parser = app.create_read_from_hgt_parser()
+    parsed = parser.parse_args(['--batch', '-', '--format', 'jsonl', '--max-tiles', '8', '--max-mapped', '200',
+                                '--interpolate', 'bicubic', 'N00E010.hgt'])
+    assert parsed.hgt_file == 'N00E010.hgt'
+    assert parsed.lat is None
+    assert parsed.batch == '-'
+    assert parsed.format == 'jsonl'
+    assert parsed.max_tiles == 8
+    assert parsed.max_mapped == 200
+    assert parsed.interpolate == 'bicubic'
+
+
+def test_read_from_hgt_max_tiles_positive(capsys, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '--batch', '-', '--max-tiles', '0', 'N00E010.hgt'])
+    with pytest.raises(SystemExit):
+        app.read_from_hgt()
+    out, err = capsys.readouterr()
+    assert '--max-tiles and --max-mapped must be positive' in err
+
+
+def test_read_from_hgt_lat_lng_required(capsys, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', 'N00E010.hgt'])
+    with pytest.raises(SystemExit):
+        app.read_from_hgt()
+    out, err = capsys.readouterr()
+    assert 'the following arguments are required: lat, lng, hgt_file' in err
+
+
+def test_read_from_hgt(capsys, monkeypatch):
+    hgt_file = os.path.join(os.path.dirname(__file__), 'srtm3', 'N00E010.hgt')
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '1.0001', '10.0001', hgt_file])
+    with pytest.raises(SystemExit) as e:
+        app.read_from_hgt()
+    assert e.value.code == 0
+    out, err = capsys.readouterr()
+    assert out == 'Report:\n    Location: (0P,0L)\n    Band 1:\n        Value: 57\n'
+
+
+def test_read_from_hgt_folder(capsys, monkeypatch):
+    folder = os.path.join(os.path.dirname(__file__), 'srtm3')
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '1.0001', '10.0001', folder])
+    with pytest.raises(SystemExit) as e:
+        app.read_from_hgt()
+    assert e.value.code == 0
+    out, err = capsys.readouterr()
+    assert out == 'Report:\n    Location: (0P,0L)\n    Band 1:\n        Value: 57\n'
+
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '2.0001', '18.1251', folder])
+    with pytest.raises(SystemExit) as e:
+        app.read_from_hgt()
+    assert e.value.code == 1
+
+
+def test_read_from_hgt_interpolate(capsys, monkeypatch):
+    folder = os.path.join(os.path.dirname(__file__), 'srtm3')
+    from_path = lookup.TileIndex.from_path
+    calls = []
+
+    def mock_from_path(path):
+        calls.append(path)
+        return from_path(path)
+
+    monkeypatch.setattr(lookup.TileIndex, 'from_path', mock_from_path)
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '--interpolate', 'bilinear', '0.5', '10.5', folder])
+    with pytest.raises(SystemExit) as e:
+        app.read_from_hgt()
+    assert e.value.code == 0
+    out, err = capsys.readouterr()
+    assert out == 'Report:\n    Location: (600P,600L)\n    Band 1:\n        Value: 651.0\n'
+    assert calls == [folder]
+
+
+def test_read_from_hgt_batch(capsys, caplog, monkeypatch, tmpdir):
+    caplog.set_level(logging.INFO)
+    hgt_file = os.path.join(os.path.dirname(__file__), 'srtm3', 'N00E010.hgt')
+    points_file = tmpdir.join('points.csv')
+    points_file.write('lat,lng,name\n1.0001,10.0001,a\n2.0001,18.1251,b\nnot,a point\n1.0001,10.0001,c\n')
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtread', '--batch', str(points_file), hgt_file])
+
+    with pytest.raises(SystemExit) as e:
+        app.read_from_hgt()
+    assert e.value.code == 0
+    out, err = capsys.readouterr()
+    assert out == ('lat,lng,name,elevation\n1.0001,10.0001,a,57\n2.0001,18.1251,b,\nnot,a point,\n'
+                   '1.0001,10.0001,c,57\n')
+    assert '1 points not found in the HGT files, 1 lines not parsed' in caplog.text
+    assert 'missing tiles : N02E018' in caplog.text
+    assert 'tile cache : 0 hits, 1 misses, 0 evictions' in caplog.text
 
 
 def test_create_get_hgt_parser_too_few_args(capsys):
@@ -59,19 +164,22 @@ def test_create_get_hgt_parser_minimal_args(tmpdir):
     assert parsed.folder.endswith('working_dir')
     assert not parsed.skip_download
     assert not parsed.skip_unzip
+    assert parsed.stats_file is None
     assert not parsed.verbose
 
 
 def test_create_get_hgt_parser_all_args(tmpdir):
     tmp_working_dir = tmpdir.mkdir("working_dir")
     parser = app.create_get_hgt_parser()
-    parsed = parser.parse_args(['small', str(tmp_working_dir), '--skip-download', '--skip-unzip', '-v', '-c 2'])
+    parsed = parser.parse_args(['small', str(tmp_working_dir), '--skip-download', '--skip-unzip', '-v', '-c 2',
+                                '--stats-file', 'stats.json'])
     assert parsed.concurrency == 2
     assert parsed.dataset.endswith('gmaltcli/datasets/small.json')
     assert len(parsed.dataset_files) == 3
     assert parsed.folder.endswith('working_dir')
     assert parsed.skip_download
     assert parsed.skip_unzip
+    assert parsed.stats_file == 'stats.json'
     assert parsed.verbose
 
 
@@ -99,7 +207,17 @@ def test_create_load_hgt_parser_too_few_args(capsys):
         parser.parse_args([])
     out, err = capsys.readouterr()
     assert 'too few arguments' in err \
-           or 'the following arguments are required: folder, -u/--user' in err  # python 3
+           or 'the following arguments are required: folder' in err  # python 3
+
+
+def test_load_hgt_user_required(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert 'the following arguments are required: -u/--user' in err
 
 
 def test_create_load_hgt_parser_too_much_args(capsys, tmpdir):
@@ -116,13 +234,31 @@ def test_create_load_hgt_parser_min_args(tmpdir):
     parser = app.create_load_hgt_parser()
     parsed = parser.parse_args(['-u', 'gmalt', str(tmp_working_dir)])
     assert parsed.concurrency == 1
+    assert parsed.executor == 'thread'
+    assert parsed.writers is None
+    assert parsed.stats_file is None
+    assert parsed.batch_size is None
+    assert parsed.resume is True
+    assert parsed.schema == 'standard'
+    assert parsed.partition_band is None
+    assert parsed.merge_runs is False
+    assert parsed.incremental is False
+    assert parsed.resample is None
+    assert parsed.resample_method == 'mean'
+    assert parsed.bulk is False
+    assert parsed.unlogged is False
+    assert parsed.cluster is False
     assert parsed.database == 'gmalt'
     assert parsed.folder == str(tmp_working_dir)
     assert parsed.host == 'localhost'
     assert parsed.password is None
     assert parsed.port is None
     assert parsed.sample == (None, None)
+    assert parsed.tune_sample is False
+    assert parsed.tune_apply is False
+    assert parsed.overviews is None
     assert parsed.table == 'elevation'
+    assert parsed.method == 'insert'
     assert parsed.type == 'postgres'
     assert parsed.use_raster is False
     assert parsed.username == 'gmalt'
@@ -134,20 +270,307 @@ def test_create_load_hgt_parser_min_args(tmpdir):
 def test_create_load_hgt_parser_all_args(tmpdir):
     tmp_working_dir = tmpdir.mkdir("working_dir")
     parser = app.create_load_hgt_parser()
-    parsed = parser.parse_args(['-c', '2', '-v', '-tb', '--type', 'mysql', '-H', 'db.local', '-P', '3306',
-                                '-d', 'elev_db', '-u', 'gmalt', '-p', 'password', '-t', 'elev_tb', '-r', '-s',
-                                '3601', '3601', '--skip-raster2pgsql-check', str(tmp_working_dir)])
+    parsed = parser.parse_args(['-c', '2', '--executor', 'process', '--writers', '3', '--stats-file', 'stats.json',
+                                '-b', '500', '--reimport', '--bulk',
+                                '--unlogged', '--cluster', '--merge-runs', '--resample', '4',
+                                '--resample-method', 'max', '--incremental', '-v', '-tb', '--type', 'mysql',
+                                '-H', 'db.local', '-P', '3306', '-d', 'elev_db', '-u', 'gmalt', '-p', 'password',
+                                '-t', 'elev_tb', '--method', 'copy', '--schema', 'grid',
+                                '--partition-band', '10', '-r', '-s', '3601', '3601',
+                                '--tune-sample', '--tune-apply', '--overviews', '4,2',
+                                '--skip-raster2pgsql-check', str(tmp_working_dir)])
     assert parsed.concurrency == 2
+    assert parsed.executor == 'process'
+    assert parsed.writers == 3
+    assert parsed.stats_file == 'stats.json'
+    assert parsed.batch_size == 500
+    assert parsed.resume is False
+    assert parsed.bulk is True
+    assert parsed.unlogged is True
+    assert parsed.cluster is True
     assert parsed.database == 'elev_db'
     assert parsed.folder == str(tmp_working_dir)
     assert parsed.host == 'db.local'
     assert parsed.password == 'password'
     assert parsed.port == 3306
     assert parsed.sample == [3601, 3601]
+    assert parsed.tune_sample is True
+    assert parsed.tune_apply is True
+    assert parsed.overviews == (2, 4)
     assert parsed.table == 'elev_tb'
+    assert parsed.method == 'copy'
+    assert parsed.schema == 'grid'
+    assert parsed.partition_band == 10
+    assert parsed.merge_runs is True
+    assert parsed.incremental is True
+    assert parsed.resample == 4
+    assert parsed.resample_method == 'max'
     assert parsed.type == 'mysql'
     assert parsed.use_raster is True
     assert parsed.username == 'gmalt'
     assert parsed.verbose is True
     assert parsed.traceback is True
     assert parsed.check_raster2pgsql is False
+
+
+def test_load_hgt_tune_sample_requires_raster(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '--tune-sample', str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--tune-sample and --tune-apply require --raster without --sample' in err
+
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '-r', '-s', '100', '100', '--tune-apply',
+                                      str(tmp_working_dir)])
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--tune-sample and --tune-apply require --raster without --sample' in err
+
+
+class MockManager(object):
+    """ Manager of a database prepared without connection """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def prepare_environment(self, unlogged=False):
+        pass
+
+
+def test_load_hgt_tune_sample_skips_raster2pgsql(monkeypatch, tmpdir):
+    tune_calls = []
+    monkeypatch.setattr(tools, 'check_for_raster2pgsql', lambda *args: True)
+    monkeypatch.setattr(tools, 'tune_raster_sample', lambda *args: tune_calls.append(args) or [{'sample': 50}])
+    monkeypatch.setattr(database.ManagerFactory, 'get_manager', lambda self, use_raster: MockManager())
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '-r', '--tune-sample', str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+    assert len(tune_calls) == 1
+
+
+def test_load_hgt_overviews_skips_raster2pgsql(monkeypatch, tmpdir):
+    import_calls = []
+    monkeypatch.setattr(tools, 'check_for_raster2pgsql', lambda *args: True)
+    monkeypatch.setattr(tools, 'import_hgt_zip_files', lambda *args, **kwargs: import_calls.append(args))
+    monkeypatch.setattr(database.ManagerFactory, 'get_manager', lambda self, use_raster: MockManager())
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '-r', '--overviews', '2',
+                                      str(tmp_working_dir)])
+
+    # raster2pgsql does not build the overviews so the files are imported by gmalt-hgtload
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+    assert len(import_calls) == 1
+
+
+def test_load_hgt_overviews_requires_postgres_raster(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-r', '--overviews', '2',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--overviews requires --raster with --type postgres' in err
+
+
+def test_load_hgt_partition_band_requires_postgres(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '--partition-band', '10',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--partition-band requires --type postgres without raster' in err
+
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '--partition-band', '0', str(tmp_working_dir)])
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--partition-band must be between 1 and 90' in err
+
+
+def test_load_hgt_sqlite(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'), str(tmp_working_dir))
+    db_file = str(tmpdir.join('elevation.sqlite'))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-d', db_file, '-c', '2',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+
+    connection = sqlite3.connect(db_file)
+    assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (2500,)
+    assert connection.execute('SELECT tile, status, nb_rows FROM elevation_ledger').fetchall() == [
+        ('N00E001.hgt', 'done', 2500)]
+    connection.close()
+
+
+def test_load_hgt_sqlite_resample(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'), str(tmp_working_dir))
+    db_file = str(tmpdir.join('elevation.sqlite'))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-d', db_file, '--resample', '2',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+
+    connection = sqlite3.connect(db_file)
+    assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (625,)
+    # the squares are twice as large
+    lat_min, lat_max = connection.execute('SELECT lat_min, lat_max FROM elevation LIMIT 1').fetchone()
+    assert lat_max - lat_min == pytest.approx(2 / 49.)
+    connection.close()
+
+
+def test_load_hgt_resample_grid_schema(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '-u', 'gmalt', '--schema', 'grid', '--resample', '2',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--resample is not supported by the grid schema' in err
+
+
+def test_load_hgt_incremental_requires_standard_schema(capsys, monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-r', '--incremental',
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit):
+        app.load_hgt()
+    out, err = capsys.readouterr()
+    assert '--incremental cannot be combined with raster, --bulk, --writers or the grid schema' in err
+
+
+def test_load_hgt_sqlite_incremental(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    hgt_file = str(tmp_working_dir.join('N00E001.hgt'))
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'), hgt_file)
+    db_file = str(tmpdir.join('elevation.sqlite'))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-d', db_file, '--incremental',
+                                      str(tmp_working_dir)])
+    monkeypatch.setattr(worker.ImportWorker, 'BLOCK_LINES', 10)
+
+    for _ in range(2):
+        with pytest.raises(SystemExit) as e:
+            app.load_hgt()
+        assert e.value.code == 0
+
+    connection = sqlite3.connect(db_file)
+    assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (2500,)
+    assert connection.execute('SELECT count(*) FROM elevation_block').fetchone() == (5,)
+    # the unchanged file is skipped by the second import
+    assert connection.execute('SELECT nb_rows FROM elevation_ledger').fetchone() == (2500,)
+    connection.close()
+
+    # change the value of the line 25, column 0
+    with open(hgt_file, 'r+b') as hgt_fd:
+        hgt_fd.seek(2 * 25 * 50)
+        hgt_fd.write(b'\x7f\x00')
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+
+    connection = sqlite3.connect(db_file)
+    assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (2500,)
+    # only the block of 10 lines with the changed value is imported again
+    assert connection.execute('SELECT nb_rows FROM elevation_ledger').fetchone() == (500,)
+    assert connection.execute('SELECT count(*) FROM elevation WHERE rowid > 2500').fetchone() == (500,)
+    assert connection.execute('SELECT count(*) FROM elevation WHERE value = 32512').fetchone() == (1,)
+    connection.close()
+
+
+def test_load_hgt_sqlite_pipeline(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    for filename in ('N00E001.hgt', 'N02E010.hgt'):
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'import', filename), str(tmp_working_dir))
+    db_file = str(tmpdir.join('elevation.sqlite'))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-d', db_file, '-c', '2',
+                                      '--writers', '2', '-b', '300', str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+
+    connection = sqlite3.connect(db_file)
+    assert connection.execute('SELECT tile, status FROM elevation_ledger ORDER BY tile').fetchall() == [
+        ('N00E001.hgt', 'done'), ('N02E010.hgt', 'done')]
+    nb_rows = connection.execute('SELECT sum(nb_rows) FROM elevation_ledger').fetchone()[0]
+    assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (nb_rows,)
+    connection.close()
+
+
+def test_load_hgt_sqlite_stats_file(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'), str(tmp_working_dir))
+    db_file = str(tmpdir.join('elevation.sqlite'))
+    stats_file = str(tmpdir.join('stats.json'))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtload', '--type', 'sqlite', '-d', db_file, '--stats-file', stats_file,
+                                      str(tmp_working_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.load_hgt()
+    assert e.value.code == 0
+
+    with open(stats_file) as stats_fd:
+        stats = json.load(stats_fd)
+    assert list(stats) == ['load']
+    assert stats['load']['total_files'] == 1
+    assert stats['load']['counters'] == {'files': 1, 'rows': 2500, 'values': 2500, 'bytes': 5000}
+    assert stats['load']['total_bytes'] == 5000
+    assert set(stats['load']['timers']) == {'parse', 'encode', 'execute', 'commit'}
+    assert list(stats['load']['workers']) == ['ImportWorker 1']
+    assert stats['load']['rows_per_sec'] > 0
+
+
+def test_create_export_hgt_parser_min_args(tmpdir):
+    parser = app.create_export_hgt_parser()
+    args = vars(parser.parse_args([str(tmpdir), str(tmpdir)]))
+    assert args == {'folder': str(tmpdir), 'output': str(tmpdir), 'format': 'csv', 'sample': (None, None),
+                    'concurrency': 1, 'executor': 'thread', 'overwrite': False, 'stats_file': None,
+                    'verbose': False}
+
+
+def test_export_hgt(monkeypatch, tmpdir):
+    tmp_working_dir = tmpdir.mkdir("working_dir")
+    tmp_output_dir = tmpdir.mkdir("output_dir")
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'), str(tmp_working_dir))
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtexport', '-f', 'pgcopy', '-c', '2', str(tmp_working_dir),
+                                      str(tmp_output_dir)])
+
+    with pytest.raises(SystemExit) as e:
+        app.export_hgt()
+    assert e.value.code == 0
+    assert os.listdir(str(tmp_output_dir)) == ['N00E001.pgcopy']
+
+
+def test_create_serve_hgt_parser_min_args():
+    parser = app.create_serve_hgt_parser()
+    args = vars(parser.parse_args(['path/to/hgt']))
+    assert args == {'hgt_path': 'path/to/hgt', 'host': '127.0.0.1', 'port': 8080, 'socket': None,
+                    'interpolate': 'nearest', 'max_tiles': 64, 'max_mapped': None, 'verbose': False}
+
+
+def test_serve_hgt_not_found(monkeypatch, tmpdir):
+    monkeypatch.setattr(sys, 'argv', ['gmalt-hgtserve', str(tmpdir.join('N00E010.hgt'))])
+    with pytest.raises(SystemExit) as e:
+        app.serve_hgt()
+    assert e.value.code == 1
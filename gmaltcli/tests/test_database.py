@@ -1,7 +1,15 @@
+import os
+import struct
+import pickle
+import threading
+import binascii
+
+import numpy
 import pytest
 import sqlalchemy
 
 import gmaltcli.database as database
+import gmaltcli.reader as reader
 import gmaltcli.tests.tools as tools
 
 
@@ -12,10 +20,24 @@ def test_manager_registry_get_manager_class():
     postgres_raster = database.ManagerRegistry.get_manager_class('postgres', True)
     assert postgres_raster is database.PostgresRasterManager
 
+    postgres_copy = database.ManagerRegistry.get_manager_class('postgres', False, 'copy')
+    assert postgres_copy is database.PostgresCopyValueManager
+
+    postgres_grid = database.ManagerRegistry.get_manager_class('postgres', False, schema='grid')
+    assert postgres_grid is database.PostgresGridValueManager
+
     with pytest.raises(Exception) as e:
         database.ManagerRegistry.get_manager_class('couchdb', True)
     assert str(e.value) == "Unknown database driver couchdb"
 
+    with pytest.raises(database.NotSupportedException) as e:
+        database.ManagerRegistry.get_manager_class('postgres', True, 'copy')
+    assert str(e.value) == "Method copy is not supported by database driver postgres with raster"
+
+    with pytest.raises(database.NotSupportedException) as e:
+        database.ManagerRegistry.get_manager_class('postgres', False, 'copy', 'grid')
+    assert str(e.value) == "Method copy is not supported by database driver postgres with schema grid"
+
 
 def test_manager_constructor():
     postgres_standard = database.Manager('postgres', False, 'engine', 'table_name')
@@ -30,6 +52,10 @@ def test_manager_constructor():
     assert postgres_raster.connection is None
     assert postgres_raster.table_name == 'table_name'
 
+    postgres_copy = database.Manager('postgres', False, 'engine', 'table_name', method='copy')
+    assert isinstance(postgres_copy, database.PostgresCopyValueManager)
+    assert postgres_copy.batch_size == 100000
+
 
 def test_manager_factory_constructor_call_private_create_engine_method(monkeypatch):
     mock_callable = tools.MockCallable()
@@ -50,6 +76,26 @@ def test_manager_factory_constructor():
     assert factory.table_name == 'table_name'
 
 
+def test_manager_factory_pickle():
+    factory = database.ManagerFactory('postgres', 'table_name', pool_size=3, batch_size=50, host='db.local')
+    unpickled = pickle.loads(pickle.dumps(factory))
+    assert unpickled.engine is not factory.engine
+    assert isinstance(unpickled.engine, sqlalchemy.engine.Engine)
+    assert str(unpickled.engine.url) == str(factory.engine.url)
+    assert unpickled.engine.pool.size() == 3
+    assert unpickled.batch_size == 50
+
+
+def test_manager_factory_batch_size():
+    factory = database.ManagerFactory('postgres', 'table_name')
+    assert factory.get_manager(use_raster=False).batch_size == 1000
+    assert factory.get_manager(use_raster=True).batch_size == 10
+
+    factory = database.ManagerFactory('postgres', 'table_name', batch_size=50)
+    assert factory.get_manager(use_raster=False).batch_size == 50
+    assert factory.get_manager(use_raster=True).batch_size == 50
+
+
 def test_manager_factory_get_manager(monkeypatch):
     factory = database.ManagerFactory('postgres', 'table_name')
     postgres_standard = factory.get_manager(use_raster=False)
@@ -119,6 +165,9 @@ def test_base_manager_prepare_environment_table_exists(monkeypatch):
     def mockreturn_not_called(*args, **kwargs):
         raise Exception('not called')
     monkeypatch.setattr(database.BaseManager, 'create_table', mockreturn_not_called)
+    monkeypatch.setattr(database.BaseManager, 'indexes_exist', mockreturn)
+    monkeypatch.setattr(database.BaseManager, 'create_indexes', mockreturn_not_called)
+    monkeypatch.setattr(database.BaseManager, 'create_ledger', mockreturn)
 
     manager = database.BaseManager('connection', 'table_name')
     assert manager.prepare_environment() is None
@@ -138,12 +187,282 @@ def test_base_manager_prepare_environment_create_table(monkeypatch):
     def mockreturn_create_table(*args, **kwargs):
         return create_table_mock(*args, **kwargs)
     monkeypatch.setattr(database.BaseManager, 'create_table', mockreturn_create_table)
+    create_ledger_mock = tools.MockCallable()
+    monkeypatch.setattr(database.BaseManager, 'create_ledger', create_ledger_mock)
+    create_indexes_mock = tools.MockCallable()
+    monkeypatch.setattr(database.BaseManager, 'create_indexes', create_indexes_mock)
 
     manager = database.BaseManager('connection', 'table_name')
     manager.prepare_environment()
     assert create_table_mock.called is True
     assert create_table_mock.args[1:] == tuple()
-    assert create_table_mock.kwargs == dict()
+    assert create_table_mock.kwargs == {'unlogged': False}
+    assert create_ledger_mock.called is True
+    assert create_indexes_mock.called is True
+
+
+def test_base_manager_prepare_environment_bulk(monkeypatch):
+    calls = []
+    monkeypatch.setattr(database.BaseManager, 'is_compatible', lambda self: True)
+    monkeypatch.setattr(database.BaseManager, 'table_exists', lambda self: False)
+    monkeypatch.setattr(database.BaseManager, 'create_table', lambda self, unlogged: calls.append(('table', unlogged)))
+    monkeypatch.setattr(database.BaseManager, 'create_indexes', lambda self: calls.append(('indexes',)))
+    monkeypatch.setattr(database.BaseManager, 'create_ledger', lambda self: calls.append(('ledger',)))
+
+    manager = database.BaseManager('connection', 'table_name', bulk=True)
+    manager.prepare_environment(unlogged=True)
+    assert calls == [('table', True), ('ledger',)]
+
+    # The table of an interrupted bulk load is accepted but not a table with its indexes
+    monkeypatch.setattr(database.BaseManager, 'table_exists', lambda self: True)
+    monkeypatch.setattr(database.BaseManager, 'indexes_exist', lambda self: False)
+    manager.prepare_environment()
+    assert calls == [('table', True), ('ledger',), ('ledger',)]
+
+    monkeypatch.setattr(database.BaseManager, 'indexes_exist', lambda self: True)
+    with pytest.raises(database.TableExistsException):
+        manager.prepare_environment()
+
+
+def test_postgres_value_manager_create_table():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.create_table(unlogged=True)
+    manager.create_table()
+
+    executed = manager.connection.executed
+    assert executed[0][0].startswith('CREATE UNLOGGED TABLE "table_name" (')
+    assert executed[1][0].startswith('CREATE TABLE "table_name" (')
+    assert 'PRIMARY KEY' not in executed[1][0]
+
+
+def test_postgres_value_manager_create_partitioned_table():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.partition_band = 30
+    assert manager.get_partitions() == [
+        ('table_name_s90', 'MINVALUE', '-60'), ('table_name_s60', '-60', '-30'), ('table_name_s30', '-30', '0'),
+        ('table_name_n00', '0', '30'), ('table_name_n30', '30', '60'), ('table_name_n60', '60', 'MAXVALUE')]
+
+    manager.connection = tools.MockConnection()
+    manager.create_table(unlogged=True)
+    executed = manager.connection.executed
+    assert len(executed) == 7
+    assert executed[0][0].startswith('CREATE TABLE "table_name" (')
+    assert executed[0][0].endswith(') PARTITION BY RANGE (lat_min);')
+    assert executed[1][0] == ('CREATE UNLOGGED TABLE "table_name_s90" PARTITION OF "table_name" '
+                              'FOR VALUES FROM (MINVALUE) TO (-60);')
+    assert executed[4][0] == ('CREATE UNLOGGED TABLE "table_name_n00" PARTITION OF "table_name" '
+                              'FOR VALUES FROM (0) TO (30);')
+    # the table and its partitions are created together
+    assert len(manager.connection.transactions) == 1
+
+    manager.connection = tools.MockConnection()
+    manager.cluster()
+    manager.set_logged()
+    executed = manager.connection.executed
+    assert executed[0][0] == 'CLUSTER "table_name_s90" USING "table_name_s90_pkey";'
+    assert executed[6][0] == 'ALTER TABLE "table_name_s90" SET LOGGED;'
+    assert len(executed) == 12
+
+
+def test_postgres_grid_value_manager_partitions():
+    manager = database.PostgresGridValueManager('engine', 'table_name')
+    manager.partition_band = 90
+    assert manager.get_partitions() == [('table_name_s90', 'MINVALUE', str(database.grid_cell_id(0, -180 * 3600))),
+                                        ('table_name_n00', str(database.grid_cell_id(0, -180 * 3600)), 'MAXVALUE')]
+    # the cells at the latitude 0 are in the northern partition
+    assert database.grid_cell_id(0, -180 * 3600) <= database.grid_cell_id(0, 0)
+    assert database.grid_cell_id(-1, 180 * 3600) < database.grid_cell_id(0, -180 * 3600)
+
+    manager.connection = tools.MockConnection()
+    manager.create_table()
+    assert manager.connection.executed[0][0].endswith(') PARTITION BY RANGE (cell_id);')
+
+
+def test_base_manager_partitions_not_supported():
+    for manager_class in (database.PostgresRasterManager, database.SqliteValueManager, database.MysqlValueManager):
+        manager = manager_class('engine', 'table_name')
+        manager.partition_band = 10
+        with pytest.raises(database.NotSupportedException):
+            manager.create_table()
+        assert manager.is_partitioned() is False
+
+
+def test_base_manager_prepare_environment_not_partitioned(monkeypatch):
+    monkeypatch.setattr(database.BaseManager, 'is_compatible', lambda self: True)
+    monkeypatch.setattr(database.BaseManager, 'table_exists', lambda self: True)
+    monkeypatch.setattr(database.BaseManager, 'is_partitioned', lambda self: False)
+
+    manager = database.BaseManager('connection', 'table_name')
+    manager.partition_band = 10
+    with pytest.raises(database.TableExistsException) as e:
+        manager.prepare_environment()
+    assert str(e.value) == 'Table table_name already exists without partitions'
+
+
+def test_manager_factory_partition_band():
+    factory = database.ManagerFactory('postgres', 'table_name', partition_band=10)
+    assert factory.get_manager(use_raster=False).partition_band == 10
+    assert factory.get_manager(use_raster=True).partition_band is None
+
+
+def test_base_manager_optimize(monkeypatch):
+    calls = []
+    for method in ('deduplicate', 'create_indexes', 'analyze', 'cluster', 'set_logged'):
+        monkeypatch.setattr(database.BaseManager, method, lambda self, method=method: calls.append(method))
+
+    manager = database.PostgresValueManager('connection', 'table_name', bulk=True)
+    assert [phase for phase, duration in manager.optimize()] == ['deduplicate', 'index', 'analyze']
+    assert calls == ['deduplicate', 'create_indexes', 'analyze']
+
+    del calls[:]
+    assert [phase for phase, duration in manager.optimize(cluster=True, unlogged=True)] == [
+        'deduplicate', 'index', 'analyze', 'cluster', 'logged']
+    assert calls == ['deduplicate', 'create_indexes', 'analyze', 'cluster', 'set_logged']
+
+    # SQLite tables have no CLUSTER and are always logged
+    manager = database.SqliteValueManager('connection', 'table_name', bulk=True)
+    assert [phase for phase, duration in manager.optimize(cluster=True, unlogged=True)] == [
+        'deduplicate', 'index', 'analyze']
+
+
+def test_base_manager_deduplicate():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.deduplicate()
+    assert manager.connection.executed[0][0].startswith('DELETE FROM "table_name" a')
+
+    # rasters of different files never have the same extent
+    manager = database.PostgresRasterManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.deduplicate()
+    assert manager.connection.executed == []
+
+
+def test_postgres_copy_value_manager_insert_rows_bulk():
+    manager = database.PostgresCopyValueManager('engine', 'table_name', bulk=True)
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'lat_max': 1.0, 'lat_min': 0.0, 'lng_max': 1.0, 'lng_min': 0.0, 'value': 12}])
+
+    assert manager.connection.executed == []
+    assert manager.connection.cursor.copied == [
+        ('COPY "table_name" (lat_min, lng_min, lat_max, lng_max, "value") FROM STDIN;', b'0.0\t0.0\t1.0\t1.0\t12\n')]
+
+
+def test_postgres_raster_manager_insert_rows_bulk():
+    manager = database.PostgresRasterManager('engine', 'table_name', bulk=True)
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'rast': '0000'}])
+
+    executed = manager.connection.executed
+    assert len(executed) == 1
+    assert executed[0][0] == 'INSERT INTO "table_name" ("rast") VALUES (%(rast_0)s::raster);'
+
+
+def test_postgres_value_manager_tile_ledger():
+    tile = {'tile': 'N00E001.hgt', 'size': 5000, 'mtime': 1500000000.5, 'hash': 'abc'}
+    manager = database.PostgresValueManager('engine', 'table_name', batch_size=2)
+    manager.connection = tools.MockConnection()
+
+    manager.start_tile(tile)
+    manager.buffer.extend([{'lat_min': 0, 'lng_min': 0, 'lat_max': 1, 'lng_max': 1, 'value': idx}
+                           for idx in range(3)])
+    manager.end_tile(tile)
+
+    executed = manager.connection.executed
+    assert executed[0][0].startswith('INSERT INTO "table_name_ledger"')
+    assert executed[0][1]['tile'] == 'N00E001.hgt'
+    assert executed[0][1]['mtime'] == 1500000000.5
+    assert [query.startswith('INSERT INTO "table_name" ') for query, params in executed[1:3]] == [True, True]
+    assert executed[3][0].startswith('UPDATE "table_name_ledger"')
+    assert (executed[3][1]['tile'], executed[3][1]['nb_rows']) == ('N00E001.hgt', 3)
+    # the data and the ledger update are committed together in the tile transaction
+    assert manager.connection.transactions[1].committed is True
+    assert manager.transaction is None
+
+    manager.start_tile(tile)
+    manager.buffer.append({'lat_min': 0, 'lng_min': 0, 'lat_max': 1, 'lng_max': 1, 'value': 1})
+    manager.rollback_tile()
+    assert manager.connection.transactions[-1].rolled_back is True
+    assert manager.buffer == []
+    assert manager.nb_rows == 0
+
+
+def test_postgres_value_manager_get_done_tiles():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection(rows=[('N00E001.hgt', 5000, 1500000000.5)])
+    assert manager.get_done_tiles() == {'N00E001.hgt': (5000, 1500000000.5)}
+    assert manager.connection.executed[0][0].endswith("WHERE  status = 'done';")
+
+
+def test_postgres_value_manager_get_done_hashes():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection(rows=[('N00E001.hgt', 5000, 1500000000.5, 'a' * 32)])
+    assert manager.get_done_hashes() == {'N00E001.hgt': 'a' * 32}
+
+
+def test_postgres_value_manager_block_hashes():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection(rows=[(0, 'a' * 32), (100, 'b' * 32)])
+    manager.create_block_hashes()
+    assert manager.connection.executed[0][0].startswith('CREATE TABLE IF NOT EXISTS "table_name_block"')
+    assert manager.get_block_hashes('N00E001.hgt') == {0: 'a' * 32, 100: 'b' * 32}
+    assert manager.connection.executed[1][1] == {'tile': 'N00E001.hgt', 'table_name': 'table_name'}
+
+    manager.connection = tools.MockConnection()
+    manager.delete_block(-0.5, 1.0, 0.5, 2.0)
+    manager.record_block_hashes('N00E001.hgt', {100: 'c' * 32, 0: 'a' * 32})
+    executed = manager.connection.executed
+    assert executed[0][0].startswith('DELETE FROM "table_name" ')
+    assert executed[0][1] == {'lat_min': -0.5, 'lng_min': 1.0, 'lat_max': 0.5, 'lng_max': 2.0,
+                              'table_name': 'table_name'}
+    assert executed[1] == ('DELETE FROM "table_name_block" WHERE tile = %(tile)s;',
+                           {'tile': 'N00E001.hgt', 'table_name': 'table_name'})
+    assert [params for query, params in executed[2:]] == [
+        {'tile': 'N00E001.hgt', 'line': 0, 'hash': 'a' * 32, 'table_name': 'table_name'},
+        {'tile': 'N00E001.hgt', 'line': 100, 'hash': 'c' * 32, 'table_name': 'table_name'}]
+
+
+def test_block_hashes_not_supported():
+    for manager_class in (database.PostgresGridValueManager, database.PostgresRasterManager,
+                          database.SqliteTileManager, database.MysqlTileManager, database.MysqlLoadTileManager):
+        with pytest.raises(database.NotSupportedException):
+            manager_class('engine', 'table_name').create_block_hashes()
+
+
+def test_postgres_raster_manager_tune_queries():
+    manager = database.PostgresRasterManager('engine', 'table_name')
+    manager.connection = tools.MockConnection(rows=[(8192, 4096)])
+    assert manager.get_table_size() == (8192, 4096)
+    assert "pg_table_size('\"table_name\"')" in manager.connection.executed[0][0]
+
+    manager.connection = tools.MockConnection(rows=[(345,)])
+    assert manager.get_point_value(1.5, 2.5) == 345
+    assert manager.connection.executed[0][1] == {'lat': 1.5, 'lng': 2.5, 'table_name': 'table_name'}
+    assert 'FROM    "table_name" ' in manager.connection.executed[0][0]
+
+    manager.drop_table()
+    assert manager.connection.executed[1][0] == 'DROP TABLE IF EXISTS "table_name", "table_name_ledger";'
+
+
+def test_base_manager_tune_queries_not_supported():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    with pytest.raises(database.NotSupportedException):
+        manager.get_table_size()
+    with pytest.raises(database.NotSupportedException):
+        manager.get_point_value(1.5, 2.5)
+    with pytest.raises(database.NotSupportedException):
+        manager.drop_table()
+
+
+def test_manager_factory_with_table():
+    factory = database.ManagerFactory('postgres', 'table_name', pool_size=2, batch_size=50)
+    tune_factory = factory.with_table('table_name_tune')
+    assert tune_factory.table_name == 'table_name_tune'
+    assert tune_factory.engine is factory.engine
+    assert tune_factory.batch_size == 50
+    assert factory.table_name == 'table_name'
+    assert tune_factory.get_manager(True).table_name == 'table_name_tune'
 
 
 def test_postgres_value_manager_prepare_params():
@@ -159,13 +478,553 @@ def test_postgres_raster_manager_prepare_params():
     mock_parser = type('test', (object,), {})()
     mock_parser.square_width = 5.6
     mock_parser.square_height = 8.7
-    mock_parser.VOID_VALUE = -36543
+    mock_parser.VOID_VALUE = -32768
 
     manager = database.PostgresRasterManager('connection', 'table_name')
     return_value = manager.prepare_params(
-        ('notused1', 'notused2', 'notused2', [(2, 9), (5, 12), (8, 6), (15, 11)], [[456, 87, 65], [12, 54]]),
+        ('notused1', 'notused2', 'notused2', [(2, 9), (5, 12), (8, 6), (15, 11)], [[456, 87, 65], [12, 54, -2]]),
         mock_parser
     )
-    assert return_value == {'default_value': 0, 'elevation_values': [[456, 87, 65], [12, 54]], 'height': 2,
-                            'maxx': 11, 'maxy': 5, 'minx': 12, 'miny': 15, 'nodata_value': -36543, 'scalex': 5.6,
-                            'scaley': -8.7, 'topleftx': 12, 'toplefty': 5, 'width': 3}
+    assert return_value == {'rast': binascii.hexlify(
+        database.raster_wkb([[456, 87, 65], [12, 54, -2]], 12, 5, 5.6, -8.7, -32768)
+    ).decode('ascii')}
+
+
+def test_postgres_raster_manager_is_void():
+    mock_parser = type('test', (object,), {})()
+    mock_parser.VOID_VALUE = -32768
+
+    manager = database.PostgresRasterManager('connection', 'table_name')
+    assert manager.is_void((0, 0, 0, None, [[-32768, -32768], [-32768, -32768]]), mock_parser) is True
+    assert manager.is_void((0, 0, 0, None, [[-32768, -32768], [-32768, 12]]), mock_parser) is False
+
+
+def test_raster_wkb():
+    wkb = database.raster_wkb(numpy.array([[1, -2, 3], [-32768, 5, 6]], dtype='>i2'), 1.5, 2.5, 0.25, -0.5, -32768)
+    assert wkb == (
+        # endianness, version, nb bands, scalex, scaley, topleftx, toplefty, skewx, skewy, srid, width, height
+        struct.pack('>BHHddddddiHH', 0, 0, 1, 0.25, -0.5, 1.5, 2.5, 0, 0, 4326, 3, 2) +
+        # band pixel type 16BSI with nodata flag, nodata value
+        b'\x45\x80\x00' +
+        b'\x00\x01\xff\xfe\x00\x03\x80\x00\x00\x05\x00\x06'
+    )
+
+
+def test_base_manager_insert_data_buffered(monkeypatch):
+    insert_rows_calls = []
+    monkeypatch.setattr(database.BaseManager, 'insert_rows', lambda self, rows: insert_rows_calls.append(rows))
+    monkeypatch.setattr(database.BaseManager, 'prepare_params', lambda self, data, parser: {'value': data[4]})
+    mock_parser = type('test', (object,), {'VOID_VALUE': -32768})()
+
+    manager = database.BaseManager('connection', 'table_name', batch_size=2)
+    manager.insert_data((0, 0, 0, None, 1), mock_parser)
+    manager.insert_data((0, 0, 0, None, -32768), mock_parser)
+    assert insert_rows_calls == []
+    manager.insert_data((0, 0, 0, None, 2), mock_parser)
+    assert insert_rows_calls == [[{'value': 1}, {'value': 2}]]
+
+    manager.insert_many([(0, 0, 0, None, value) for value in range(3, 6)], mock_parser)
+    assert insert_rows_calls[1:] == [[{'value': 3}, {'value': 4}], [{'value': 5}]]
+    assert manager.buffer == []
+
+
+def test_base_manager_flush_on_exit(monkeypatch):
+    class MockEngine(object):
+        def connect(self):
+            return type('test', (object,), {'close': lambda self: None})()
+
+    insert_rows_calls = []
+    monkeypatch.setattr(database.BaseManager, 'insert_rows', lambda self, rows: insert_rows_calls.append(rows))
+
+    with database.BaseManager(MockEngine(), 'table_name', batch_size=10) as manager:
+        manager.buffer.append({'value': 1})
+    assert insert_rows_calls == [[{'value': 1}]]
+
+    with pytest.raises(ValueError):
+        with database.BaseManager(MockEngine(), 'table_name', batch_size=10) as manager:
+            manager.buffer.append({'value': 2})
+            raise ValueError()
+    assert len(insert_rows_calls) == 1
+    assert manager.buffer == []
+
+
+def test_postgres_value_manager_insert_rows(monkeypatch):
+    execute_mock = tools.MockCallable()
+    monkeypatch.setattr(database.PostgresValueManager, 'execute', execute_mock)
+
+    manager = database.PostgresValueManager('connection', 'table_name')
+    manager.insert_rows([
+        {'lat_max': 15, 'lat_min': 2, 'lng_max': 12, 'lng_min': 6, 'value': 456},
+        {'lat_max': 16, 'lat_min': 3, 'lng_max': 13, 'lng_min': 7, 'value': 457}
+    ])
+    query, params = execute_mock.args
+    assert query == database.PostgresValueManager.VALUE_CREATE_QUERY
+    assert query.endswith('ON CONFLICT DO NOTHING;')
+    assert params['values'].count('::smallint)') == 2
+    assert '%(lat_min_1)s' in params['values']
+    assert params['lat_min_0'] == 2
+    assert params['value_1'] == 457
+
+
+def test_postgres_copy_value_manager_format_rows():
+    formatted = database.PostgresCopyValueManager.format_rows([
+        {'lat_max': 0.1, 'lat_min': 2.0, 'lng_max': 12.5, 'lng_min': -6.25, 'value': 456},
+        {'lat_max': 16.0, 'lat_min': 3.0, 'lng_max': 13.0, 'lng_min': 7.0, 'value': -2}
+    ])
+    assert formatted == b'2.0\t-6.25\t0.1\t12.5\t456\n3.0\t7.0\t16.0\t13.0\t-2\n'
+
+
+def test_postgres_copy_value_manager_insert_rows():
+    manager = database.PostgresCopyValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'lat_max': 1.5, 'lat_min': 1.0, 'lng_max': 2.5, 'lng_min': 2.0, 'value': 42}])
+
+    cursor = manager.connection.cursor
+    assert cursor.copied == [('COPY "table_name_staging" (lat_min, lng_min, lat_max, lng_max, "value") FROM STDIN;',
+                              b'1.0\t2.0\t1.5\t2.5\t42\n')]
+    assert cursor.closed
+    executed = [query for query, params in manager.connection.executed]
+    assert len(executed) == 3
+    assert executed[0].startswith('CREATE TEMPORARY TABLE IF NOT EXISTS "table_name_staging"')
+    assert executed[1].startswith('INSERT INTO "table_name"')
+    assert executed[1].endswith('ON CONFLICT DO NOTHING;')
+    assert executed[2] == 'TRUNCATE "table_name_staging";'
+
+
+def test_postgres_copy_value_manager_send_rows_staging_emptied():
+    manager = database.PostgresCopyValueManager('engine', 'table_name')
+    manager.connection = tools.StagingMockConnection()
+    # the batches of a file are sent in the transaction of the file
+    manager.transaction = manager.connection.begin()
+    for value in range(3):
+        manager.send_rows(manager.encode_rows([{'lat_max': 1.5, 'lat_min': 1.0, 'lng_max': 2.5, 'lng_min': 2.0,
+                                                'value': value}] * 2))
+        assert manager.connection.staging == 0
+    # each merge only reads the rows of its batch
+    assert manager.connection.merged == [2, 2, 2]
+
+
+def test_postgres_raster_manager_insert_rows():
+    manager = database.PostgresRasterManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'rast': '0000'}, {'rast': '0001'}])
+
+    executed = manager.connection.executed
+    assert len(executed) == 4
+    assert executed[0][0].startswith('CREATE TEMPORARY TABLE IF NOT EXISTS "table_name_staging"')
+    assert executed[1][0].startswith('INSERT INTO "table_name_staging"')
+    assert executed[1][0].endswith('VALUES (%(rast_0)s::raster), (%(rast_1)s::raster);')
+    assert (executed[1][1]['rast_0'], executed[1][1]['rast_1']) == ('0000', '0001')
+    assert executed[2][0].startswith('INSERT INTO "table_name" ("rast") SELECT s.rast')
+    assert 'st_convexhull(e.rast) ~= st_convexhull(s.rast)' in executed[2][0]
+    assert executed[3][0] == 'TRUNCATE "table_name_staging";'
+
+
+def test_postgres_raster_manager_send_rows_staging_emptied():
+    manager = database.PostgresRasterManager('engine', 'table_name')
+    manager.connection = tools.StagingMockConnection()
+    manager.transaction = manager.connection.begin()
+    for _ in range(3):
+        manager.send_rows(manager.encode_rows([{'rast': '0000'}, {'rast': '0001'}, {'rast': '0002'}]))
+        assert manager.connection.staging == 0
+    assert manager.connection.merged == [3, 3, 3]
+
+
+def test_postgres_raster_manager_create_overviews():
+    manager = database.PostgresRasterManager('engine', 'table_name')
+    manager.overviews = (2, 4)
+    manager.connection = tools.MockConnection()
+    manager.create_overviews()
+
+    executed = manager.connection.executed
+    assert len(executed) == 2
+    assert executed[0][0].startswith('CREATE TABLE IF NOT EXISTS "o_2_table_name"')
+    assert 'AddOverviewConstraints(' in executed[0][0]
+    assert executed[1][1]['factor'] == 4
+    assert executed[1][1]['overview_table'] == 'o_4_table_name'
+
+
+def test_postgres_raster_manager_insert_overviews(tmpdir):
+    values = numpy.arange(25, dtype='>i2').reshape((5, 5))
+    values[:4, :4] = reader.HgtBlockReader.VOID_VALUE
+    hgt_file = tmpdir.join('S01W002.hgt')
+    hgt_file.write(values.tobytes(), mode='wb')
+
+    manager = database.PostgresRasterManager('engine', 'table_name', batch_size=2)
+    manager.overviews = (2, 4)
+    manager.connection = tools.MockConnection()
+    with reader.HgtBlockReader(str(hgt_file)) as block_reader:
+        manager.insert_overviews(block_reader, 2, 2)
+
+    executed = manager.connection.executed
+    # factor 2 : 3 rasters without the void one in 2 batches, factor 4 : 1 raster
+    assert [params['factor'] for _, params in executed] == [2, 2, 4]
+    assert [query.count('::raster') for query, _ in executed] == [2, 1, 1]
+    assert executed[0][0].startswith('INSERT INTO "o_2_table_name" ("rast") SELECT v.rast')
+    assert executed[2][0].startswith('INSERT INTO "o_4_table_name" ("rast") SELECT v.rast')
+
+    # the overview rasters have the pixel size of the table rasters multiplied by the factor
+    wkb = binascii.unhexlify(executed[0][1]['rast_0'])
+    assert struct.unpack('>dddd', wkb[5:37]) == (0.5, -0.5, -1.125, 0.125)
+    assert manager.nb_rows == 0
+
+
+def test_base_manager_overviews_not_supported():
+    manager = database.PostgresValueManager('engine', 'table_name')
+    manager.overviews = (2,)
+    with pytest.raises(database.NotSupportedException):
+        manager.create_overviews()
+    with pytest.raises(database.NotSupportedException):
+        manager.insert_overviews(None, 2, 2)
+
+
+def test_manager_factory_overviews():
+    factory = database.ManagerFactory('postgres', 'table_name', overviews=[2, 4])
+    assert factory.get_manager(use_raster=True).overviews == (2, 4)
+    assert factory.get_manager(use_raster=False).overviews == ()
+
+
+def test_postgres_value_manager_insert_block(monkeypatch):
+    insert_rows_calls = []
+    monkeypatch.setattr(database.PostgresValueManager, 'insert_rows', lambda self, rows: insert_rows_calls.append(rows))
+
+    block = reader.HgtBlock(line=0, nb_lines=1, nb_values=3, lat_min=numpy.array([1.0, 1.0, 1.0]),
+                            lng_min=numpy.array([2.0, 2.5, 3.0]), lat_max=numpy.array([1.5, 1.5, 1.5]),
+                            lng_max=numpy.array([2.5, 3.0, 3.5]), value=numpy.array([10, 11, 12], dtype=numpy.int16))
+
+    manager = database.PostgresValueManager('connection', 'table_name', batch_size=2)
+    manager.insert_block(block)
+    assert [rows.tolist() for rows in insert_rows_calls] == [[[1.0, 2.0, 1.5, 2.5, 10], [1.0, 2.5, 1.5, 3.0, 11]]]
+    assert manager.buffer.tolist() == [[1.0, 3.0, 1.5, 3.5, 12]]
+
+    # the rows left in the buffer are completed by the rows of the next block
+    manager.insert_block(block)
+    assert [rows.tolist() for rows in insert_rows_calls[1:]] == [[[1.0, 3.0, 1.5, 3.5, 12], [1.0, 2.0, 1.5, 2.5, 10]],
+                                                                 [[1.0, 2.5, 1.5, 3.0, 11], [1.0, 3.0, 1.5, 3.5, 12]]]
+    assert len(manager.buffer) == 0
+
+    manager.insert_block(block)
+    manager.flush()
+    assert insert_rows_calls[-1].tolist() == [[1.0, 3.0, 1.5, 3.5, 12]]
+    assert len(manager.buffer) == 0
+
+
+def test_base_value_manager_encode_block_rows():
+    rows = [{'lat_min': 2.0, 'lng_min': -6.25, 'lat_max': 0.1, 'lng_max': 12.5, 'value': 456},
+            {'lat_min': 3.0, 'lng_min': 7.0, 'lat_max': 16.0, 'lng_max': 13.0, 'value': -2}]
+    array = numpy.column_stack([numpy.array([row[column] for row in rows])
+                                for column in database.BaseValueManager.VALUE_COLUMNS])
+    # the rows of blocks are encoded like the rows of `prepare_params`
+    assert database.PostgresCopyValueManager.format_rows(array) == database.PostgresCopyValueManager.format_rows(rows)
+    assert database.MysqlLoadValueManager.format_rows(array) == (b'2.0\t-6.25\t0.1\t12.5\t456\n'
+                                                                 b'3.0\t7.0\t16.0\t13.0\t-2\n')
+
+    manager = database.PostgresValueManager('engine', 'table_name')
+    assert manager.bind_rows(array) == manager.bind_rows(rows)
+    assert database.SqliteValueManager('engine', 'table_name').encode_rows(array) == rows
+
+
+def test_manager_factory_schema():
+    factory = database.ManagerFactory('postgres', 'table_name', schema='grid')
+    assert isinstance(factory.get_manager(use_raster=False), database.PostgresGridValueManager)
+    # the schema only applies to the table without raster
+    assert isinstance(factory.get_manager(use_raster=True), database.PostgresRasterManager)
+
+
+def test_grid_cell_id():
+    assert database.grid_cell_id(0, 0) == (324000 << 21) | 648000
+    assert database.grid_cell_id(-324000, -648000) == 0
+    cell_ids = database.grid_cell_id(numpy.array([3600, -3], dtype=numpy.int64), numpy.array([7200, 648000]))
+    assert (cell_ids >> 21).tolist() == [327600, 323997]
+    assert (cell_ids & (2 ** 21 - 1)).tolist() == [655200, 1296000]
+
+
+def test_postgres_grid_value_manager_tile_params():
+    tile_params = database.PostgresGridValueManager.tile_params
+    assert tile_params({'tile': 'N00E001.hgt', 'size': 2 * 1201 * 1201}) == {'tile_lat': 0, 'tile_lng': 1,
+                                                                             'resolution': 3}
+    assert tile_params({'tile': 'S12W140.hgt', 'size': 2 * 3601 * 3601}) == {'tile_lat': -12, 'tile_lng': -140,
+                                                                             'resolution': 1}
+    with pytest.raises(database.NotSupportedException):
+        tile_params({'tile': 'N00E001.hgt', 'size': 2 * 50 * 50})
+
+
+def test_postgres_grid_value_manager_start_tile():
+    manager = database.PostgresGridValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.start_tile({'tile': 'S01W002.hgt', 'size': 50, 'mtime': 1.0, 'hash': None})
+
+    executed = manager.connection.executed
+    assert executed[0][0].startswith('INSERT INTO "table_name_ledger"')
+    assert executed[1][0].startswith('INSERT INTO "table_name_tile"')
+    assert (executed[1][1]['tile_lat'], executed[1][1]['tile_lng'], executed[1][1]['resolution']) == (-1, -2, 900)
+
+
+def test_postgres_grid_value_manager_insert_block(monkeypatch, tmpdir):
+    insert_rows_calls = []
+    monkeypatch.setattr(database.PostgresGridValueManager, 'insert_rows',
+                        lambda self, rows: insert_rows_calls.append(rows))
+
+    values = numpy.arange(25, dtype='>i2').reshape((5, 5))
+    values[0, 1] = reader.HgtBlockReader.VOID_VALUE
+    hgt_file = tmpdir.join('S01W002.hgt')
+    hgt_file.write(values.tobytes(), mode='wb')
+
+    manager = database.PostgresGridValueManager('connection', 'table_name', batch_size=100)
+    with reader.HgtBlockReader(str(hgt_file)) as block_reader:
+        for block in block_reader.get_block_iterator(2):
+            manager.insert_block(block)
+    manager.flush()
+
+    rows = insert_rows_calls[0].tolist()
+    assert len(rows) == 24
+    # top left value at (0, -2) then the cells are 900 arc seconds wide
+    assert rows[0] == [database.grid_cell_id(0, -7200), 0]
+    assert rows[1] == [database.grid_cell_id(0, -7200 + 2 * 900), 2]
+    assert rows[-1] == [database.grid_cell_id(-3600, -3600), 24]
+    params = manager.bind_rows(insert_rows_calls[0])
+    assert params['cell_id_23'] == database.grid_cell_id(-3600, -3600) and params['value_23'] == 24
+
+
+def test_postgres_grid_value_manager_prepare_params():
+    manager = database.PostgresGridValueManager('connection', 'table_name')
+    return_value = manager.prepare_params(
+        (0, 0, 0, [(-0.125, -2.125), (0.125, -2.125), (0.125, -1.875), (-0.125, -1.875)], 456), 'notused'
+    )
+    assert return_value == {'cell_id': database.grid_cell_id(0, -7200), 'value': 456}
+
+
+@pytest.fixture
+def sqlite_factory(tmpdir):
+    def factory(table_name='elevation', **kwargs):
+        return database.ManagerFactory('sqlite', table_name, database=str(tmpdir.join('elevation.sqlite')), **kwargs)
+    return factory
+
+
+def test_manager_factory_sqlite(sqlite_factory):
+    factory = sqlite_factory(pool_size=4)
+    assert isinstance(factory.get_manager(use_raster=False), database.SqliteValueManager)
+    assert isinstance(factory.get_manager(use_raster=True), database.SqliteTileManager)
+    with factory.engine.connect() as connection:
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA cache_size').scalar() == -262144
+
+
+def test_sqlite_writer(sqlite_factory):
+    engine = sqlite_factory().engine
+    engine.execute('CREATE TABLE test (value INTEGER UNIQUE)')
+
+    writer = database.SqliteWriter.acquire(engine)
+    assert database.SqliteWriter.acquire(engine) is writer
+    assert writer.users == 2
+
+    writer.submit('INSERT INTO test (value) VALUES (:value)', [{'value': 1}, {'value': 2}])
+    writer.wait(writer.submit('INSERT INTO test (value) VALUES (:value)', [{'value': 3}]))
+    assert engine.execute('SELECT count(*) FROM test').scalar() == 3
+
+    # The second query fails on the unique constraint, the next queries are not executed
+    token = writer.submit('INSERT INTO test (value) VALUES (:value)', [{'value': 3}])
+    with pytest.raises(database.WriterException):
+        writer.wait(token)
+    with pytest.raises(database.WriterException):
+        writer.submit('INSERT INTO test (value) VALUES (:value)', [{'value': 4}])
+
+    writer.release()
+    assert writer.is_alive()
+    writer.release()
+    assert not writer.is_alive()
+    assert database.SqliteWriter.acquire(engine) is not writer
+
+
+def test_sqlite_writer_release_waits_for_token(sqlite_factory):
+    engine = sqlite_factory().engine
+    writer = database.SqliteWriter.acquire(engine)
+    database.SqliteWriter.acquire(engine)
+
+    # another manager still uses the writer, the release waits for the last query of the manager
+    token = threading.Event()
+    releasing = threading.Thread(target=writer.release, args=(token,))
+    releasing.start()
+    releasing.join(0.2)
+    assert releasing.is_alive()
+    token.set()
+    releasing.join(5)
+    assert not releasing.is_alive()
+
+    writer.release()
+    assert not writer.is_alive()
+
+
+def test_sqlite_value_manager_import(sqlite_factory):
+    factory = sqlite_factory(batch_size=1000)
+    with factory.get_manager() as manager:
+        manager.prepare_environment()
+        assert manager.table_exists()
+        assert manager.indexes_exist()
+
+    hgt_path = os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt')
+    tile = {'tile': 'N00E001.hgt', 'size': 5000, 'mtime': 1500000000.5, 'hash': None}
+    for _ in range(2):
+        with factory.get_manager() as manager:
+            manager.start_tile(tile)
+            with reader.HgtBlockReader(hgt_path) as block_reader:
+                for block in block_reader.get_block_iterator(20):
+                    manager.insert_block(block)
+            manager.end_tile(tile)
+
+    with factory.get_manager() as manager:
+        assert manager.get_done_tiles() == {'N00E001.hgt': (5000, 1500000000.5)}
+        # the values of the second import are ignored
+        assert manager.execute('SELECT count(*) FROM "{table_name}"', method='scalar') == 2500
+        assert manager.execute('SELECT nb_rows FROM "{table_name}_ledger"', method='scalar') == 2500
+
+
+def test_sqlite_value_manager_block_hashes(sqlite_factory):
+    factory = sqlite_factory()
+    with factory.get_manager() as manager:
+        manager.prepare_environment()
+        manager.create_block_hashes()
+
+    hgt_path = os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt')
+    tile = {'tile': 'N00E001.hgt', 'size': 5000, 'mtime': 1500000000.5, 'hash': 'a' * 32}
+    with factory.get_manager() as manager:
+        manager.start_tile(tile)
+        with reader.HgtBlockReader(hgt_path) as block_reader:
+            for block in block_reader.get_block_iterator(20):
+                manager.insert_block(block)
+            # the rows of the second block are replaced
+            manager.delete_block(*block_reader.get_block_bounds(20, 20))
+            manager.insert_block(list(block_reader.get_block_iterator(20))[1])
+        manager.record_block_hashes('N00E001.hgt', {0: 'b' * 32, 20: 'c' * 32, 40: 'd' * 32})
+        manager.end_tile(tile)
+
+    with factory.get_manager() as manager:
+        assert manager.get_done_hashes() == {'N00E001.hgt': 'a' * 32}
+        assert manager.get_block_hashes('N00E001.hgt') == {0: 'b' * 32, 20: 'c' * 32, 40: 'd' * 32}
+        assert manager.execute('SELECT count(*) FROM "{table_name}"', method='scalar') == 2500
+        # the 1000 values of the second block are imported twice
+        assert manager.execute('SELECT nb_rows FROM "{table_name}_ledger"', method='scalar') == 3500
+
+
+def test_sqlite_tile_manager_import(sqlite_factory):
+    factory = sqlite_factory()
+    with factory.get_manager(use_raster=True) as manager:
+        manager.prepare_environment()
+
+    hgt_path = os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt')
+    with factory.get_manager(use_raster=True) as manager:
+        with reader.HgtBlockReader(hgt_path) as block_reader:
+            manager.insert_many(block_reader.get_sample_iterator(50, 1), block_reader.parser)
+            expected = numpy.array(block_reader.values[10])
+
+    with factory.get_manager(use_raster=True) as manager:
+        rows = manager.execute('SELECT lat_min, lat_max, lng_min, lng_max, width, height, data '
+                               'FROM "{table_name}" ORDER BY lat_max DESC')
+    # one BLOB per line of the HGT file
+    assert len(rows) == 50
+    assert rows[10][4:6] == (50, 1)
+    assert rows[10][1] - rows[10][0] == pytest.approx(1 / 49.)
+    assert numpy.frombuffer(rows[10][6], dtype='>i2').tolist() == expected.tolist()
+
+
+def test_sqlite_tile_manager_is_void():
+    mock_parser = type('test', (object,), {})()
+    mock_parser.VOID_VALUE = -32768
+
+    manager = database.SqliteTileManager('engine', 'table_name')
+    assert manager.is_void((0, 0, 0, None, numpy.array([[-32768, -32768]])), mock_parser) is True
+    assert manager.is_void((0, 0, 0, None, numpy.array([[-32768, 1]])), mock_parser) is False
+
+
+def test_manager_registry_get_manager_class_mysql():
+    assert database.ManagerRegistry.get_manager_class('mysql', False) is database.MysqlValueManager
+    assert database.ManagerRegistry.get_manager_class('mysql', False, 'copy') is database.MysqlLoadValueManager
+    assert database.ManagerRegistry.get_manager_class('mysql', True) is database.MysqlTileManager
+    assert database.ManagerRegistry.get_manager_class('mysql', True, 'copy') is database.MysqlLoadTileManager
+
+
+def test_mysql_value_manager_prepare_environment_bulk():
+    manager = database.MysqlValueManager('engine', 'table_name', bulk=True)
+    with pytest.raises(database.NotSupportedException) as e:
+        manager.prepare_environment()
+    assert str(e.value) == 'Bulk mode is not supported by database driver mysql'
+
+
+def test_mysql_value_manager_insert_rows():
+    manager = database.MysqlValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'lat_max': 1.5, 'lat_min': 1.0, 'lng_max': 2.5, 'lng_min': 2.0, 'value': 42},
+                         {'lat_max': 2.5, 'lat_min': 2.0, 'lng_max': 2.5, 'lng_min': 2.0, 'value': -3}])
+
+    query, params = manager.connection.executed[0]
+    assert query.startswith('INSERT IGNORE INTO `table_name`')
+    assert query.endswith('(%(lat_min_1)s, %(lng_min_1)s, %(lat_max_1)s, %(lng_max_1)s, %(value_1)s);')
+    assert (params['lat_min_0'], params['value_1']) == (1.0, -3)
+
+
+def test_mysql_load_value_manager_insert_rows():
+    manager = database.MysqlLoadValueManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    manager.insert_rows([{'lat_max': 1.5, 'lat_min': 1.0, 'lng_max': 2.5, 'lng_min': 2.0, 'value': 42}])
+
+    assert manager.connection.loaded == [b'1.0\t2.0\t1.5\t2.5\t42\n']
+    assert len(manager.connection.transactions) == 1
+    query, params = manager.connection.executed[0]
+    assert query == ('LOAD DATA LOCAL INFILE %(path)s IGNORE INTO TABLE `table_name` '
+                     '(lat_min, lng_min, lat_max, lng_max, `value`);')
+    # the temporary file is removed once loaded
+    assert not os.path.exists(params['path'])
+
+
+def test_mysql_tile_manager_insert_rows():
+    mock_parser = type('test', (object,), {})()
+    mock_parser.VOID_VALUE = -32768
+
+    manager = database.MysqlTileManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    data = (0, 0, 0, ((1.0, 2.0), (2.0, 2.0), (2.0, 3.0), (1.0, 3.0)), numpy.array([[1, -2], [-32768, 3]]))
+    assert manager.is_void(data, mock_parser) is False
+    manager.insert_rows([manager.prepare_params(data, mock_parser), manager.prepare_params(data, mock_parser)])
+
+    assert manager.connection.loaded == []
+    query, params = manager.connection.executed[0]
+    assert query.startswith('INSERT IGNORE INTO `table_name` (lat_min, lng_min, lat_max, lng_max, width, height, '
+                            'data, envelope) VALUES (')
+    assert query.count('UNHEX(') == 2
+    assert query.endswith('ST_MakeEnvelope(Point(%(lng_min_1)s, %(lat_min_1)s), Point(%(lng_max_1)s, %(lat_max_1)s)));')
+    assert (params['data_1'], params['width_1'], params['lat_max_1']) == ('0001fffe80000003', 2, 2.0)
+
+
+def test_mysql_load_tile_manager_insert_rows():
+    mock_parser = type('test', (object,), {})()
+    mock_parser.VOID_VALUE = -32768
+
+    manager = database.MysqlLoadTileManager('engine', 'table_name')
+    manager.connection = tools.MockConnection()
+    data = (0, 0, 0, ((1.0, 2.0), (2.0, 2.0), (2.0, 3.0), (1.0, 3.0)), numpy.array([[1, -2], [-32768, 3]]))
+    manager.insert_rows([manager.prepare_params(data, mock_parser)])
+
+    assert manager.connection.loaded == [b'1.0\t2.0\t2.0\t3.0\t2\t2\t0001fffe80000003\n']
+    query = manager.connection.executed[0][0]
+    assert 'SET data = UNHEX(@data), envelope = ST_MakeEnvelope(' in query
+
+
+def test_mysql_tile_manager_is_compatible(monkeypatch):
+    manager = database.MysqlTileManager('engine', 'table_name')
+    results = {}
+    monkeypatch.setattr(manager, 'execute', lambda query, method: results[query])
+
+    # `LOAD DATA LOCAL INFILE` is not used by the insert method
+    results = {manager.VERSION_QUERY: '8.0.36'}
+    assert manager.is_compatible() is True
+    results = {manager.VERSION_QUERY: '5.7.44'}
+    assert manager.is_compatible() is False
+
+    manager = database.MysqlLoadTileManager('engine', 'table_name')
+    monkeypatch.setattr(manager, 'execute', lambda query, method: results[query])
+    results = {manager.LOCAL_INFILE_QUERY: 1, manager.VERSION_QUERY: '8.0.36'}
+    assert manager.is_compatible() is True
+    results = {manager.LOCAL_INFILE_QUERY: 1, manager.VERSION_QUERY: '10.6.12-MariaDB'}
+    assert manager.is_compatible() is False
+    results = {manager.LOCAL_INFILE_QUERY: 0, manager.VERSION_QUERY: '8.0.36'}
+    assert manager.is_compatible() is False
@@ -0,0 +1,109 @@
+import os
+import struct
+import binascii
+
+import numpy
+import pytest
+
+import gmaltcli.database as database
+import gmaltcli.export as export
+import gmaltcli.reader as reader
+
+
+@pytest.fixture
+def hgt_path():
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'import', 'N00E001.hgt')
+
+
+def export_file(exporter_class, hgt_path, output_dir, samples=(None, None)):
+    output_path = exporter_class.get_output_path(str(output_dir), hgt_path)
+    with reader.HgtBlockReader(hgt_path) as block_reader:
+        with exporter_class(output_path, samples=samples) as exporter:
+            for item in exporter.get_iterator(block_reader):
+                exporter.write(item)
+    return output_path, exporter.nb_rows
+
+
+def expected_rows(hgt_path):
+    with reader.HgtBlockReader(hgt_path) as block_reader:
+        block = next(block_reader.get_block_iterator(50))
+    return list(zip(block.lat_min.tolist(), block.lng_min.tolist(), block.lat_max.tolist(), block.lng_max.tolist(),
+                    block.value.tolist()))
+
+
+def test_exporter_registry_get_exporter_class():
+    assert export.ExporterRegistry.get_exporter_class('csv') is export.CsvExporter
+    assert export.ExporterRegistry.get_exporter_class('pgcopy') is export.PgCopyExporter
+    assert export.ExporterRegistry.get_exporter_class('parquet') is export.ParquetExporter
+    assert export.ExporterRegistry.get_exporter_class('pgraster') is export.PgRasterExporter
+
+    with pytest.raises(Exception) as e:
+        export.ExporterRegistry.get_exporter_class('xml')
+    assert str(e.value) == 'Unknown export format xml'
+
+
+def test_csv_exporter(hgt_path, tmpdir):
+    output_path, nb_rows = export_file(export.CsvExporter, hgt_path, tmpdir)
+
+    assert output_path == str(tmpdir.join('N00E001.csv'))
+    assert nb_rows == 2500
+    with open(output_path) as output:
+        lines = output.read().splitlines()
+    assert lines[0] == 'lat_min,lng_min,lat_max,lng_max,value'
+    rows = [tuple(float(value) for value in line.split(',')) for line in lines[1:]]
+    assert rows == expected_rows(hgt_path)
+    assert os.listdir(str(tmpdir)) == ['N00E001.csv']
+
+
+def test_pgcopy_exporter(hgt_path, tmpdir):
+    output_path, nb_rows = export_file(export.PgCopyExporter, hgt_path, tmpdir)
+
+    with open(output_path, 'rb') as output:
+        data = output.read()
+    assert data.startswith(b'PGCOPY\n\xff\r\n\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+    assert data.endswith(b'\xff\xff')
+    rows = numpy.frombuffer(data[19:-2], dtype=export.PGCOPY_ROW_DTYPE)
+    assert len(rows) == nb_rows == 2500
+    assert set(rows['nb_fields'].tolist()) == {5}
+    assert set(rows['lat_min_length'].tolist()) == {8}
+    assert set(rows['value_length'].tolist()) == {2}
+    assert list(zip(rows['lat_min'].tolist(), rows['lng_min'].tolist(), rows['lat_max'].tolist(),
+                    rows['lng_max'].tolist(), rows['value'].tolist())) == expected_rows(hgt_path)
+
+
+def test_parquet_exporter(hgt_path, tmpdir):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    output_path, nb_rows = export_file(export.ParquetExporter, hgt_path, tmpdir)
+
+    table = pyarrow_parquet.read_table(output_path)
+    assert table.num_rows == nb_rows == 2500
+    assert table.column('value').to_pylist() == [row[4] for row in expected_rows(hgt_path)]
+
+
+def test_pgraster_exporter(hgt_path, tmpdir):
+    output_path, nb_rows = export_file(export.PgRasterExporter, hgt_path, tmpdir, samples=(25, 50))
+
+    with open(output_path, 'rb') as output:
+        lines = output.read().splitlines()
+    assert len(lines) == nb_rows == 2
+    wkb = binascii.unhexlify(lines[1])
+    header = struct.unpack('>BHHddddddiHH', wkb[:61])
+    # top left corner of the second sample and its size
+    assert (header[5], header[6], header[10], header[11]) == (1.5, pytest.approx(1 + 0.5 / 49), 25, 50)
+
+    with reader.HgtBlockReader(hgt_path) as block_reader:
+        values = numpy.array(block_reader.values[:, 25:])
+    assert wkb == database.raster_wkb(values, header[5], header[6], header[3], header[4], -32768)
+
+
+def test_exporter_discard(hgt_path, tmpdir):
+    output_path = str(tmpdir.join('N00E001.csv'))
+    with export.CsvExporter(output_path) as exporter:
+        assert os.path.exists(output_path + '.part')
+        exporter.discard()
+    assert os.listdir(str(tmpdir)) == []
+
+    with pytest.raises(ValueError):
+        with export.CsvExporter(output_path):
+            raise ValueError('error')
+    assert os.listdir(str(tmpdir)) == []
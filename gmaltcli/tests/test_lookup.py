@@ -0,0 +1,303 @@
+import io
+import os
+import json
+
+import numpy
+import pytest
+
+import gmalthgtparser as hgt
+
+import gmaltcli.lookup as lookup
+import gmaltcli.reader as reader
+
+
+@pytest.fixture
+def srtm3_path():
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'srtm3', 'N00E010.hgt')
+
+
+@pytest.fixture
+def void_hgt_path(tmpdir):
+    values = numpy.arange(25, dtype='>i2').reshape((5, 5))
+    values[0, 1] = reader.HgtBlockReader.VOID_VALUE
+    hgt_file = tmpdir.join('S01W002.hgt')
+    hgt_file.write(values.tobytes(), mode='wb')
+    return str(hgt_file)
+
+
+def test_tile_keys():
+    keys = lookup.tile_keys(numpy.array([0.5, -0.5, 48.8566, -89.9]), numpy.array([10.5, -1.5, 2.3522, 179.9]))
+    assert [lookup.tile_from_key(key) for key in keys] == [(0, 10), (-1, -2), (48, 2), (-90, 179)]
+
+
+def test_tile_name():
+    assert lookup.tile_name(48, 2) == 'N48E002'
+    assert lookup.tile_name(-1, -2) == 'S01W002'
+    assert lookup.tile_name(0, -180) == 'N00W180'
+
+
+def write_tile(folder, name, sample, value):
+    values = numpy.full((sample, sample), value, dtype='>i2')
+    folder.join(name).write(values.tobytes(), mode='wb')
+    return str(folder.join(name))
+
+
+def write_linear_tile(folder, name, lng, void=None):
+    # the elevation is 40 * lat + 20 * (lng - 10) so that the interpolated values are exact
+    lines, cols = numpy.mgrid[0:5, 0:5]
+    values = (40 - 10 * lines + 20 * (lng - 10) + 5 * cols).astype('>i2')
+    if void:
+        values[void] = reader.HgtBlockReader.VOID_VALUE
+    folder.join(name).write(values.tobytes(), mode='wb')
+
+
+def test_cubic_weights():
+    weights = lookup.cubic_weights(numpy.array([0, 0.5, 1]))
+    assert weights.T.tolist() == [[0, 1, 0, 0], [-0.0625, 0.5625, 0.5625, -0.0625], [0, 0, 1, 0]]
+
+
+def test_tile_index(tmpdir):
+    n00e010 = write_tile(tmpdir, 'N00E010.hgt', 5, 1)
+    write_tile(tmpdir, 'N01E010.hgt', 3, 2)
+    write_tile(tmpdir, 'N00E011.hgt', 5, 3)
+    write_tile(tmpdir, 'N45W005.hgt', 3, 4)
+    tmpdir.join('S01E010.hgt').write(b'\x00\x01\x00', mode='wb')
+    tmpdir.join('elevation.hgt').write(b'\x00\x01', mode='wb')
+    tmpdir.join('N02E010.txt').write(b'\x00\x01', mode='wb')
+
+    index = lookup.TileIndex.from_path(str(tmpdir))
+    assert len(index) == 4
+    assert [tile.name for tile in index.tiles] == ['N00E010', 'N00E011', 'N01E010', 'N45W005']
+    assert index.find(0.5, 10.5) == lookup.HgtTile('N00E010', 0, 10, n00e010, 5)
+    assert index.find(45.5, -4.5).sample == 3
+    assert index.find(3.5, 10.5) is None
+
+    positions = index.route(numpy.array([1.0, 0.999, 0.5, -0.1, -0.2, 0.5, numpy.nan]),
+                            numpy.array([10.5, 10.5, 11.0, 10.5, 10.5, 10.99, 10.5]))
+    assert [index.tiles[position].name if position >= 0 else None for position in positions] == [
+        # on the edge of two tiles, the northern and eastern tile
+        'N01E010', 'N00E010', 'N00E011',
+        # the half square below the tile N00E010 (0.125) without the file S01E010
+        'N00E010', None,
+        # near the edge of N00E011 but inside N00E010
+        'N00E010', None]
+
+
+def test_tile_index_from_path(void_hgt_path, tmpdir):
+    index = lookup.TileIndex.from_path(void_hgt_path)
+    assert [tile.name for tile in index.tiles] == ['S01W002']
+    # the single file covers its half square margins
+    assert index.find(0.1, -2.1).name == 'S01W002'
+
+    with pytest.raises(Exception) as e:
+        lookup.TileIndex.from_path(str(tmpdir.join('N00E000.hgt')))
+    assert 'not found' in str(e.value)
+
+    tmpdir.join('elevation.hgt').write(b'\x00\x01', mode='wb')
+    with pytest.raises(Exception) as e:
+        lookup.TileIndex.from_path(str(tmpdir.join('elevation.hgt')))
+    assert 'does not match expected HGT file pattern' in str(e.value)
+
+    assert len(lookup.TileIndex.from_path(str(tmpdir.mkdir('empty')))) == 0
+
+
+def test_tile_lookup_folder(tmpdir):
+    write_tile(tmpdir, 'N00E010.hgt', 5, 1)
+    write_tile(tmpdir, 'N01E010.hgt', 3, 2)
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        values, found = tile_lookup.lookup(numpy.array([0.5, 1.5, 1.0, 5.5]), numpy.array([10.5, 10.5, 10.5, 10.5]))
+        assert tile_lookup.get_elevation(0.2, 10.2) == 1
+        assert tile_lookup.get_elevation(-5.0, 10.2) is None
+
+    assert values[:3].tolist() == [1, 2, 2]
+    assert found.tolist() == [True, True, True, False]
+    assert tile_lookup.missing == {'N05E010', 'S05E010'}
+
+
+def test_tile_cache(tmpdir):
+    index = lookup.TileIndex([write_tile(tmpdir, 'N00E010.hgt', 5, 1), write_tile(tmpdir, 'N01E010.hgt', 3, 2),
+                              write_tile(tmpdir, 'N02E010.hgt', 5, 3)])
+    n00e010, n01e010, n02e010 = index.tiles
+
+    cache = lookup.TileCache(max_tiles=2)
+    first = cache.get(n00e010)
+    assert first.values[0, 0] == 1
+    assert cache.get(n00e010) is first
+    cache.get(n01e010)
+    # N00E010 is the most recently used file, N01E010 is evicted
+    cache.get(n00e010)
+    cache.get(n02e010)
+    assert list(cache.readers) == [n00e010.path, n02e010.path]
+    assert cache.stats == {'hits': 2, 'misses': 3, 'evictions': 1, 'tiles': 2, 'bytes': 100}
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nb_bytes == 0
+    assert first.values is None
+
+
+def test_tile_cache_max_bytes(tmpdir):
+    index = lookup.TileIndex([write_tile(tmpdir, 'N00E010.hgt', 5, 1), write_tile(tmpdir, 'N01E010.hgt', 3, 2),
+                              write_tile(tmpdir, 'N02E010.hgt', 5, 3)])
+    n00e010, n01e010, n02e010 = index.tiles
+
+    cache = lookup.TileCache(max_tiles=None, max_bytes=70)
+    cache.get(n00e010)
+    cache.get(n01e010)
+    assert cache.nb_bytes == 68
+    cache.get(n02e010)
+    assert list(cache.readers) == [n01e010.path, n02e010.path]
+    assert cache.stats == {'hits': 0, 'misses': 3, 'evictions': 1, 'tiles': 2, 'bytes': 68}
+
+    # a file larger than the limit is kept open alone
+    cache = lookup.TileCache(max_bytes=10)
+    cache.get(n00e010)
+    cache.get(n00e010)
+    assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0, 'tiles': 1, 'bytes': 50}
+
+
+def test_tile_lookup_cache(tmpdir):
+    write_tile(tmpdir, 'N00E010.hgt', 5, 1)
+    write_tile(tmpdir, 'N01E010.hgt', 3, 2)
+    with lookup.TileLookup(str(tmpdir), max_tiles=1) as tile_lookup:
+        for _ in range(2):
+            values, found = tile_lookup.lookup(numpy.array([0.5, 1.5, 0.4]), numpy.array([10.5, 10.5, 10.5]))
+            assert values.tolist() == [1, 2, 1]
+    # the points of a file are looked up at once so each file is opened once per lookup
+    assert tile_lookup.cache.stats == {'hits': 0, 'misses': 4, 'evictions': 3, 'tiles': 0, 'bytes': 0}
+
+
+def test_tile_lookup_get_samples(tmpdir):
+    write_linear_tile(tmpdir, 'N00E010.hgt', 10)
+    write_linear_tile(tmpdir, 'N00E011.hgt', 11)
+    write_tile(tmpdir, 'N01E010.hgt', 3, 2)
+    key = lookup.tile_keys(numpy.array([0.5]), numpy.array([10.5]))[0]
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        values = tile_lookup.get_samples(numpy.full(5, key), numpy.array([2, 2, 4, -1, 5]),
+                                         numpy.array([1, 5, 4, 0, 0]), numpy.full(5, 5))
+    # inside the tile, in the east tile, on the corner, in the north tile of another resolution, no south tile
+    assert values.tolist() == [25, 45, 20, reader.HgtBlockReader.VOID_VALUE, reader.HgtBlockReader.VOID_VALUE]
+
+
+def test_tile_lookup_interpolate(tmpdir):
+    write_linear_tile(tmpdir, 'N00E010.hgt', 10)
+    write_linear_tile(tmpdir, 'N00E011.hgt', 11)
+    lats = numpy.array([0.625, 0.5, -0.1, 5.5, numpy.nan])
+    lngs = numpy.array([10.9, 11.0, 10.5, 10.5, 10.5])
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        for method in ('bilinear', 'bicubic'):
+            values, found = tile_lookup.interpolate(lats, lngs, method)
+            # the last point of the margin below N00E010 gets the value of the edge
+            assert values[:3] == pytest.approx([43, 40, 10])
+            assert numpy.isnan(values[3:]).all()
+            assert found.tolist() == [True, True, True, False, False]
+
+        values, found = tile_lookup.interpolate(numpy.array([0.6]), numpy.array([10.9]), 'nearest')
+        assert values.tolist() == [40.0]
+
+        with pytest.raises(ValueError):
+            tile_lookup.interpolate(lats, lngs, 'linear')
+
+
+def test_tile_lookup_interpolate_bicubic(tmpdir):
+    write_tile(tmpdir, 'N00E010.hgt', 5, 0)
+    values = numpy.zeros((5, 5), dtype='>i2')
+    values[2, 1] = 100
+    tmpdir.join('N00E011.hgt').write(values.tobytes(), mode='wb')
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        # halfway between the last two columns of N00E010, the bump of N00E011 is one column beyond
+        bilinear = tile_lookup.interpolate(numpy.array([0.5]), numpy.array([10.875]), 'bilinear')[0]
+        bicubic = tile_lookup.interpolate(numpy.array([0.5]), numpy.array([10.875]), 'bicubic')[0]
+    assert bilinear.tolist() == [0]
+    assert bicubic.tolist() == [-6.25]
+
+
+def test_tile_lookup_interpolate_void(tmpdir):
+    write_linear_tile(tmpdir, 'N00E010.hgt', 10, void=(1, 1))
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        for method in ('bilinear', 'bicubic'):
+            values, found = tile_lookup.interpolate(numpy.array([0.625, 0.75]), numpy.array([10.375, 10.25]), method)
+            # the void sample is left out, no value on the void sample
+            assert values[0] == pytest.approx(95 / 3.)
+            assert numpy.isnan(values[1])
+            assert found.all()
+
+
+def test_tile_lookup(void_hgt_path):
+    lats = numpy.array([0.1, numpy.nan, 0.1, -0.5, 5.0, -0.95])
+    lngs = numpy.array([-2.1, 1.0, -1.8, -1.5, 5.0, -1.1])
+    with lookup.TileLookup(void_hgt_path) as tile_lookup:
+        values, found = tile_lookup.lookup(lats, lngs)
+        assert len(tile_lookup.cache) == 1
+    assert len(tile_lookup.cache) == 0
+    assert tile_lookup.missing == {'N05E005'}
+
+    assert values.tolist() == [0, None, None, 12, None, 24]
+    assert found.tolist() == [True, False, True, True, False, True]
+
+
+def test_tile_lookup_same_as_parser(srtm3_path):
+    random = numpy.random.RandomState(42)
+    lats, lngs = random.uniform(0, 1, 1000), random.uniform(10, 11, 1000)
+    with lookup.TileLookup(srtm3_path) as tile_lookup:
+        values, found = tile_lookup.lookup(lats, lngs)
+
+    assert found.all()
+    with hgt.HgtParser(srtm3_path) as parser:
+        assert values.tolist() == [parser.get_elevation((lat, lng))[2] for lat, lng in zip(lats, lngs)]
+
+
+def test_parse_points():
+    lats, lngs, objects = lookup.parse_points(['1.5,2.5', '3,4,name', 'lat,lng', '5'])
+    assert lats[:2].tolist() == [1.5, 3.0] and lngs[:2].tolist() == [2.5, 4.0]
+    assert numpy.isnan(lats[2:]).all()
+    assert objects is None
+
+    lats, lngs, objects = lookup.parse_points(['{"lat": 1.5, "lng": 2.5, "id": 1}', '{"lat": 3}', '[1, 2]', '{'],
+                                              'jsonl')
+    assert lats[0] == 1.5 and lngs[0] == 2.5
+    assert numpy.isnan(lats[1:]).all()
+    assert objects == [{'lat': 1.5, 'lng': 2.5, 'id': 1}, {'lat': 3}, [1, 2], None]
+
+
+def test_format_results():
+    values = numpy.array([57, reader.HgtBlockReader.VOID_VALUE, 12], dtype=numpy.int16)
+    found = numpy.array([True, True, False])
+    assert lookup.format_results(['1,2', '3,4', '5,6'], None, values, found) == ['1,2,57', '3,4,', '5,6,']
+
+    results = lookup.format_results(['{"lat": 1, "lng": 2}', '{"lat": 3, "lng": 4}', '{'],
+                                    [{'lat': 1, 'lng': 2}, {'lat': 3, 'lng': 4}, None], values, found)
+    assert [json.loads(result) for result in results] == [{'lat': 1, 'lng': 2, 'elevation': 57},
+                                                          {'lat': 3, 'lng': 4, 'elevation': None},
+                                                          {'input': '{', 'elevation': None}]
+
+
+def test_lookup_stream(void_hgt_path):
+    input_stream = io.StringIO(u'lat,lng\n0.1,-2.1\n\n-0.5,-1.5\n0.1,-1.8\n5,5\nbad\n-0.95,-1.1\n')
+    output_stream = io.StringIO()
+    with lookup.TileLookup(void_hgt_path) as tile_lookup:
+        counts = lookup.lookup_stream(input_stream, output_stream, tile_lookup, chunk_size=2)
+
+    assert output_stream.getvalue() == (u'lat,lng,elevation\n0.1,-2.1,0\n-0.5,-1.5,12\n0.1,-1.8,\n5,5,\nbad,\n'
+                                        u'-0.95,-1.1,24\n')
+    assert counts == {'points': 6, 'found': 3, 'void': 1, 'not_found': 1, 'invalid': 1}
+
+
+def test_lookup_stream_interpolation(tmpdir):
+    write_linear_tile(tmpdir, 'N00E010.hgt', 10, void=(1, 1))
+    input_stream = io.StringIO(u'0.625,10.375\n0.75,10.25\n0.5,10.1\n5,5\n')
+    output_stream = io.StringIO()
+    with lookup.TileLookup(str(tmpdir)) as tile_lookup:
+        counts = lookup.lookup_stream(input_stream, output_stream, tile_lookup, interpolation='bilinear')
+
+    assert output_stream.getvalue() == u'0.625,10.375,31.67\n0.75,10.25,\n0.5,10.1,22.0\n5,5,\n'
+    assert counts == {'points': 4, 'found': 2, 'void': 1, 'not_found': 1, 'invalid': 0}
+
+
+def test_lookup_stream_jsonl(void_hgt_path):
+    input_stream = io.StringIO(u'{"lat": -0.5, "lng": -1.5, "id": "a"}\n{"lat": 5, "lng": 5, "id": "b"}\n')
+    output_stream = io.StringIO()
+    with lookup.TileLookup(void_hgt_path) as tile_lookup:
+        lookup.lookup_stream(input_stream, output_stream, tile_lookup, input_format='jsonl')
+
+    assert [json.loads(line) for line in output_stream.getvalue().splitlines()] == [
+        {'lat': -0.5, 'lng': -1.5, 'id': 'a', 'elevation': 12}, {'lat': 5, 'lng': 5, 'id': 'b', 'elevation': None}]
@@ -0,0 +1,113 @@
+import json
+import time
+import logging
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+import gmaltcli.metrics as metrics
+
+
+class TestMetrics(object):
+    def test_count(self):
+        worker_metrics = metrics.Metrics()
+        worker_metrics.count('files')
+        worker_metrics.count('rows', 100)
+        worker_metrics.count('rows', 50)
+        assert worker_metrics.counters == {'files': 1, 'rows': 150}
+
+    def test_timer_exclusive(self):
+        worker_metrics = metrics.Metrics()
+        with worker_metrics.timer('encode'):
+            time.sleep(0.02)
+            with worker_metrics.timer('execute'):
+                time.sleep(0.05)
+        assert 0.02 <= worker_metrics.timers['encode'] < 0.05
+        assert worker_metrics.timers['execute'] >= 0.05
+        assert worker_metrics.stack == []
+
+    def test_timed(self):
+        worker_metrics = metrics.Metrics()
+
+        def slow_iterator():
+            for item in range(3):
+                time.sleep(0.01)
+                yield item
+
+        assert list(worker_metrics.timed(slow_iterator(), 'parse')) == [0, 1, 2]
+        assert worker_metrics.timers['parse'] >= 0.03
+
+    def test_pop(self):
+        worker_metrics = metrics.Metrics()
+        worker_metrics.count('rows', 10)
+        with worker_metrics.timer('parse'):
+            report = worker_metrics.pop()
+            assert report['counters'] == {'rows': 10}
+            assert list(report['timers']) == ['parse']
+        assert worker_metrics.counters == {}
+        assert list(worker_metrics.timers) == ['parse']
+        assert not worker_metrics.is_due()
+
+
+class TestMetricsCollector(object):
+    def get_collector(self):
+        collector = metrics.MetricsCollector('load', total_bytes=4000)
+        collector.total_files = 2
+        reports = queue.Queue()
+        reports.put(('ImportWorker 1', {'counters': {'files': 1, 'rows': 500, 'bytes': 1000},
+                                        'timers': {'parse': 1., 'execute': 2.}}))
+        reports.put(('ImportWorker 1', {'counters': {'rows': 500, 'bytes': 1000}, 'timers': {'execute': 1.}}))
+        reports.put(('ImportWorker 2', {'counters': {'rows': 200}, 'timers': {'parse': 0.5}}))
+        collector.collect(reports)
+        return collector
+
+    def test_collect(self):
+        collector = self.get_collector()
+        assert collector.workers['ImportWorker 1'] == {'counters': {'files': 1, 'rows': 1000, 'bytes': 2000},
+                                                       'timers': {'parse': 1., 'execute': 3.}}
+        assert collector.totals() == {'counters': {'files': 1, 'rows': 1200, 'bytes': 2000},
+                                      'timers': {'parse': 1.5, 'execute': 3.}}
+
+    def test_eta(self):
+        collector = self.get_collector()
+        collector.start_time, collector.end_time = 100., 110.
+        assert collector.eta({'bytes': 1000}) == 30
+        assert collector.eta({}) is None
+
+        collector.total_bytes = None
+        assert collector.eta({'files': 1}) == 10
+
+    def test_summary(self):
+        collector = self.get_collector()
+        collector.start_time, collector.end_time = 100., 110.
+        summary = collector.summary()
+        assert summary['elapsed'] == 10
+        assert summary['counters'] == {'files': 1, 'rows': 1200, 'bytes': 2000}
+        assert summary['rows_per_sec'] == 120
+        assert summary['mb_per_sec'] == 0.0002
+        assert summary['workers']['ImportWorker 2']['rows_per_sec'] == 20
+
+    def test_progress(self, caplog):
+        caplog.set_level(logging.INFO)
+        collector = self.get_collector()
+        with collector:
+            collector.progress()
+        messages = [record.getMessage() for record in caplog.records if record.getMessage().startswith('progress')]
+        assert len(messages) == 1
+        assert messages[0].startswith('progress - load : 1/2 files, 1200 rows, ')
+
+    def test_write_stats_file(self, tmpdir):
+        collector = self.get_collector()
+        with collector:
+            pass
+        stats_file = str(tmpdir.join('stats.json'))
+        metrics.write_stats_file(stats_file, [collector, metrics.MetricsCollector('skipped')])
+
+        with open(stats_file) as stats_fd:
+            stats = json.load(stats_fd)
+        assert list(stats) == ['load']
+        assert stats['load']['counters']['rows'] == 1200
@@ -0,0 +1,223 @@
+import os
+import fractions
+
+import numpy
+import pytest
+
+import gmalthgtparser as hgt
+
+import gmaltcli.reader as reader
+
+
+@pytest.fixture
+def hgt_path():
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'import', 'N00E001.hgt')
+
+
+@pytest.fixture
+def void_hgt_path(tmpdir):
+    values = numpy.arange(25, dtype='>i2').reshape((5, 5))
+    values[0, 1] = values[3, 4] = reader.HgtBlockReader.VOID_VALUE
+    hgt_file = tmpdir.join('S01W002.hgt')
+    hgt_file.write(values.tobytes(), mode='wb')
+    return str(hgt_file)
+
+
+def test_exact_axis():
+    start = fractions.Fraction(1, 3)
+    step = fractions.Fraction(-1, 1200)
+    axis = reader.exact_axis(start, step, 1201)
+    assert axis.dtype == numpy.float64
+    assert axis.tolist() == [float(start + i * step) for i in range(1201)]
+
+
+def test_downsample():
+    void = reader.HgtBlockReader.VOID_VALUE
+    values = numpy.array([[1, 3, 10, void, 7],
+                          [2, void, void, void, 8],
+                          [4, 4, 5, 5, 9]], dtype='>i2')
+    overview = reader.downsample(values, 2, void)
+    assert overview.dtype == numpy.dtype('>i2')
+    # averages without the void values, the last line and column are averaged on the remaining values
+    assert overview.tolist() == [[2, 10, 8], [4, 5, 9]]
+    assert reader.downsample(values, 4, void).tolist() == [[4, 8]]
+    assert reader.downsample(values, 2, void, 'min').tolist() == [[1, 10, 7], [4, 5, 9]]
+    assert reader.downsample(values, 2, void, 'max').tolist() == [[3, 10, 8], [4, 5, 9]]
+    with pytest.raises(ValueError):
+        reader.downsample(values, 2, void, 'median')
+
+
+def test_resampled_hgt_parser(void_hgt_path):
+    parser = reader.ResampledHgtParser(void_hgt_path, 2)
+    assert (parser.sample_lat, parser.sample_lng) == (3, 3)
+    assert parser.source_shape == (5, 5)
+    assert (parser.square_width, parser.square_height) == (fractions.Fraction(1, 2), fractions.Fraction(1, 2))
+    assert parser.top_left_square[1] == hgt.HgtParser(void_hgt_path).top_left_square[1]
+    assert parser.nb_values == 9
+
+
+class TestHgtBlockReader(object):
+    def test_context_manager(self, hgt_path):
+        block_reader = reader.HgtBlockReader(hgt_path)
+        assert block_reader.values is None
+        with block_reader:
+            assert block_reader.values.shape == (50, 50)
+            assert block_reader.nb_values == 2500
+        assert block_reader.values is None
+
+    def test_get_block_iterator_same_as_value_iterator(self, hgt_path):
+        expected = []
+        with hgt.HgtParser(hgt_path) as parser:
+            for line, col, idx, corners, value in parser.get_value_iterator():
+                expected.append((min([corner[0] for corner in corners]), min([corner[1] for corner in corners]),
+                                 max([corner[0] for corner in corners]), max([corner[1] for corner in corners]),
+                                 value))
+
+        rows = []
+        with reader.HgtBlockReader(hgt_path) as block_reader:
+            blocks = list(block_reader.get_block_iterator(20))
+        for block in blocks:
+            rows.extend(zip(block.lat_min.tolist(), block.lng_min.tolist(), block.lat_max.tolist(),
+                            block.lng_max.tolist(), block.value.tolist()))
+
+        assert [(block.line, block.nb_lines) for block in blocks] == [(0, 20), (20, 20), (40, 10)]
+        assert rows == expected
+
+    def test_get_block_iterator_void_values(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            blocks = list(block_reader.get_block_iterator(2))
+
+        assert [block.value.tolist() for block in blocks] == [
+            [0, 2, 3, 4, 5, 6, 7, 8, 9],
+            [10, 11, 12, 13, 14, 15, 16, 17, 18],
+            [20, 21, 22, 23, 24]
+        ]
+        assert blocks[0].lat_max[0] == 0.125
+        assert blocks[0].lng_min[0] == -2.125
+        assert blocks[2].lat_min[0] == -1.125
+        assert [block.nb_values for block in blocks] == [9, 9, 5]
+
+    def test_get_block_bounds(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            assert block_reader.get_block_bounds(0, 2) == (-0.375, -2.125, 0.125, -0.875)
+            assert block_reader.get_block_bounds(4, 1) == (-1.125, -2.125, -0.875, -0.875)
+            blocks = list(block_reader.get_block_iterator(2))
+
+        # the squares of a block are inside its bounds
+        assert blocks[1].lat_min.min() == -0.875 and blocks[1].lat_max.max() == -0.375
+
+    def test_get_elevations(self, void_hgt_path):
+        lats, lngs = numpy.array([0.1, -0.5, -0.95, 0.2]), numpy.array([-1.8, -1.5, -1.1, -1.5])
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            assert block_reader.is_inside(lats, lngs).tolist() == [True, True, True, False]
+            lines, cols, values = block_reader.get_elevations(lats[:3], lngs[:3])
+            with pytest.raises(IndexError):
+                block_reader.get_elevations(lats[3:], lngs[3:])
+
+        assert lines.tolist() == [0, 2, 4]
+        assert cols.tolist() == [1, 2, 4]
+        assert values.tolist() == [reader.HgtBlockReader.VOID_VALUE, 12, 24]
+
+    def test_get_block_hash(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            hashes = [block_reader.get_block_hash(line, 2) for line in (0, 2, 4)]
+            assert block_reader.get_block_hash(0, 2) == hashes[0]
+
+        values = numpy.arange(25, dtype='>i2').reshape((5, 5))
+        values[0, 1] = values[3, 4] = reader.HgtBlockReader.VOID_VALUE
+        values[3, 0] = 100
+        with open(void_hgt_path, 'wb') as hgt_file:
+            hgt_file.write(values.tobytes())
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            changed = [block_reader.get_block_hash(line, 2) for line in (0, 2, 4)]
+        # only the block of the modified value has a different checksum
+        assert [changed[i] == hashes[i] for i in range(3)] == [True, False, True]
+
+    def test_get_runs(self):
+        lines, cols, end_cols = reader.HgtBlockReader.get_runs(numpy.array([[1, 1, 2, 2, 2], [3, 1, 1, 1, 1]]))
+        # the first and the last columns are single value runs
+        assert lines.tolist() == [0, 0, 0, 0, 1, 1, 1]
+        assert cols.tolist() == [0, 1, 2, 4, 0, 1, 4]
+        assert end_cols.tolist() == [0, 1, 3, 4, 0, 3, 4]
+
+    def test_get_block_iterator_merge_runs(self, tmpdir):
+        values = numpy.array([[7, 7, 7, 8, 8],
+                              [7, 7, 7, 7, 7],
+                              [-32768, -32768, 9, 9, -32768],
+                              [1, 2, 3, 4, 5],
+                              [6, 6, 6, 6, 6]], dtype='>i2')
+        hgt_file = tmpdir.join('S01W002.hgt')
+        hgt_file.write(values.tobytes(), mode='wb')
+
+        with reader.HgtBlockReader(str(hgt_file)) as block_reader:
+            blocks = list(block_reader.get_block_iterator(3, merge_runs=True))
+
+        assert [(block.nb_values, len(block.value)) for block in blocks] == [(12, 8), (10, 8)]
+        assert blocks[0].value.tolist() == [7, 7, 8, 8, 7, 7, 7, 9]
+        assert blocks[0].lng_min.tolist() == [-2.125, -1.875, -1.375, -1.125, -2.125, -1.875, -1.125, -1.625]
+        assert blocks[0].lng_max.tolist() == [-1.875, -1.375, -1.125, -0.875, -1.875, -1.125, -0.875, -1.125]
+        assert blocks[0].lat_max.tolist() == [0.125] * 4 + [-0.125] * 3 + [-0.375]
+        assert blocks[1].value.tolist() == [1, 2, 3, 4, 5, 6, 6, 6]
+        assert (blocks[1].lng_min[-2], blocks[1].lng_max[-2]) == (-1.875, -1.125)
+
+    def test_get_block_iterator_merge_runs_adjacent_files(self, tmpdir):
+        values = numpy.full((5, 5), 7, dtype='>i2')
+        rows = set()
+        for name in ('N00E010.hgt', 'N00E011.hgt'):
+            tmpdir.join(name).write(values.tobytes(), mode='wb')
+            with reader.HgtBlockReader(str(tmpdir.join(name))) as block_reader:
+                for block in block_reader.get_block_iterator(5, merge_runs=True):
+                    rows.update(zip(block.lat_min.tolist(), block.lng_min.tolist(), block.lat_max.tolist(),
+                                    block.lng_max.tolist()))
+
+        # the column shared by both files is imported once : a point of this column is in a single distinct row
+        for lng in (10.9, 11.0, 11.1):
+            assert len([row for row in rows if row[0] <= 0.5 <= row[2] and row[1] <= lng <= row[3]]) == 1
+        assert (0.375, 10.875, 0.625, 11.125) in rows
+
+    def test_get_sample_iterator_same_as_parser(self, hgt_path):
+        with hgt.HgtParser(hgt_path) as parser:
+            expected = list(parser.get_sample_iterator(20, 30))
+
+        with reader.HgtBlockReader(hgt_path) as block_reader:
+            elev_iter = block_reader.get_sample_iterator(20, 30)
+            assert elev_iter.nb_values == 6
+            samples = [sample[:4] + (sample[4].tolist(),) for sample in elev_iter]
+
+        assert samples == expected
+
+    def test_get_overview_iterator(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path) as block_reader:
+            samples = [(lat, lng, values.tolist()) for lat, lng, values in block_reader.get_overview_iterator(2, 2, 2)]
+
+        assert samples == [
+            (0.125, -2.125, [[4, 5], [13, 15]]),
+            (0.125, -1.125, [[6], [14]]),
+            (-0.875, -2.125, [[20, 22]]),
+            (-0.875, -1.125, [[24]])
+        ]
+
+    def test_get_block_iterator_resample(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path, resample=(2, 'mean')) as block_reader:
+            assert block_reader.values.shape == (3, 3)
+            assert block_reader.nb_values == 9
+            blocks = list(block_reader.get_block_iterator(3))
+
+        assert blocks[0].value.tolist() == [4, 5, 6, 13, 15, 14, 20, 22, 24]
+        assert (blocks[0].lat_max[0], blocks[0].lat_min[0]) == (0.125, -0.375)
+        assert (blocks[0].lng_min[0], blocks[0].lng_max[0]) == (-2.125, -1.625)
+        assert blocks[0].lng_max[-1] == -0.625
+
+    def test_get_sample_iterator_resample(self, void_hgt_path):
+        with reader.HgtBlockReader(void_hgt_path, resample=(2, 'max')) as block_reader:
+            samples = list(block_reader.get_sample_iterator(3, 3))
+
+        assert len(samples) == 1
+        assert samples[0][3][1] == (0.125, -2.125)
+        assert samples[0][3][3] == (-1.375, -0.625)
+        assert samples[0][4].tolist() == [[6, 8, 9], [16, 18, 14], [21, 23, 24]]
+
+    def test_no_resample(self, void_hgt_path):
+        block_reader = reader.HgtBlockReader(void_hgt_path, resample=(1, 'mean'))
+        assert block_reader.resample is None
+        assert not isinstance(block_reader.parser, reader.ResampledHgtParser)
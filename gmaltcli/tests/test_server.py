@@ -0,0 +1,150 @@
+import json
+import socket
+import threading
+
+try:
+    # Python 3
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError
+except ImportError:
+    # Python 2
+    from urllib2 import urlopen, Request, HTTPError
+
+import numpy
+import pytest
+
+import gmaltcli.reader as reader
+import gmaltcli.server as server
+
+
+@pytest.fixture
+def hgt_folder(tmpdir):
+    # the elevation is 40 * lat + 20 * (lng - 10)
+    lines, cols = numpy.mgrid[0:5, 0:5]
+    values = (40 - 10 * lines + 5 * cols).astype('>i2')
+    values[1, 1] = reader.HgtBlockReader.VOID_VALUE
+    tmpdir.join('N00E010.hgt').write(values.tobytes(), mode='wb')
+    return str(tmpdir)
+
+
+@pytest.fixture
+def service(hgt_folder):
+    service = server.ElevationService(hgt_folder)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def base_url(service):
+    http_server = server.create_server(service, port=0)
+    thread = threading.Thread(target=http_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(http_server.server_port)
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def test_latency_histogram():
+    histogram = server.LatencyHistogram()
+    assert histogram.to_dict()['p99_ms'] == 0.
+    for seconds in [0.000005] * 90 + [0.0003] * 9 + [5.]:
+        histogram.add(seconds)
+
+    summary = histogram.to_dict()
+    assert summary['count'] == 100
+    assert summary['max_ms'] == 5000.
+    assert summary['p50_ms'] == pytest.approx(0.01)
+    assert summary['p99_ms'] == pytest.approx(0.32)
+    assert histogram.percentile(1) == 5.
+    assert summary['buckets'] == [{'le_ms': pytest.approx(0.01), 'count': 90},
+                                  {'le_ms': pytest.approx(0.32), 'count': 9}, {'le_ms': None, 'count': 1}]
+
+
+def test_to_json_values():
+    values = numpy.array([57., numpy.nan, 31.666666])
+    assert server.to_json_values(values, 'nearest') == [57, None, 31]
+    assert server.to_json_values(values, 'bilinear') == [57., None, 31.67]
+
+
+def test_elevation_service(service):
+    values = service.lookup(numpy.array([0.5, 5.5, 0.75]), numpy.array([10.1, 10.5, 10.25]), 'bilinear')
+    assert values[0] == pytest.approx(22)
+    assert numpy.isnan(values[1:]).all()
+    assert service.lookup(numpy.array([0.6]), numpy.array([10.9])).tolist() == [40.]
+
+    with pytest.raises(ValueError):
+        service.lookup(numpy.array([0.6]), numpy.array([10.9]), 'linear')
+
+    stats = service.stats()
+    assert stats['tiles'] == 1
+    assert stats['points'] == 4
+    assert stats['cache']['misses'] == 1
+    assert sorted(stats['latency']) == ['elevation', 'elevations']
+
+
+def test_server_elevation(base_url):
+    response = json.loads(urlopen(base_url + '/elevation?lat=0.6&lng=10.9').read().decode('utf-8'))
+    assert response == {'lat': 0.6, 'lng': 10.9, 'elevation': 40}
+
+    response = json.loads(urlopen(base_url + '/elevation?lat=0.5&lng=10.1&interpolate=bilinear').read().decode('utf-8'))
+    assert response['elevation'] == 22.0
+
+    response = json.loads(urlopen(base_url + '/elevation?lat=5.5&lng=10.5').read().decode('utf-8'))
+    assert response['elevation'] is None
+
+    with pytest.raises(HTTPError) as e:
+        urlopen(base_url + '/elevation?lat=0.5')
+    assert e.value.code == 400
+
+    with pytest.raises(HTTPError) as e:
+        urlopen(base_url + '/unknown')
+    assert e.value.code == 404
+
+
+def test_server_elevations(base_url):
+    request = Request(base_url + '/elevations', json.dumps({'points': [[0.6, 10.9], [5.5, 10.5]]}).encode('utf-8'),
+                      {'Content-Type': 'application/json'})
+    assert json.loads(urlopen(request).read().decode('utf-8')) == {'elevations': [40, None]}
+
+    points = numpy.array([[0.5, 10.1], [0.75, 10.25]], dtype='<f8')
+    request = Request(base_url + '/elevations?interpolate=bilinear', points.tobytes(),
+                      {'Content-Type': server.BINARY_CONTENT_TYPE})
+    values = numpy.frombuffer(urlopen(request).read(), dtype='<f4')
+    assert values[0] == pytest.approx(22)
+    assert numpy.isnan(values[1])
+
+    request = Request(base_url + '/elevations', b'{"points": [[1]]', {'Content-Type': 'application/json'})
+    with pytest.raises(HTTPError) as e:
+        urlopen(request)
+    assert e.value.code == 400
+
+    stats = json.loads(urlopen(base_url + '/stats').read().decode('utf-8'))
+    assert stats['points'] == 4
+    assert stats['latency']['elevations']['count'] == 3
+    assert stats['cache']['hits'] == 1
+
+
+def test_server_unix_socket(service, tmpdir):
+    socket_path = str(tmpdir.join('gmalt.sock'))
+    unix_server = server.create_server(service, socket_path=socket_path)
+    thread = threading.Thread(target=unix_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+        client.sendall(b'GET /elevation?lat=0.6&lng=10.9 HTTP/1.0\r\n\r\n')
+        response = b''
+        while True:
+            data = client.recv(4096)
+            if not data:
+                break
+            response += data
+        client.close()
+    finally:
+        unix_server.shutdown()
+        unix_server.server_close()
+
+    assert response.startswith(b'HTTP/1.1 200')
+    assert json.loads(response.split(b'\r\n\r\n', 1)[1].decode('utf-8'))['elevation'] == 40
@@ -1,4 +1,6 @@
 import os
+import argparse
+import hashlib
 import pytest
 
 try:
@@ -50,6 +52,14 @@ class TestLoadDatasetAction(object):
         assert len(namespace.dataset_files) == 3
 
 
+def test_overview_factors():
+    assert tools.overview_factors('8,2,4,2') == (2, 4, 8)
+    with pytest.raises(argparse.ArgumentTypeError):
+        tools.overview_factors('2,a')
+    with pytest.raises(argparse.ArgumentTypeError):
+        tools.overview_factors('1,2')
+
+
 def test_download_hgt_zip_files(monkeypatch):
     mock_worker = mock.Mock()
     monkeypatch.setattr(worker, 'WorkerPool', mock_worker)
@@ -82,3 +92,108 @@ def test_extract_hgt_zip_files(monkeypatch, custom_zip_path):
         mock.call().fill([os.path.join(custom_zip_path, 'file1.zip')]),
         mock.call().start()
     ])
+
+
+def test_import_hgt_zip_files_skip_imported_files(monkeypatch, tmpdir):
+    done_file = tmpdir.join('N00E001.hgt')
+    done_file.write(b'\x00\x01', mode='wb')
+    modified_file = tmpdir.join('N00E002.hgt')
+    modified_file.write(b'\x00\x01', mode='wb')
+    new_file = tmpdir.join('N00E003.hgt')
+    new_file.write(b'\x00\x01', mode='wb')
+
+    mock_factory = mock.MagicMock()
+    manager = mock_factory.get_manager.return_value.__enter__.return_value
+    manager.get_done_tiles.return_value = {
+        'N00E001.hgt': (2, os.stat(str(done_file)).st_mtime),
+        'N00E002.hgt': (2, os.stat(str(modified_file)).st_mtime - 10),
+    }
+    mock_worker = mock.Mock()
+    monkeypatch.setattr(worker, 'WorkerPool', mock_worker)
+
+    tools.import_hgt_zip_files(str(tmpdir), 2, mock_factory, False, (None, None))
+    mock_factory.get_manager.assert_called_once_with(False)
+    assert sorted(mock_worker.return_value.fill.call_args[0][0]) == [str(modified_file), str(new_file)]
+
+    # Without resume, the ledger is not read
+    tools.import_hgt_zip_files(str(tmpdir), 2, mock_factory, False, (None, None), resume=False)
+    assert mock_factory.get_manager.call_count == 1
+    assert len(mock_worker.return_value.fill.call_args[0][0]) == 3
+
+
+def test_import_hgt_zip_files_incremental(monkeypatch, tmpdir):
+    unchanged_file = tmpdir.join('N00E001.hgt')
+    unchanged_file.write(b'\x00\x01', mode='wb')
+    changed_file = tmpdir.join('N00E002.hgt')
+    changed_file.write(b'\x00\x02', mode='wb')
+
+    mock_factory = mock.MagicMock()
+    manager = mock_factory.get_manager.return_value.__enter__.return_value
+    manager.get_done_hashes.return_value = {
+        'N00E001.hgt': hashlib.md5(b'\x00\x01').hexdigest(),
+        'N00E002.hgt': hashlib.md5(b'\x00\x01').hexdigest(),
+    }
+    mock_worker = mock.Mock()
+    monkeypatch.setattr(worker, 'WorkerPool', mock_worker)
+
+    tools.import_hgt_zip_files(str(tmpdir), 2, mock_factory, False, (None, None), incremental=True)
+    assert mock_worker.return_value.fill.call_args[0][0] == [str(changed_file)]
+    assert not manager.get_done_tiles.called
+    assert mock_worker.call_args[0][-1] is True
+
+
+def test_check_for_raster2pgsql(monkeypatch):
+    monkeypatch.setattr(tools, 'which', lambda program: False)
+    assert tools.check_for_raster2pgsql('/tmp/hgt', 'elevation', (None, None)) is False
+
+    logs = []
+    monkeypatch.setattr(tools, 'which', lambda program: program == 'raster2pgsql')
+    monkeypatch.setattr(tools.logging, 'info', logs.append)
+    assert tools.check_for_raster2pgsql('/tmp/hgt', 'elevation', (50, 50)) is True
+    assert '    raster2pgsql -s 4326 -I -C -M -t 50x50 /tmp/hgt/*.hgt elevation | psql <connection options>' in logs
+
+
+def test_tune_raster_sample(monkeypatch, tmpdir):
+    for name in ('N00E001.hgt', 'N00E002.hgt', 'N00E003.hgt', 'N00E004.hgt'):
+        tmpdir.join(name).write(b'\x00\x01' * 2500, mode='wb')
+
+    measures = {
+        None: {'load_time': 1., 'total_size': 100, 'latency': 0.010},
+        50: {'load_time': 2., 'total_size': 150, 'latency': 0.001},
+        100: {'load_time': 1., 'total_size': 110, 'latency': 0.002},
+    }
+    benchmarked = []
+
+    def benchmark_raster_sample(hgt_files, factory, concurrency, size, points):
+        benchmarked.append((hgt_files, factory, size, points))
+        return dict(measures[size], sample=size, rows=10, mb_per_sec=1., table_size=measures[size]['total_size'],
+                    index_size=0)
+    monkeypatch.setattr(tools, 'benchmark_raster_sample', benchmark_raster_sample)
+
+    mock_factory = mock.MagicMock()
+    mock_factory.table_name = 'elevation'
+    results = tools.tune_raster_sample(str(tmpdir), mock_factory, 2, candidates=(None, 50, 100), nb_files=2,
+                                       nb_queries=10)
+
+    mock_factory.with_table.assert_called_once_with('elevation_tune')
+    assert [size for _, _, size, _ in benchmarked] == [None, 50, 100]
+    assert [os.path.basename(filepath) for filepath in benchmarked[0][0]] == ['N00E001.hgt', 'N00E003.hgt']
+    # the same points are queried for each candidate
+    assert len(benchmarked[0][3]) == 10 and benchmarked[0][3] == benchmarked[2][3]
+    assert [result['sample'] for result in results] == [100, 50, None]
+    assert results[0]['score'] == pytest.approx(1. + 1.1 + 2.)
+
+
+def test_tune_raster_sample_no_file(tmpdir):
+    with pytest.raises(ValueError):
+        tools.tune_raster_sample(str(tmpdir), mock.MagicMock(), 1)
+
+
+def test_random_point():
+    hgt_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'import', 'N00E001.hgt')
+    randomizer = mock.Mock()
+    randomizer.random.side_effect = [0., 0.5]
+    lat, lng = tools.random_point(randomizer, hgt_file)
+    # 50x50 values, the centers of the corner squares are on the degree lines
+    assert lat == pytest.approx(1 + 1 / 98.)
+    assert lng == pytest.approx(1 - 1 / 98. + 0.5 * 50 / 49.)
@@ -2,6 +2,7 @@ import os
 import logging
 import zipfile
 import time
+import sqlite3
 import threading
 
 import pytest
@@ -16,6 +17,8 @@ except ImportError:
     import Queue as queue
 
 import gmaltcli.worker as worker
+import gmaltcli.database as database
+import gmaltcli.export as export
 
 
 class TestSafeCounter(object):
@@ -79,6 +82,49 @@ class ErrorWorker(FalseWorker):
             super(ErrorWorker, self).process(queue_item, counter_info)
 
 
+class FileWorker(worker.Worker):
+    """ Picklable worker creating a file named as the queue item in `folder` """
+    def __init__(self, id_, queue_obj, counter, stop_event, folder):
+        super(FileWorker, self).__init__(id_, queue_obj, counter, stop_event)
+        self.folder = folder
+
+    def process(self, queue_item, counter_info):
+        if queue_item == 'item80':
+            raise Exception('Exception on 80th item')
+        with open(os.path.join(self.folder, queue_item), 'w') as fp:
+            fp.write(str(os.getpid()))
+
+
+class TestProcessSafeCounter(object):
+    def test_increment(self):
+        counter = worker.ProcessSafeCounter(start=10, incr=5)
+        counter.max = 100
+
+        assert counter.increment() == (15, 100)
+        assert counter.increment() == (20, 100)
+        assert counter.get() == 20
+        assert str(counter) == '20/100'
+
+
+class TestProcessWorkerPool(object):
+    def test_start(self, tmpdir):
+        pool = worker.ProcessWorkerPool(FileWorker, 3, str(tmpdir))
+        assert len(pool.workers) == 3
+        pool.fill(['item' + str(item) for item in range(1, 50)])
+        pool.start()
+
+        assert sorted(os.listdir(str(tmpdir))) == sorted(['item' + str(item) for item in range(1, 50)])
+        assert len(set([tmpdir.join(filename).read() for filename in os.listdir(str(tmpdir))])) > 1
+        assert pool.counter.get() == 49
+        assert pool.metrics.totals()['counters'] == {'files': 49}
+
+    def test_start_and_error(self, tmpdir):
+        pool = worker.ProcessWorkerPool(FileWorker, 3, str(tmpdir))
+        pool.fill(['item' + str(item) for item in range(1, 100)])
+        with pytest.raises(worker.WorkerPoolException):
+            pool.start()
+
+
 class TestWorkerPool(object):
     def setup_method(self, func_method):
         self.processed = {}
@@ -100,6 +146,9 @@ class TestWorkerPool(object):
         assert len(self.processed[1] + self.processed[2] + self.processed[3] +
                    self.processed[4] + self.processed[5]) == 99
         assert all([len(self.processed[key]) > 10 for key in self.processed])
+        assert self.pool.metrics.total_files == 99
+        assert self.pool.metrics.totals()['counters'] == {'files': 99}
+        assert sorted(self.pool.metrics.workers) == ['FalseWorker {}'.format(i) for i in range(1, 6)]
 
     def test_start_and_error(self):
         pool = worker.WorkerPool(ErrorWorker, 5, {}, sleep=0.1)
@@ -281,3 +330,192 @@ class TestExtractWorker(object):
         extracted_file = os.path.join(tmp_folder, 'N00E010.hgt')
         assert os.path.exists(extracted_file)
         assert os.path.getsize(extracted_file) == 2884802
+
+
+class TestImportWorker(object):
+    def setup_method(self, func_method):
+        self.blocks = []
+        self.used_raster = []
+        self.ledger = []
+
+        class MockManager(object):
+            def __enter__(manager):
+                return manager
+
+            def __exit__(manager, exc_type, exc_val, exc_tb):
+                pass
+
+            def insert_block(manager, block):
+                self.blocks.append(block)
+
+            def start_tile(manager, tile):
+                self.ledger.append(('start', tile))
+
+            def end_tile(manager, tile):
+                self.ledger.append(('end', tile))
+
+            def rollback_tile(manager):
+                self.ledger.append(('rollback', None))
+
+        class MockFactory(object):
+            def get_manager(factory, use_raster):
+                self.used_raster.append(use_raster)
+                return MockManager()
+
+        self.import_worker = worker.ImportWorker(1, queue.Queue(), worker.SafeCounter(), threading.Event(),
+                                                 None, MockFactory(), False, (None, None))
+
+    def test__import_file_by_blocks(self):
+        hgt_file = os.path.realpath(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'))
+        self.import_worker.BLOCK_LINES = 20
+
+        self.import_worker._import_file(hgt_file)
+
+        assert self.used_raster == [False]
+        assert [(block.line, block.nb_lines) for block in self.blocks] == [(0, 20), (20, 20), (40, 10)]
+        assert sum([len(block.value) for block in self.blocks]) == 2500
+        tile = worker.get_tile_info(hgt_file, checksum=True)
+        assert self.ledger == [('start', tile), ('end', tile)]
+
+    def test__import_file_merge_runs(self):
+        hgt_file = os.path.realpath(os.path.join(os.path.dirname(__file__), 'srtm3', 'N00E010.hgt'))
+        self.import_worker.merge_runs = True
+
+        self.import_worker._import_file(hgt_file)
+
+        assert sum([block.nb_values for block in self.blocks]) == 1442323
+        assert sum([len(block.value) for block in self.blocks]) == 1380048
+
+    def test__import_file_stop_event(self):
+        hgt_file = os.path.realpath(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'))
+        self.import_worker.stop_event.set()
+
+        self.import_worker._import_file(hgt_file)
+
+        assert self.blocks == []
+        assert [action for action, tile in self.ledger] == ['start', 'rollback']
+
+
+def test_get_tile_info(tmpdir):
+    hgt_file = tmpdir.join('N00E001.hgt')
+    hgt_file.write(b'\x00\x01\x00\x02', mode='wb')
+    os.utime(str(hgt_file), (1500000000.5, 1500000000.5))
+
+    assert worker.get_tile_info(str(hgt_file)) == {'tile': 'N00E001.hgt', 'size': 4, 'mtime': 1500000000.5,
+                                                   'hash': None}
+    assert worker.get_tile_info(str(hgt_file), checksum=True)['hash'] == '7879d0a53b1a7603bd1056e269ed2d69'
+
+
+class TestExportWorker(object):
+    def setup_method(self, func_method):
+        self.hgt_file = os.path.realpath(os.path.join(os.path.dirname(__file__), 'import', 'N00E001.hgt'))
+
+    def get_worker(self, output_dir, stop_event=None, overwrite=False):
+        return worker.ExportWorker(1, queue.Queue(), worker.SafeCounter(), stop_event or threading.Event(),
+                                   None, str(output_dir), export.CsvExporter, (None, None), overwrite=overwrite)
+
+    def test__export_file(self, tmpdir):
+        self.get_worker(tmpdir)._export_file(self.hgt_file)
+        assert os.listdir(str(tmpdir)) == ['N00E001.csv']
+        assert len(tmpdir.join('N00E001.csv').readlines()) == 2501
+
+    def test__export_file_skip_existing(self, tmpdir):
+        tmpdir.join('N00E001.csv').write('existing')
+        self.get_worker(tmpdir)._export_file(self.hgt_file)
+        assert tmpdir.join('N00E001.csv').read() == 'existing'
+
+        self.get_worker(tmpdir, overwrite=True)._export_file(self.hgt_file)
+        assert len(tmpdir.join('N00E001.csv').readlines()) == 2501
+
+    def test__export_file_stop_event(self, tmpdir):
+        stop_event = threading.Event()
+        stop_event.set()
+        self.get_worker(tmpdir, stop_event=stop_event)._export_file(self.hgt_file)
+        assert os.listdir(str(tmpdir)) == []
+
+
+class TestStageStats(object):
+    def test_add(self):
+        stats = worker.StageStats('write')
+        assert str(stats) == 'write : 0 workers, 0 items, busy 0%, waiting 0%'
+
+        stats.add(10, 3., 1.)
+        stats.add(5, 3., 3.)
+        assert (stats.nb_workers, stats.nb_items) == (2, 15)
+        assert stats.utilization == 0.6
+        assert str(stats) == 'write : 2 workers, 15 items, busy 60%, waiting 40%'
+
+
+class TestTileTracker(object):
+    def test_tile_done_after_batches(self):
+        tracker = worker.TileTracker()
+        tile = {'tile': 'N00E001.hgt'}
+        assert tracker.batch_done('N00E001.hgt') is None
+        assert tracker.batch_done('N00E001.hgt') is None
+        assert tracker.tile_done(tile, 2, 2500) == (tile, 2500)
+        assert tracker.committed == {} and tracker.expected == {}
+
+    def test_batches_after_tile_done(self):
+        tracker = worker.TileTracker()
+        tile = {'tile': 'N00E001.hgt'}
+        assert tracker.batch_done('N00E001.hgt') is None
+        assert tracker.tile_done(tile, 2, 2500) is None
+        assert tracker.batch_done('N02E010.hgt') is None
+        assert tracker.batch_done('N00E001.hgt') == (tile, 2500)
+        assert tracker.committed == {'N02E010.hgt': 1}
+
+    def test_tile_without_batch(self):
+        tracker = worker.TileTracker()
+        tile = {'tile': 'N00E001.hgt'}
+        assert tracker.tile_done(tile, 0, 0) == (tile, 0)
+
+
+class TestImportPipeline(object):
+    def setup_method(self, func_method):
+        self.folder = os.path.realpath(os.path.join(os.path.dirname(__file__), 'import'))
+        self.hgt_files = [os.path.join(self.folder, filename) for filename in ('N00E001.hgt', 'N02E010.hgt')]
+
+    def get_factory(self, tmpdir):
+        factory = database.ManagerFactory('sqlite', 'elevation', database=str(tmpdir.join('elevation.sqlite')),
+                                          batch_size=300)
+        with factory.get_manager() as manager:
+            manager.prepare_environment()
+        return factory
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_start(self, tmpdir, executor):
+        factory = self.get_factory(tmpdir)
+        pipeline = worker.ImportPipeline(2, 2, executor, self.folder, factory, False, (None, None))
+        pipeline.fill(self.hgt_files)
+        stats = pipeline.start()
+
+        assert stats['parse'].nb_workers == 2
+        assert stats['parse'].nb_items == 2
+        assert stats['write'].nb_workers == 2
+        assert 'WriteWorker 1' in pipeline.metrics.workers
+        assert pipeline.metrics.extra['stages']['parse']['items'] == 2
+        connection = sqlite3.connect(str(tmpdir.join('elevation.sqlite')))
+        ledger = connection.execute('SELECT tile, status, nb_rows FROM elevation_ledger ORDER BY tile').fetchall()
+        assert [(tile, status) for tile, status, nb_rows in ledger] == [
+            ('N00E001.hgt', 'done'), ('N02E010.hgt', 'done')]
+        assert ledger[0][2] == 2500
+        assert connection.execute('SELECT count(*) FROM elevation').fetchone() == (sum([row[2] for row in ledger]),)
+        # one batch per 300 rows of each file
+        assert stats['write'].nb_items == sum([(row[2] + 299) // 300 for row in ledger])
+        connection.close()
+
+    def test_start_and_write_error(self, tmpdir, monkeypatch):
+        factory = self.get_factory(tmpdir)
+        pipeline = worker.ImportPipeline(1, 1, 'thread', self.folder, factory, False, (None, None))
+        pipeline.fill(self.hgt_files)
+
+        def send_rows(manager, batch):
+            raise Exception('write failed')
+        monkeypatch.setattr(database.SqliteValueManager, 'send_rows', send_rows)
+
+        with pytest.raises(worker.WorkerPoolException):
+            pipeline.start()
+
+        connection = sqlite3.connect(str(tmpdir.join('elevation.sqlite')))
+        assert connection.execute("SELECT count(*) FROM elevation_ledger WHERE status = 'done'").fetchone() == (0,)
+        connection.close()
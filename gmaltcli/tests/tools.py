@@ -8,3 +8,98 @@ class MockCallable(object):
         self.called = True
         self.args = args
         self.kwargs = kwargs
+
+
+class MockTransaction(object):
+    def __init__(self):
+        self.committed = False
+        self.rolled_back = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class MockCursor(object):
+    def __init__(self):
+        self.copied = []
+        self.closed = False
+
+    def copy_expert(self, query, stream):
+        self.copied.append((query, stream.read()))
+
+    def close(self):
+        self.closed = True
+
+
+class MockResult(object):
+    def __init__(self, rows=None):
+        self.rows = rows
+        self.returns_rows = rows is not None
+
+    def fetchall(self):
+        return self.rows
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class MockConnection(object):
+    """ Record the queries executed on a sqlalchemy connection, the COPY done on its raw connection and the content
+    of the files read by a LOAD DATA LOCAL INFILE query """
+    def __init__(self, rows=None):
+        self.executed = []
+        self.loaded = []
+        self.transactions = []
+        self.rows = rows
+        self.cursor = MockCursor()
+        self.connection = type('raw_connection', (object,), {})()
+        self.connection.cursor = lambda: self.cursor
+
+    def begin(self):
+        self.transactions.append(MockTransaction())
+        return self.transactions[-1]
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        if params and 'path' in params:
+            with open(params['path'], 'rb') as stream:
+                self.loaded.append(stream.read())
+        return MockResult(self.rows)
+
+    def close(self):
+        pass
+
+
+class StagingMockConnection(MockConnection):
+    """ Same as :class:`MockConnection` but track the rows of the staging table : the rows copied or inserted in
+    it are added, a TRUNCATE removes them. The number of rows in the staging table at each merge is recorded in
+    `merged` """
+    def __init__(self, rows=None):
+        super(StagingMockConnection, self).__init__(rows)
+        self.staging = 0
+        self.merged = []
+        copy_expert = self.cursor.copy_expert
+
+        def staging_copy_expert(query, stream):
+            copy_expert(query, stream)
+            if '_staging' in query:
+                self.staging += self.cursor.copied[-1][1].count(b'\n')
+        self.cursor.copy_expert = staging_copy_expert
+
+    def execute(self, query, params=None):
+        if query.startswith('TRUNCATE') and '_staging' in query:
+            self.staging = 0
+        elif query.startswith('INSERT INTO') and '_staging" (' in query:
+            self.staging += len([key for key in params if key.startswith('rast_')])
+        elif query.startswith('INSERT INTO') and '_staging' in query:
+            self.merged.append(self.staging)
+        return super(StagingMockConnection, self).execute(query, params)
@@ -3,9 +3,14 @@ import argparse
 import os
 import json
 import glob
+import time
+import random
 import logging
 
+import gmalthgtparser as hgt
+
 import gmaltcli.worker as worker
+import gmaltcli.metrics as metrics
 
 
 def dataset_file(dataset):
@@ -34,6 +39,24 @@ def existing_folder(folder_path):
     return fullpath
 
 
+def overview_factors(value):
+    """ Parse the comma separated factors of the overviews (for example `2,4,8`)
+
+    :param str value: the factors
+    :return: the distinct factors sorted
+    :rtype: tuple
+    """
+    try:
+        factors = tuple(sorted(set(int(factor) for factor in value.split(','))))
+    except ValueError:
+        raise argparse.ArgumentTypeError('{} is not a comma separated list of integers'.format(value))
+
+    if factors[0] < 2:
+        raise argparse.ArgumentTypeError('overview factors must be greater than 1')
+
+    return factors
+
+
 def writable_folder(folder_path):
     fullpath = existing_folder(folder_path)
 
@@ -62,13 +85,15 @@ class LoadDatasetAction(argparse.Action):
         setattr(namespace, 'dataset_files', data)
 
 
-def download_hgt_zip_files(working_dir, data, concurrency, skip=False):
+def download_hgt_zip_files(working_dir, data, concurrency, skip=False, collector=None):
     """ Download the HGT zip files from remote server
 
     :param str working_dir: folder to put the downloaded files in
     :param dict data: dataset of SRTM data
     :param int concurrency: number of worker to start
     :param bool skip: if True skip this step
+    :param collector: the collector of the metrics of the workers (default : a new collector)
+    :type collector: :class:`gmaltcli.metrics.MetricsCollector`
     """
     if skip:
         logging.debug('Download skipped')
@@ -77,17 +102,21 @@ def download_hgt_zip_files(working_dir, data, concurrency, skip=False):
     logging.info('Nb of files to download : {}'.format(len(data)))
     logging.debug('Download start')
     download_task = worker.WorkerPool(worker.DownloadWorker, concurrency, working_dir)
+    download_task.metrics = collector or metrics.MetricsCollector('download')
     download_task.fill(data)
-    download_task.start()
+    with download_task.metrics:
+        download_task.start()
     logging.debug('Download end')
 
 
-def extract_hgt_zip_files(working_dir, concurrency, skip=False):
+def extract_hgt_zip_files(working_dir, concurrency, skip=False, collector=None):
     """ Extract the HGT zip files in working_dir
 
     :param str working_dir: folder where the zip files are
     :param int concurrency: number of worker to start
     :param bool skip: if True skip this step
+    :param collector: the collector of the metrics of the workers (default : a new collector)
+    :type collector: :class:`gmaltcli.metrics.MetricsCollector`
     """
     if skip:
         logging.debug('Extract skipped')
@@ -97,30 +126,272 @@ def extract_hgt_zip_files(working_dir, concurrency, skip=False):
     logging.info('Nb of files to extract : {}'.format(len(zip_files)))
     logging.debug('Extract start')
     extract_task = worker.WorkerPool(worker.ExtractWorker, concurrency, working_dir)
+    extract_task.metrics = get_collector(collector, 'extract', zip_files)
     extract_task.fill(zip_files)
-    extract_task.start()
+    with extract_task.metrics:
+        extract_task.start()
     logging.debug('Extract end')
 
 
-def import_hgt_zip_files(working_dir, concurrency, factory, use_raster, samples):
+def import_hgt_zip_files(working_dir, concurrency, factory, use_raster, samples, executor='thread', resume=True,
+                         merge_runs=False, writers=None, collector=None, resample=None, incremental=False):
     """ Import the extracted HGT files found in working_dir
 
+    .. note:: with `resume`, the files recorded as done in the ledger table with the same size and modification
+        time are skipped
+
+    .. note:: with `incremental`, the files recorded as done in the ledger table with the same md5 checksum are
+        skipped and only the changed blocks of lines of the other files are imported again (see
+        :class:`gmaltcli.worker.ImportWorker`)
+
     :param str working_dir: folder where the hgt files are
     :param int concurrency: number of worker to start
     :param factory: :class:`gmaltcli.database.Manager` factory
     :type factory: :class:`gmaltcli.database.ManagerFactory`
     :param bool use_raster: if True, the manager will import data as raster (in GIS extension in database)
     :param tuple samples: tuple with raster sampling on lng and lat
+    :param str executor: `thread` to import files in a pool of threads or `process` to import them in a pool
+        of processes
+    :param bool resume: if True, skip the files already imported
+    :param bool merge_runs: if True, the consecutive equal values of a line are imported as a single rectangle
+    :param int writers: if set, the files are imported by a :class:`gmaltcli.worker.ImportPipeline` : the
+        `concurrency` workers parse the files and `writers` threads send the batches to the database
+    :param collector: the collector of the metrics of the workers (default : a new collector)
+    :type collector: :class:`gmaltcli.metrics.MetricsCollector`
+    :param tuple resample: the downsampling factor and method of the values (see
+        :class:`gmaltcli.reader.HgtBlockReader`), None to import them at the resolution of the files
+    :param bool incremental: if True, only the changed files and blocks are imported (standard format without
+        `writers` only)
     """
     hgt_files = [os.path.realpath(filename) for filename in glob.glob(os.path.join(working_dir, "*.hgt"))]
+    if incremental:
+        hgt_files = skip_unchanged_files(hgt_files, factory, use_raster)
+    elif resume:
+        hgt_files = skip_imported_files(hgt_files, factory, use_raster)
     logging.info('Nb of files to import : {}'.format(len(hgt_files)))
     logging.debug('Import start')
-    import_task = worker.WorkerPool(worker.ImportWorker, concurrency, working_dir, factory, use_raster, samples)
+    if writers:
+        import_task = worker.ImportPipeline(concurrency, writers, executor, working_dir, factory, use_raster, samples,
+                                            merge_runs=merge_runs, resample=resample)
+    else:
+        pool_class = worker.ProcessWorkerPool if executor == 'process' else worker.WorkerPool
+        import_task = pool_class(worker.ImportWorker, concurrency, working_dir, factory, use_raster, samples,
+                                 merge_runs, resample, incremental)
+    import_task.metrics = get_collector(collector, 'load', hgt_files)
     import_task.fill(hgt_files)
-    import_task.start()
+    with import_task.metrics:
+        import_task.start()
     logging.debug('Import end')
 
 
+def export_hgt_files(working_dir, output_dir, concurrency, exporter_class, samples, executor='thread',
+                     overwrite=False, collector=None):
+    """ Export the extracted HGT files found in working_dir, one output file per HGT file
+
+    :param str working_dir: folder where the hgt files are
+    :param str output_dir: folder where the output files are written
+    :param int concurrency: number of worker to start
+    :param exporter_class: the exporter of the output format
+    :type exporter_class: :class:`gmaltcli.export.BaseExporter`
+    :param tuple samples: tuple with raster sampling on lng and lat
+    :param str executor: `thread` to export files in a pool of threads or `process` to export them in a pool
+        of processes
+    :param bool overwrite: if True, the existing output files are written again
+    :param collector: the collector of the metrics of the workers (default : a new collector)
+    :type collector: :class:`gmaltcli.metrics.MetricsCollector`
+    """
+    hgt_files = [os.path.realpath(filename) for filename in glob.glob(os.path.join(working_dir, "*.hgt"))]
+    logging.info('Nb of files to export : {}'.format(len(hgt_files)))
+    logging.debug('Export start')
+    pool_class = worker.ProcessWorkerPool if executor == 'process' else worker.WorkerPool
+    export_task = pool_class(worker.ExportWorker, concurrency, working_dir, output_dir, exporter_class, samples,
+                             overwrite)
+    export_task.metrics = get_collector(collector, 'export', hgt_files)
+    export_task.fill(hgt_files)
+    with export_task.metrics:
+        export_task.start()
+    logging.debug('Export end')
+
+
+def get_collector(collector, phase, filepaths):
+    """ Get the collector of the metrics of a phase processing local files
+
+    :param collector: the collector provided by the command or None to create a new one
+    :type collector: :class:`gmaltcli.metrics.MetricsCollector`
+    :param str phase: the name of the phase
+    :param list filepaths: the paths of the files to process
+    :return: the collector with the total size of the files to compute the ETA
+    :rtype: :class:`gmaltcli.metrics.MetricsCollector`
+    """
+    collector = collector or metrics.MetricsCollector(phase)
+    collector.total_bytes = sum([os.path.getsize(filepath) for filepath in filepaths])
+    return collector
+
+
+def skip_imported_files(hgt_files, factory, use_raster):
+    """ Remove the files recorded as done in the ledger table if they have not been modified since their import
+
+    :param list hgt_files: the paths of the HGT files to import
+    :param factory: :class:`gmaltcli.database.Manager` factory
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param bool use_raster: if True, the manager will import data as raster (in GIS extension in database)
+    :return: the paths of the HGT files which still need to be imported
+    :rtype: list
+    """
+    with factory.get_manager(use_raster) as manager:
+        done_tiles = manager.get_done_tiles()
+
+    remaining_files = []
+    for filepath in hgt_files:
+        tile = worker.get_tile_info(filepath)
+        if done_tiles.get(tile['tile']) != (tile['size'], tile['mtime']):
+            remaining_files.append(filepath)
+
+    logging.info('Nb of files already imported : {}'.format(len(hgt_files) - len(remaining_files)))
+    return remaining_files
+
+
+def skip_unchanged_files(hgt_files, factory, use_raster):
+    """ Remove the files recorded as done in the ledger table with the same md5 checksum
+
+    :param list hgt_files: the paths of the HGT files to import
+    :param factory: :class:`gmaltcli.database.Manager` factory
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param bool use_raster: if True, the manager will import data as raster (in GIS extension in database)
+    :return: the paths of the HGT files which are new or changed
+    :rtype: list
+    """
+    with factory.get_manager(use_raster) as manager:
+        done_hashes = manager.get_done_hashes()
+
+    changed_files = []
+    for filepath in hgt_files:
+        tile = worker.get_tile_info(filepath, checksum=True)
+        if done_hashes.get(tile['tile']) != tile['hash']:
+            changed_files.append(filepath)
+
+    logging.info('Nb of files unchanged : {}'.format(len(hgt_files) - len(changed_files)))
+    return changed_files
+
+
+# Square sizes of the rasters benchmarked by `tune_raster_sample`, None for one raster per file
+TUNE_SAMPLES = (None, 50, 100, 200, 400)
+
+
+def tune_raster_sample(working_dir, factory, concurrency, candidates=TUNE_SAMPLES, nb_files=2, nb_queries=100):
+    """ Benchmark raster sizes on a sample of the HGT files found in working_dir against the target database
+
+    .. note:: each candidate is loaded in the scratch table `{table_name}_tune` which is dropped afterwards. The
+        candidates are ranked by the sum of their load time, table size (with indexes) and median point query
+        latency, each divided by the best value among the candidates.
+
+    :param str working_dir: folder where the hgt files are
+    :param factory: :class:`gmaltcli.database.Manager` factory of the target table
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param int concurrency: number of worker to start
+    :param tuple candidates: the square sizes of the rasters to benchmark, None for one raster per file
+    :param int nb_files: the number of HGT files loaded for each candidate
+    :param int nb_queries: the number of point queries run for each candidate
+    :return: the results of the candidates, the best first (see `benchmark_raster_sample`)
+    :rtype: list[dict]
+    """
+    hgt_files = sorted([os.path.realpath(filename) for filename in glob.glob(os.path.join(working_dir, "*.hgt"))])
+    if not hgt_files:
+        raise ValueError('No HGT file found in {}'.format(working_dir))
+    # files spread over the folder
+    sample_files = hgt_files[::max(len(hgt_files) // nb_files, 1)][:nb_files]
+
+    randomizer = random.Random(0)
+    points = [random_point(randomizer, randomizer.choice(sample_files)) for _ in range(nb_queries)]
+
+    tune_factory = factory.with_table('{}_tune'.format(factory.table_name))
+    # the overviews don't change the ranking
+    tune_factory.overviews = ()
+    results = [benchmark_raster_sample(sample_files, tune_factory, concurrency, size, points) for size in candidates]
+
+    for measure in ('load_time', 'total_size', 'latency'):
+        best = max(min([result[measure] for result in results]), 1e-9)
+        for result in results:
+            result['score'] = result.get('score', 0) + result[measure] / best
+    results.sort(key=lambda result: result['score'])
+
+    for result in results:
+        logging.info('tune - {} : {} rows, {:.1f}s, {:.1f} MB/s, table {:.1f} MB, indexes {:.1f} MB, '
+                     'point query {:.2f} ms, score {:.2f}'.format(
+                         '{0}x{0}'.format(result['sample']) if result['sample'] else 'file', result['rows'],
+                         result['load_time'], result['mb_per_sec'], result['table_size'] / 1e6,
+                         result['index_size'] / 1e6, result['latency'] * 1000, result['score']))
+    return results
+
+
+def random_point(randomizer, filepath):
+    """ Get a random point in the area covered by a HGT file
+
+    :param randomizer: the random generator
+    :type randomizer: :class:`random.Random`
+    :param str filepath: the path of the HGT file
+    :return: the latitude and the longitude of the point
+    :rtype: tuple
+    """
+    with hgt.HgtParser(filepath) as parser:
+        top_left = parser.top_left_square[1]
+        lat = float(top_left[0]) - randomizer.random() * float(parser.sample_lat * parser.square_height)
+        lng = float(top_left[1]) + randomizer.random() * float(parser.sample_lng * parser.square_width)
+    return lat, lng
+
+
+def benchmark_raster_sample(hgt_files, factory, concurrency, size, points):
+    """ Load HGT files as rasters of `size` x `size` values in the table of the factory then measure the table
+    and point queries. The table is dropped before the load and after the measures.
+
+    :param list hgt_files: the paths of the HGT files to load
+    :param factory: :class:`gmaltcli.database.Manager` factory of a scratch table
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param int concurrency: number of worker to start
+    :param int size: the square size of the rasters, None for one raster per file
+    :param list points: the (lat, lng) of the point queries
+    :return: dict with the `sample` size, the number of `rows`, the `load_time` in seconds, the `mb_per_sec` rate,
+        the `table_size`, `index_size` and `total_size` in bytes and the median point query `latency` in seconds
+    :rtype: dict
+    """
+    with factory.get_manager(True) as manager:
+        manager.drop_table()
+        manager.prepare_environment()
+
+    import_task = worker.WorkerPool(worker.ImportWorker, concurrency, os.path.dirname(hgt_files[0]), factory,
+                                    True, (size, size))
+    import_task.metrics = get_collector(None, 'tune', hgt_files)
+    import_task.fill(hgt_files)
+    with import_task.metrics:
+        import_task.start()
+    summary = import_task.metrics.summary()
+
+    with factory.get_manager(True) as manager:
+        if manager.bulk:
+            manager.optimize()
+        else:
+            manager.analyze()
+        table_size, index_size = manager.get_table_size()
+
+        latencies = []
+        for lat, lng in points:
+            start = time.time()
+            manager.get_point_value(lat, lng)
+            latencies.append(time.time() - start)
+        manager.drop_table()
+
+    return {
+        'sample': size,
+        'rows': summary['counters'].get('rows', 0),
+        'load_time': summary['elapsed'],
+        'mb_per_sec': summary['mb_per_sec'],
+        'table_size': table_size,
+        'index_size': index_size,
+        'total_size': table_size + index_size,
+        'latency': sorted(latencies)[len(latencies) // 2] if latencies else 0.
+    }
+
+
 def which(program):
     """ Check in PATH if a program exists on the machine running this code
 
@@ -147,7 +418,23 @@ def which(program):
     return False
 
 
-def check_for_raster2pgsql():
-    # TODO : check for raster2pgsql and provide a shell script using it
-    # raster2pgsql -a -M -t 50x50  tmp/N00E010.hgt elevation > ~/raster.sql
-    return False
+def check_for_raster2pgsql(working_dir, table_name, samples):
+    """ Check if `raster2pgsql` is available and log the command to import the HGT files found in working_dir with
+    it instead of `gmalt-hgtload`
+
+    :param str working_dir: folder where the hgt files are
+    :param str table_name: the name of the table to store the rasters
+    :param tuple samples: tuple with raster sampling on lng and lat
+    :return: True if `raster2pgsql` is available
+    :rtype: bool
+    """
+    if not which('raster2pgsql'):
+        return False
+
+    tiling = ' -t {}x{}'.format(*samples) if samples[0] else ''
+    logging.info('raster2pgsql is available, you can import the HGT files with :')
+    logging.info('    raster2pgsql -s 4326 -I -C -M{} {} {} | psql <connection options>'.format(
+        tiling, os.path.join(working_dir, '*.hgt'), table_name))
+    logging.info('or export them with `gmalt-hgtexport -f pgraster` to load them later with psql \\copy. '
+                 'Use --skip-raster2pgsql-check to import them with gmalt-hgtload.')
+    return True
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 import os
 import threading
+import multiprocessing
+import multiprocessing.managers
+import signal
+import pickle
 import logging
 import time
 import zipfile
@@ -23,7 +27,24 @@ except NameError:
     # Python 3
     xrange = range
 
-import gmalthgtparser as hgt
+import gmaltcli.reader as reader
+import gmaltcli.metrics as metrics
+
+
+def get_tile_info(filepath, checksum=False):
+    """ Get the information of a HGT file recorded in the ledger of the imported files
+
+    :param str filepath: the path of the HGT file
+    :param bool checksum: if True, the md5 checksum of the file is computed
+    :return: dict with the `tile` (file name), `size`, `mtime` and `hash` (None without checksum) keys
+    :rtype: dict
+    """
+    stat = os.stat(filepath)
+    md5digest = None
+    if checksum:
+        with open(filepath, 'rb') as fp:
+            md5digest = hashlib.md5(fp.read()).hexdigest()
+    return {'tile': os.path.basename(filepath), 'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': md5digest}
 
 
 class SafeCounter(object):
@@ -52,6 +73,26 @@ class SafeCounter(object):
         return '%d/%d' % (self.counter, self.max)
 
 
+class ProcessSafeCounter(SafeCounter):
+    """ A counter shared between processes.
+
+    .. note:: set max before starting the processes then call `increment` inside a process
+    """
+    def __init__(self, start=0, max_=0, incr=1):
+        self.shared = multiprocessing.Value('l', start)
+        self.max = max_
+        self.incr = incr
+        self.lock = self.shared.get_lock()
+
+    @property
+    def counter(self):
+        return self.shared.value
+
+    @counter.setter
+    def counter(self, value):
+        self.shared.value = value
+
+
 class WorkerPoolException(Exception):
     """ Exception raised by :class:`gmaltcli.worker.WorkerPool` when one of its
     thread has raised an exception
@@ -66,6 +107,9 @@ class WorkerPool(object):
     .. note:: the constructor other args and kwargs are passed as additionnal
         params to the worker __init__ method
 
+    .. note:: the workers put the reports of their :class:`gmaltcli.metrics.Metrics` in the `reports` queue. They
+        are added to the `metrics` collector by the main thread while it waits for the workers.
+
     :param worker: The class of the Worker thread
     :type worker: :class:`gmaltcli.worker.Worker`
     :param int size: number of worker to create in pool
@@ -74,11 +118,15 @@ class WorkerPool(object):
         self.queue = queue.Queue()
         self.counter = SafeCounter()
         self.stop_event = threading.Event()
+        self.reports = queue.Queue()
+        self.metrics = metrics.MetricsCollector(worker.__name__)
+        self.launched = False
         self.workers = []
         for i in range(size):
             # noinspection PyCallingNonCallable
             self.workers.append(worker(i + 1, self.queue, self.counter,
                                        self.stop_event, *args, **kwargs))
+            self.workers[-1].reports = self.reports
 
     def fill(self, iterable):
         """ Fill the queue with the items found in the `iterable`
@@ -90,6 +138,7 @@ class WorkerPool(object):
         for key in seq_iter:
             self.queue.put(iterable[key])
         self.counter.max = len(iterable)
+        self.metrics.total_files = len(iterable)
         logging.debug('Queue filled with %d items' % len(iterable))
 
     def _wait(self):
@@ -98,8 +147,24 @@ class WorkerPool(object):
         .. note:: Used instead of the threading `join` method in order to allow
             the main thread to watch for event like `KeyboardInterrupt`
         """
-        while any([worker.isAlive() for worker in self.workers]):
+        while any([worker.is_alive() for worker in self.workers]):
             time.sleep(0.1)
+            self.collect()
+
+    def collect(self):
+        """ Add the pending reports of the workers to the `metrics` collector and log its progress line if due """
+        self.metrics.collect(self.reports)
+
+    def launch(self):
+        """ Start the workers without waiting for them, `start` then only waits for them
+
+        .. note:: with processes, launch the pool before starting any other thread so that no lock is held by
+            another thread when the processes are forked
+        """
+        if not self.launched:
+            self.launched = True
+            for worker in self.workers:
+                worker.start()
 
     def start(self):
         """ Start the worker pool to process the queue
@@ -111,18 +176,106 @@ class WorkerPool(object):
             raised an exception
         """
         try:
-            for worker in self.workers:
-                worker.start()
+            self.launch()
             self._wait()
         except KeyboardInterrupt:
             self.stop_event.set()
             self._wait()  # Wait for threads to process the `stop_event`
             raise
+        finally:
+            self.collect()
 
         if self.stop_event.is_set():
             raise WorkerPoolException()
 
 
+def _ignore_sigint():
+    """ Ignore `KeyboardInterrupt` in a child process. The main process is in charge of stopping the workers
+    through the `stop_event` """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ProcessWorkerPool(WorkerPool):
+    """ Create a pool of worker processes which subscribe to a queue and process its item. Use it instead of
+    :class:`gmaltcli.worker.WorkerPool` when the work is CPU-bound python code limited by the GIL
+
+    .. note:: the queue is served by a :class:`multiprocessing.managers.SyncManager` process, the counter and the
+        `stop_event` are shared between the processes
+
+    .. note:: the constructor other args and kwargs are pickled and passed as additionnal params to the worker
+        __init__ method in each process. Objects like :class:`gmaltcli.database.ManagerFactory` are then
+        rebuilt in each process instead of sharing connections with the main process.
+
+    :param worker: The class of the Worker thread, run in the main thread of each process
+    :type worker: :class:`gmaltcli.worker.Worker`
+    :param int size: number of processes to create in pool
+    """
+    def __init__(self, worker, size, *args, **kwargs):
+        self.sync_manager = multiprocessing.managers.SyncManager()
+        self.sync_manager.start(_ignore_sigint)
+        self.queue = self.sync_manager.Queue()
+        self.counter = ProcessSafeCounter()
+        self.stop_event = multiprocessing.Event()
+        self.reports = self.sync_manager.Queue()
+        self.metrics = metrics.MetricsCollector(worker.__name__)
+        self.launched = False
+        self.workers = []
+        for i in range(size):
+            self.workers.append(WorkerProcess(worker, i + 1, self.queue, self.counter, self.stop_event,
+                                              *args, **kwargs))
+            self.workers[-1].reports = self.reports
+
+    def start(self):
+        """ Start the worker processes to process the queue
+
+        .. seealso:: :func:`gmaltcli.worker.WorkerPool.start`
+
+        :raises: :class:`gmaltcli.worker.WorkerPoolException` if one of the process raised an exception
+            or died unexpectedly
+        """
+        try:
+            super(ProcessWorkerPool, self).start()
+            if any([worker.exitcode for worker in self.workers]):
+                raise WorkerPoolException()
+        finally:
+            self.sync_manager.shutdown()
+
+
+class WorkerProcess(multiprocessing.Process):
+    """ A process running a :class:`gmaltcli.worker.Worker` in its main thread
+
+    .. seealso:: :class:`gmaltcli.worker.ProcessWorkerPool`
+
+    :param worker: The class of the Worker
+    :type worker: :class:`gmaltcli.worker.Worker`
+    :param int id_: id of the worker
+    :param queue_obj: the queue the worker subscribe to
+    :param counter: a process-safe counter with an `increment` method
+    :type counter: :class:`gmaltcli.worker.ProcessSafeCounter`
+    :param stop_event: a stop_event shared between all processes in the pool to indicate when an error occured
+    :type stop_event: :class:`multiprocessing.Event`
+    """
+    def __init__(self, worker, id_, queue_obj, counter, stop_event, *args, **kwargs):
+        super(WorkerProcess, self).__init__()
+        self.daemon = True
+        self.worker_args = (worker, id_, queue_obj, counter, stop_event)
+        self.payload = pickle.dumps((args, kwargs))
+        self.log_level = logging.getLogger().level
+        self.reports = None
+
+    def run(self):
+        _ignore_sigint()
+        if not logging.getLogger().handlers:
+            logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s')
+        logging.getLogger().setLevel(self.log_level)
+
+        worker, id_, queue_obj, counter, stop_event = self.worker_args
+        args, kwargs = pickle.loads(self.payload)
+        instance = worker(id_, queue_obj, counter, stop_event, *args, **kwargs)
+        instance.reports = self.reports
+        instance.run()
+
+
 class Worker(threading.Thread):
     """ This worker is a thread. It subscribes to a queue. On each queue item,
     it executes the `process` method.
@@ -150,6 +303,9 @@ class Worker(threading.Thread):
         self.queue = queue_obj
         self.counter = counter
         self.stop_event = stop_event
+        self.metrics = metrics.Metrics()
+        # set by the pool to report the metrics to its collector
+        self.reports = None
 
     def run(self):
         """ Process items in the queue while it is not empty and while the
@@ -164,6 +320,7 @@ class Worker(threading.Thread):
             self._get_queue()
 
         self._on_end()
+        self._report(force=True)
         self._log_debug('stopped')
 
     def _get_queue(self):
@@ -174,10 +331,17 @@ class Worker(threading.Thread):
         .. note:: child class needs to implement the `process` method
         """
         try:
-            queue_item = self.queue.get()
+            # Don't block if another worker got the last item since the `empty` check in `run`
+            queue_item = self.queue.get(block=False)
+        except queue.Empty:
+            return
+
+        try:
             counter_info = self.counter.increment()
 
             self.process(queue_item, counter_info)
+            self.metrics.count('files')
+            self._report()
 
             self.queue.task_done()
         except Exception as exception:
@@ -198,6 +362,15 @@ class Worker(threading.Thread):
         """ Executed when the worker ends """
         pass
 
+    def _report(self, force=False):
+        """ Put the metrics of the worker since its last report in the `reports` queue of its pool every
+        `Metrics.REPORT_INTERVAL` seconds
+
+        :param bool force: if True, report them anyway
+        """
+        if self.reports is not None and (force or self.metrics.is_due()):
+            self.reports.put(('%s %d' % (self.__class__.__name__, self.id), self.metrics.pop()))
+
     def _log(self, level, message, params=None, prefix=None):
         prefix = prefix if prefix is not None else self.__class__.__name__
         message = message % params if params else message
@@ -286,18 +459,22 @@ class DownloadWorker(Worker):
             self._log_debug('file %s exists and is valid at location %s', (filename, file_fullpath))
             return
 
-        hgt_zip_file = urlopen(url)
-        with open(file_fullpath, 'wb+') as output:
-            while True:
-                data = hgt_zip_file.read(4096)
-                if data and not self.stop_event.is_set():
-                    output.write(data)
-                else:
-                    output.flush()
-                    os.fsync(output.fileno())
-                    break
-
-        self._validate_downloaded_file(file_fullpath, md5sum)
+        with self.metrics.timer('download'):
+            hgt_zip_file = urlopen(url)
+            with open(file_fullpath, 'wb+') as output:
+                while True:
+                    data = hgt_zip_file.read(4096)
+                    if data and not self.stop_event.is_set():
+                        output.write(data)
+                        self.metrics.count('bytes', len(data))
+                        self._report()
+                    else:
+                        output.flush()
+                        os.fsync(output.fileno())
+                        break
+
+        with self.metrics.timer('validate'):
+            self._validate_downloaded_file(file_fullpath, md5sum)
 
     def _file_exists(self, filepath, md5sum):
         """ Check if a file has already been downloaded. Useful in case of
@@ -379,20 +556,50 @@ class ExtractWorker(Worker):
 
         :param str filename: the name of the file to extract
         """
-        with zipfile.ZipFile(filename) as zip_fd:
-            for name in zip_fd.namelist():
-                zip_fd.extract(name, self.folder)
+        with self.metrics.timer('extract'):
+            with zipfile.ZipFile(filename) as zip_fd:
+                for name in zip_fd.namelist():
+                    zip_fd.extract(name, self.folder)
+        self.metrics.count('bytes', os.path.getsize(filename))
 
 
 class ImportWorker(Worker):
-    """ Worker in charge of reading hgt file found in `folder` and importing it """
+    """ Worker in charge of reading hgt file found in `folder` and importing it
 
-    def __init__(self, id_, queue_obj, counter, stop_event, folder, factory, use_raster, samples):
+    .. note:: the HGT file is read with :class:`gmaltcli.reader.HgtBlockReader`, by blocks of `BLOCK_LINES` lines
+        without raster or by samples with raster
+
+    .. note:: the data of a file are imported in a single transaction which also records the file as done in the
+        ledger table of the manager. If the import is stopped, the transaction is rolled back.
+
+    .. note:: with `merge_runs`, the consecutive equal values of a line are imported as a single rectangle
+
+    .. note:: with `resample`, the values are downsampled by the reader before they reach the manager (see
+        :class:`gmaltcli.reader.HgtBlockReader`)
+
+    .. note:: with `incremental`, the md5 checksum of each block of `BLOCK_LINES` lines is compared to the
+        checksum recorded by the manager for the previous import of the file. Only the changed blocks are deleted
+        and inserted again, in the transaction of the file.
+
+    .. note:: with raster, the overviews of the manager (if any) are imported from the values of the file still in
+        memory once its samples are imported
+
+    .. note:: the time spent reading the file is added to the `parse` timer of the metrics, the time spent
+        building the rows to the `encode` timer. The manager adds the database time to the `execute` and
+        `commit` timers.
+    """
+    BLOCK_LINES = 100
+
+    def __init__(self, id_, queue_obj, counter, stop_event, folder, factory, use_raster, samples, merge_runs=False,
+                 resample=None, incremental=False):
         super(ImportWorker, self).__init__(id_, queue_obj, counter, stop_event)
         self.folder = folder
         self.factory = factory
         self.use_raster = use_raster
         self.sample_with, self.sample_height = samples
+        self.merge_runs = merge_runs
+        self.resample = resample
+        self.incremental = incremental
 
     def process(self, queue_item, counter_info):
         """ Import one HGT file
@@ -410,25 +617,60 @@ class ImportWorker(Worker):
 
         :param str filepath: the path of the file to import
         """
+        tile = get_tile_info(filepath, checksum=True)
         with self.factory.get_manager(self.use_raster) as manager:
-            with hgt.HgtParser(filepath) as parser:
-                elev_iter = self._get_iterator(parser)
-                self._execute_import(elev_iter, manager)
-
-    def _get_iterator(self, parser):
-        """ Get the right HTML iterator for the import task
-
-        :param parser: the HGT parser for the file
-        :type parser: :class:`gmalthgtparser.HgtParser`
-        :return: a HGT iterator
-        :rtype: iter
-        """
-        if self.use_raster:
-            width = self.sample_with or parser.sample_lng
-            height = self.sample_height or parser.sample_lat
-            return parser.get_sample_iterator(width, height)
-        else:
-            return parser.get_value_iterator()
+            manager.metrics = self.metrics
+            manager.start_tile(tile)
+            with reader.HgtBlockReader(filepath, resample=self.resample) as block_reader:
+                if self.use_raster:
+                    elev_iter = self._get_iterator(block_reader)
+                    self._execute_import(elev_iter, manager)
+                    self._execute_overview_import(block_reader, manager)
+                else:
+                    self._execute_block_import(block_reader, manager)
+
+            # Import task stopped before the end of the file, it will be imported again on next run
+            if self.stop_event.is_set():
+                manager.rollback_tile()
+            else:
+                manager.end_tile(tile)
+                if self.use_raster:
+                    self.metrics.count('bytes', tile['size'])
+
+    def _get_iterator(self, block_reader):
+        """ Get the raster sample iterator for the import task
+
+        :param block_reader: the reader of the HGT file
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :return: a HGT sample iterator
+        :rtype: :class:`gmaltcli.reader.HgtSampleIterator`
+        """
+        return block_reader.get_sample_iterator(*self._get_sample_size(block_reader))
+
+    def _get_sample_size(self, block_reader):
+        """ Get the size of the rasters, the size of the file if no sample size is configured
+
+        :param block_reader: the reader of the HGT file
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :return: the width and the height of a raster
+        :rtype: tuple
+        """
+        return (self.sample_with or block_reader.parser.sample_lng,
+                self.sample_height or block_reader.parser.sample_lat)
+
+    def _execute_overview_import(self, block_reader, manager):
+        """ Import the overviews of the file if the manager has overviews and the import is not stopped
+
+        :param block_reader: the reader of the HGT file
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :param manager: manager to import data into database
+        :type manager: :class:`gmaltcli.database.BaseManager`
+        """
+        if not manager.overviews or self.stop_event.is_set():
+            return
+        with self.metrics.timer('encode'):
+            manager.insert_overviews(block_reader, *self._get_sample_size(block_reader))
+        self._log_debug('overviews %s imported', (manager.overviews,))
 
     def _execute_import(self, elev_iter, manager):
         """ Method called to import the data from a HGT iterator
@@ -441,16 +683,492 @@ class ImportWorker(Worker):
         processed = 0
         last_percentage = 0
 
-        for value in elev_iter:
+        for value in self.metrics.timed(elev_iter, 'parse'):
             # Break import task if an error occured in another thread or if KeyboardInterrupt
             if self.stop_event.is_set():
                 break
 
-            manager.insert_data(value, elev_iter.parser)
+            with self.metrics.timer('encode'):
+                manager.insert_data(value, elev_iter.parser)
 
-            # Display progress as percentage
+            # Display progress as percentage, with integers as it is checked on each value
             processed += 1
-            percents = float(processed) / total * 100
-            if int(percents) != last_percentage:
-                self._log_info("{0:.0f}% {1}/{2}".format(percents, processed, total), prefix='import')
-                last_percentage = int(percents)
+            percents = processed * 100 // total
+            if percents != last_percentage:
+                self._log_info("{0}% {1}/{2}".format(percents, processed, total), prefix='import')
+                last_percentage = percents
+                self._report()
+
+    def _execute_block_import(self, block_reader, manager):
+        """ Method called to import the data of a HGT file by blocks of lines
+
+        :param block_reader: the reader of the HGT file
+        :type block_reader: :class:`gmaltcli.reader.HgtBlockReader`
+        :param manager: manager to import data into database
+        :type manager: :class:`gmaltcli.database.BaseManager`
+        """
+        total = block_reader.nb_values
+        sample_lng = block_reader.parser.sample_lng
+        nb_values = 0
+        nb_rows = 0
+        stored_hashes = manager.get_block_hashes(block_reader.filename) if self.incremental else {}
+        hashes = {}
+
+        blocks = block_reader.get_block_iterator(self.BLOCK_LINES, merge_runs=self.merge_runs)
+        for block in self.metrics.timed(blocks, 'parse'):
+            # Break import task if an error occured in another thread or if KeyboardInterrupt
+            if self.stop_event.is_set():
+                break
+
+            # bytes of the file read for the block, a downsampled value is read from `factor` x `factor` values
+            self.metrics.count('bytes', block.nb_values * 2 * (self.resample[0] ** 2 if self.resample else 1))
+            if self.incremental:
+                hashes[block.line] = block_reader.get_block_hash(block.line, block.nb_lines)
+                if stored_hashes.get(block.line) == hashes[block.line]:
+                    continue
+                with self.metrics.timer('encode'):
+                    manager.delete_block(*block_reader.get_block_bounds(block.line, block.nb_lines))
+
+            with self.metrics.timer('encode'):
+                manager.insert_block(block)
+            nb_values += block.nb_values
+            nb_rows += len(block.value)
+            self.metrics.count('values', block.nb_values)
+            self._report()
+
+            processed = (block.line + block.nb_lines) * sample_lng
+            self._log_info("{0:.0f}% {1}/{2}".format(float(processed) / total * 100, processed, total),
+                           prefix='import')
+
+        if self.incremental and not self.stop_event.is_set():
+            manager.record_block_hashes(block_reader.filename, hashes)
+            changed = [line for line, md5digest in hashes.items() if stored_hashes.get(line) != md5digest]
+            self.metrics.count('blocks', len(hashes))
+            self.metrics.count('changed_blocks', len(changed))
+            self._log_info("{0}/{1} blocks changed".format(len(changed), len(hashes)), prefix='import')
+
+        if self.merge_runs and nb_rows:
+            self._log_info("{0} values merged in {1} rows, compression ratio {2:.1f}".format(
+                nb_values, nb_rows, float(nb_values) / nb_rows), prefix='import')
+
+
+class StageStats(object):
+    """ Thread-safe utilization statistics of a stage of a :class:`gmaltcli.worker.ImportPipeline`
+
+    :param str name: the name of the stage
+    """
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.nb_workers = 0
+        self.nb_items = 0
+        self.busy = 0.
+        self.waiting = 0.
+
+    def add(self, nb_items, busy, waiting):
+        """ Add the statistics of a worker of the stage
+
+        :param int nb_items: the number of items processed by the worker (files or batches)
+        :param float busy: the time in seconds spent working
+        :param float waiting: the time in seconds spent waiting for the other stage
+        """
+        with self.lock:
+            self.nb_workers += 1
+            self.nb_items += nb_items
+            self.busy += busy
+            self.waiting += waiting
+
+    @property
+    def utilization(self):
+        """
+        :return: the ratio of time spent working
+        :rtype: float
+        """
+        total = self.busy + self.waiting
+        return self.busy / total if total else 0.
+
+    def to_dict(self):
+        """
+        :return: the JSON serializable statistics of the stage
+        :rtype: dict
+        """
+        return {'workers': self.nb_workers, 'items': self.nb_items, 'busy': self.busy, 'waiting': self.waiting,
+                'utilization': self.utilization}
+
+    def __str__(self):
+        total = self.busy + self.waiting
+        return '{} : {} workers, {} items, busy {:.0%}, waiting {:.0%}'.format(
+            self.name, self.nb_workers, self.nb_items, self.utilization, self.waiting / total if total else 0.)
+
+
+class TileTracker(object):
+    """ Thread-safe tracker of the batches of each file written by the writers of a
+    :class:`gmaltcli.worker.ImportPipeline`. A file is complete once its last batch is committed and the parser
+    announced its number of batches.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.committed = {}
+        self.expected = {}
+
+    def batch_done(self, tile_name):
+        """ Count a committed batch of a file
+
+        :param str tile_name: the name of the file
+        :return: the file information and its number of rows if the file is complete else None
+        :rtype: tuple or None
+        """
+        with self.lock:
+            self.committed[tile_name] = self.committed.get(tile_name, 0) + 1
+            return self._pop_complete(tile_name)
+
+    def tile_done(self, tile, nb_batches, nb_rows):
+        """ Record the number of batches of a completely parsed file
+
+        :param dict tile: the file information provided by :func:`gmaltcli.worker.get_tile_info`
+        :param int nb_batches: the number of batches of the file
+        :param int nb_rows: the number of rows of the file
+        :return: the file information and its number of rows if the file is complete else None
+        :rtype: tuple or None
+        """
+        with self.lock:
+            self.expected[tile['tile']] = (tile, nb_batches, nb_rows)
+            return self._pop_complete(tile['tile'])
+
+    def _pop_complete(self, tile_name):
+        if tile_name in self.expected and self.committed.get(tile_name, 0) == self.expected[tile_name][1]:
+            tile, nb_batches, nb_rows = self.expected.pop(tile_name)
+            self.committed.pop(tile_name, None)
+            return tile, nb_rows
+        return None
+
+
+class ParseWorker(ImportWorker):
+    """ Worker of the parse stage of a :class:`gmaltcli.worker.ImportPipeline`. It reads the hgt files like an
+    :class:`gmaltcli.worker.ImportWorker` but its manager only encodes the batches of rows which are put in the
+    bounded `batch_queue` of the writers
+
+    .. note:: the put blocks while the queue is full (backpressure of the write stage)
+
+    .. note:: the file is recorded as started in the ledger by the parser before its first batch is put in the
+        queue, the writer which commits its last batch records it as done
+    """
+    PUT_TIMEOUT = 0.1
+
+    def __init__(self, id_, queue_obj, counter, stop_event, folder, factory, use_raster, samples, merge_runs,
+                 batch_queue, resample=None):
+        super(ParseWorker, self).__init__(id_, queue_obj, counter, stop_event, folder, factory, use_raster, samples,
+                                          merge_runs=merge_runs, resample=resample)
+        self.batch_queue = batch_queue
+        self.nb_files = 0
+        self.busy = 0.
+        self.waiting = 0.
+
+    def _import_file(self, filepath):
+        """ Read a hgt file in `folder` and put its encoded batches in the `batch_queue`
+
+        :param str filepath: the path of the file to import
+        """
+        start, waiting = time.time(), self.waiting
+        tile = get_tile_info(filepath, checksum=True)
+        with self.factory.get_manager(self.use_raster) as manager:
+            manager.record_tile_start(tile)
+
+        manager = self.factory.get_manager(self.use_raster)
+        manager.metrics = self.metrics
+        batches = []
+        manager.sink = lambda batch: batches.append(self._put(('batch', tile['tile'], batch)))
+        with reader.HgtBlockReader(filepath, resample=self.resample) as block_reader:
+            if self.use_raster:
+                self._execute_import(self._get_iterator(block_reader), manager)
+                self._execute_overview_import(block_reader, manager)
+            else:
+                self._execute_block_import(block_reader, manager)
+        manager.flush()
+
+        # Import task stopped before the end of the file, it will be imported again on next run
+        if not self.stop_event.is_set():
+            self._put(('tile', tile, len(batches), manager.nb_rows))
+            if self.use_raster:
+                self.metrics.count('bytes', tile['size'])
+        self.nb_files += 1
+        self.busy += time.time() - start - (self.waiting - waiting)
+
+    def _put(self, item):
+        """ Put an item in the `batch_queue`, waiting for a free slot unless the `stop_event` is set
+
+        :param tuple item: the item to put
+        """
+        start = time.time()
+        try:
+            with self.metrics.timer('wait'):
+                while not self.stop_event.is_set():
+                    try:
+                        self.batch_queue.put(item, timeout=self.PUT_TIMEOUT)
+                        return
+                    except queue.Full:
+                        pass
+        finally:
+            self.waiting += time.time() - start
+
+    def _on_end(self):
+        """ Send the statistics of the worker to the writers """
+        self._put(('stats', self.nb_files, self.busy, self.waiting))
+
+
+class WriteWorker(Worker):
+    """ Worker of the write stage of a :class:`gmaltcli.worker.ImportPipeline`. It sends the batches of the
+    `batch_queue` to the database with its own connection until the `parsed_event` is set and the queue is empty
+
+    .. note:: the time spent sending the batches is added to the `execute` timer of the metrics, the time spent
+        recording the files as done to the `commit` timer and the time spent waiting for a batch to the `wait` timer
+
+    :param int id_: id of the worker
+    :param batch_queue: the bounded queue of the encoded batches
+    :param tracker: the tracker of the batches of each file shared by the writers
+    :type tracker: :class:`gmaltcli.worker.TileTracker`
+    :param stop_event: a stop_event shared between all the workers of the pipeline to indicate when an error occured
+    :param parsed_event: an event set when all the files are parsed
+    :type parsed_event: :class:`threading.Event`
+    :param factory: :class:`gmaltcli.database.Manager` factory
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param bool use_raster: if True, the manager imports data as raster
+    :param dict stats: the :class:`gmaltcli.worker.StageStats` of the `parse` and `write` stages
+    """
+    GET_TIMEOUT = 0.1
+
+    def __init__(self, id_, batch_queue, tracker, stop_event, parsed_event, factory, use_raster, stats):
+        super(WriteWorker, self).__init__(id_, batch_queue, None, stop_event)
+        self.tracker = tracker
+        self.parsed_event = parsed_event
+        self.factory = factory
+        self.use_raster = use_raster
+        self.stats = stats
+
+    def run(self):
+        """ Send the batches of the queue while the `stop_event` is not set
+
+        .. note:: in case of an exception, it sets the `stop_event`
+        """
+        self._log_debug('started')
+        nb_batches = 0
+        busy = waiting = 0.
+        try:
+            with self.factory.get_manager(self.use_raster) as manager:
+                manager.metrics = self.metrics
+                while not self.stop_event.is_set():
+                    start = time.time()
+                    try:
+                        with self.metrics.timer('wait'):
+                            item = self.queue.get(timeout=self.GET_TIMEOUT)
+                    except queue.Empty:
+                        waiting += time.time() - start
+                        if self.parsed_event.is_set():
+                            break
+                        continue
+                    waiting += time.time() - start
+
+                    start = time.time()
+                    nb_batches += self.process(item, manager)
+                    busy += time.time() - start
+                    self._report()
+        except Exception as exception:
+            logging.exception(exception)
+            self._log_debug('exception raised')
+            self.stop_event.set()
+
+        self.stats['write'].add(nb_batches, busy, waiting)
+        self._report(force=True)
+        self._log_debug('stopped')
+
+    def process(self, queue_item, manager):
+        """ Send a batch, record a file as done once its batches are committed or collect the statistics of a
+        parser
+
+        :param tuple queue_item: an item of the `batch_queue`
+        :param manager: the manager of the writer
+        :type manager: :class:`gmaltcli.database.BaseManager`
+        :return: the number of batches sent
+        :rtype: int
+        """
+        kind = queue_item[0]
+        complete = None
+        if kind == 'batch':
+            with self.metrics.timer('execute'):
+                manager.send_rows(queue_item[2])
+            self.metrics.count('batches')
+            complete = self.tracker.batch_done(queue_item[1])
+        elif kind == 'tile':
+            complete = self.tracker.tile_done(*queue_item[1:])
+        elif kind == 'stats':
+            self.stats['parse'].add(*queue_item[1:])
+
+        if complete:
+            with self.metrics.timer('commit'):
+                manager.record_tile_done(*complete)
+            self._log_debug('%s imported', (complete[0]['tile'],))
+        return 1 if kind == 'batch' else 0
+
+
+class ImportPipeline(object):
+    """ Import HGT files in two stages : a pool of :class:`gmaltcli.worker.ParseWorker` threads (or processes)
+    parses the files and encodes the batches of rows in a bounded queue, a pool of
+    :class:`gmaltcli.worker.WriteWorker` threads with their own database connections sends them
+
+    .. note:: the batches of a file are committed by several writers in separate transactions. A file
+        interrupted during its import stays started in the ledger with the batches already committed, they are
+        ignored (or deduplicated in bulk mode) when the file is imported again.
+
+    .. note:: the utilization of each stage is logged at the end of the import and added to the `metrics`
+        collector of the parse pool, the writers also report their metrics to it
+
+    :param int size: number of parse workers
+    :param int writers: number of write workers
+    :param str executor: `thread` or `process` for the parse workers
+    :param str folder: folder where the hgt files are
+    :param factory: :class:`gmaltcli.database.Manager` factory
+    :type factory: :class:`gmaltcli.database.ManagerFactory`
+    :param bool use_raster: if True, the manager imports data as raster
+    :param tuple samples: tuple with raster sampling on lng and lat
+    :param bool merge_runs: if True, the consecutive equal values of a line are imported as a single rectangle
+    :param tuple resample: the downsampling factor and method of the values, None to import them at the
+        resolution of the files
+    """
+    QUEUE_SIZE_PER_WRITER = 4
+
+    def __init__(self, size, writers, executor, folder, factory, use_raster, samples, merge_runs=False,
+                 resample=None):
+        queue_size = self.QUEUE_SIZE_PER_WRITER * writers
+        self.sync_manager = None
+        if executor == 'process':
+            # the queue proxy can be passed to the parse processes
+            self.sync_manager = multiprocessing.managers.SyncManager()
+            self.sync_manager.start(_ignore_sigint)
+            self.batch_queue = self.sync_manager.Queue(queue_size)
+        else:
+            self.batch_queue = queue.Queue(queue_size)
+
+        pool_class = ProcessWorkerPool if executor == 'process' else WorkerPool
+        self.parse_pool = pool_class(ParseWorker, size, folder, factory, use_raster, samples, merge_runs,
+                                     self.batch_queue, resample)
+        self.stats = {'parse': StageStats('parse'), 'write': StageStats('write')}
+        self.parsed_event = threading.Event()
+        tracker = TileTracker()
+        self.writers = [WriteWorker(i + 1, self.batch_queue, tracker, self.parse_pool.stop_event, self.parsed_event,
+                                    factory, use_raster, self.stats)
+                        for i in range(writers)]
+        # the writers are threads of the main process whatever the executor of the parse pool
+        self.reports = queue.Queue()
+        for writer in self.writers:
+            writer.reports = self.reports
+
+    @property
+    def metrics(self):
+        """
+        :return: the metrics collector of the parse pool and of the writers
+        :rtype: :class:`gmaltcli.metrics.MetricsCollector`
+        """
+        return self.parse_pool.metrics
+
+    @metrics.setter
+    def metrics(self, collector):
+        self.parse_pool.metrics = collector
+
+    def fill(self, iterable):
+        """ Fill the queue of the parse workers
+
+        .. seealso:: :func:`gmaltcli.worker.WorkerPool.fill`
+        """
+        self.parse_pool.fill(iterable)
+
+    def start(self):
+        """ Start the parse workers then the writers and wait for the end of both stages
+
+        .. note:: the parse processes are forked before the writer threads are started : a lock held by a writer
+            (sqlite, logging...) at fork time would never be released in the child processes
+
+        .. note:: blocking call until the files are imported or one of the workers raised an exception
+
+        :raises: :class:`gmaltcli.worker.WorkerPoolException` if one of the workers raised an exception
+        :return: the statistics of the `parse` and `write` stages
+        :rtype: dict
+        """
+        try:
+            self.parse_pool.launch()
+            for writer in self.writers:
+                writer.start()
+            self.parse_pool.start()
+        finally:
+            self.parsed_event.set()
+            while any([writer.is_alive() for writer in self.writers]):
+                time.sleep(0.1)
+                self.metrics.collect(self.reports)
+            self.metrics.collect(self.reports)
+            if self.sync_manager:
+                self.sync_manager.shutdown()
+
+        for stage in ('parse', 'write'):
+            logging.info('stage - {}'.format(self.stats[stage]))
+        self.metrics.extra['stages'] = dict((stage, self.stats[stage].to_dict()) for stage in self.stats)
+        if self.parse_pool.stop_event.is_set():
+            raise WorkerPoolException()
+        return self.stats
+
+
+class ExportWorker(Worker):
+    """ Worker in charge of reading hgt file found in `folder` and writing it in `output_dir` with an exporter
+
+    .. note:: a HGT file whose output file already exists is skipped unless `overwrite` is set. The output file
+        is created only once completely written (see :class:`gmaltcli.export.BaseExporter`) so an interrupted
+        export can be resumed.
+
+    .. note:: the time spent reading the file is added to the `parse` timer of the metrics, the time spent
+        writing the output file to the `write` timer
+    """
+
+    def __init__(self, id_, queue_obj, counter, stop_event, folder, output_dir, exporter_class, samples,
+                 overwrite=False):
+        super(ExportWorker, self).__init__(id_, queue_obj, counter, stop_event)
+        self.folder = folder
+        self.output_dir = output_dir
+        self.exporter_class = exporter_class
+        self.samples = samples
+        self.overwrite = overwrite
+
+    def process(self, queue_item, counter_info):
+        """ Export one HGT file
+
+        :param str queue_item: the HGT filepath to export
+        :param counter_info: the counter for the current queue
+        :type counter_info: :class:`gmaltcli.worker.SafeCounter`
+        """
+        self._log_debug('exporting %s', (queue_item,))
+        self._log_info('Exporting file %d/%d' % counter_info, prefix='export')
+        self._export_file(queue_item)
+
+    def _export_file(self, filepath):
+        """ Read a hgt file in `folder` and write its output file
+
+        :param str filepath: the path of the file to export
+        """
+        output_path = self.exporter_class.get_output_path(self.output_dir, filepath)
+        if not self.overwrite and os.path.exists(output_path):
+            self._log_info('%s already exported', (os.path.basename(output_path),), prefix='export')
+            return
+
+        with reader.HgtBlockReader(filepath) as block_reader:
+            with self.exporter_class(output_path, samples=self.samples) as exporter:
+                for item in self.metrics.timed(exporter.get_iterator(block_reader), 'parse'):
+                    # Break export task if an error occured in another thread or if KeyboardInterrupt, the
+                    # incomplete output file is removed
+                    if self.stop_event.is_set():
+                        exporter.discard()
+                        break
+                    with self.metrics.timer('write'):
+                        exporter.write(item)
+                    self._report()
+
+        if not self.stop_event.is_set():
+            self.metrics.count('rows', exporter.nb_rows)
+            self.metrics.count('bytes', os.path.getsize(filepath))
+        self._log_debug('%d rows written in %s', (exporter.nb_rows, output_path))
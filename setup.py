@@ -18,9 +18,11 @@ setup(
     packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     include_package_data=True,
     long_description=read('README.rst'),
-    install_requires=['SQLAlchemy', 'psycopg2', 'future', 'gmalthgtparser'],
+    install_requires=['SQLAlchemy', 'psycopg2', 'future', 'gmalthgtparser', 'numpy'],
     extras_require={
         'tools': ['lxml'],
+        'mysql': ['PyMySQL'],
+        'parquet': ['pyarrow'],
         'test': ['pytest', 'flake8', 'mock'],
         'build': ['wheel']
     },
@@ -40,5 +42,7 @@ setup(
         gmalt-hgtread = gmaltcli.app:read_from_hgt
         gmalt-hgtget = gmaltcli.app:get_hgt
         gmalt-hgtload = gmaltcli.app:load_hgt
+        gmalt-hgtexport = gmaltcli.app:export_hgt
+        gmalt-hgtserve = gmaltcli.app:serve_hgt
     '''
 )